@@ -0,0 +1,152 @@
+"""Per-worker admission control for crawl-heavy routes.
+
+Each worker runs at most ``INSIGHTS_ADMIT_SLOTS`` crawls at once. Requests beyond that wait
+in a bounded queue per priority class; a request that cannot be queued, or that waits past
+its class deadline, is shed with ``503`` and a ``Retry-After`` estimate instead of piling
+more work onto a saturated event loop. Freed slots go to the waiting classes in proportion
+to their weights (stride scheduling), and bulk work is additionally capped so it can never
+hold every slot.
+"""
+from __future__ import annotations
+import asyncio, math, time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Optional
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.logging import log
+
+INTERACTIVE, BULK = "interactive", "bulk"
+
+
+class Overloaded(HTTPException):
+    def __init__(self, priority: str, retry_after: int, reason: str):
+        super().__init__(status_code=503, detail=f"Server busy ({priority} {reason}); retry later",
+                         headers={"Retry-After": str(retry_after)})
+
+
+class PriorityClass:
+    __slots__ = ("name", "weight", "max_active", "queue_limit", "deadline", "waiters", "active",
+                 "admitted", "shed", "expired", "service_time", "pass_")
+
+    def __init__(self, name: str, weight: float, max_active: int, queue_limit: int, deadline: float):
+        self.name = name
+        self.weight = weight
+        self.max_active = max_active
+        self.queue_limit = queue_limit
+        self.deadline = deadline
+        self.waiters: deque = deque()
+        self.active = self.admitted = self.shed = self.expired = 0
+        self.service_time = 1.0  # EWMA of seconds a slot is held, for Retry-After
+        self.pass_ = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {"active": self.active, "queued": len(self.waiters), "max_active": self.max_active,
+                "queue_limit": self.queue_limit, "admitted": self.admitted, "shed": self.shed,
+                "expired": self.expired, "avg_service_s": round(self.service_time, 3)}
+
+
+class AdmissionController:
+    def __init__(self, slots: int, classes: Iterable[PriorityClass]):
+        self.slots = slots
+        self.classes = {c.name: c for c in classes}
+        self.active = 0
+        self.vtime = 0.0  # pass value of the last class served
+
+    @asynccontextmanager
+    async def slot(self, priority: str):
+        cls = self.classes[priority]
+        await self._acquire(cls)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            cls.service_time = 0.8 * cls.service_time + 0.2 * (time.monotonic() - started)
+            self._release(cls)
+
+    async def _acquire(self, cls: PriorityClass) -> None:
+        if not cls.waiters and self.active < self.slots and cls.active < cls.max_active:
+            cls.pass_ = max(cls.pass_, self.vtime) + 1.0 / cls.weight
+            self._grant(cls)
+            return
+        if len(cls.waiters) >= cls.queue_limit:
+            cls.shed += 1
+            raise self._overloaded(cls, "queue full")
+        if not cls.waiters:
+            # an idle class rejoins at the current virtual time instead of cashing in its idle period
+            cls.pass_ = max(cls.pass_, self.vtime)
+        fut = asyncio.get_running_loop().create_future()
+        cls.waiters.append(fut)
+        try:
+            await asyncio.wait({fut}, timeout=cls.deadline)
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                # granted just as the request was cancelled: hand the slot on
+                self._release(cls)
+            else:
+                self._abandon(cls, fut)
+            raise
+        if not fut.done():
+            self._abandon(cls, fut)
+            cls.expired += 1
+            raise self._overloaded(cls, "queue deadline exceeded")
+
+    def _abandon(self, cls: PriorityClass, fut: asyncio.Future) -> None:
+        fut.cancel()
+        cls.waiters.remove(fut)
+
+    def _grant(self, cls: PriorityClass) -> None:
+        cls.active += 1
+        cls.admitted += 1
+        self.active += 1
+
+    def _release(self, cls: PriorityClass) -> None:
+        cls.active -= 1
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self.active < self.slots:
+            ready = [c for c in self.classes.values() if c.waiters and c.active < c.max_active]
+            if not ready:
+                return
+            cls = min(ready, key=lambda c: c.pass_)
+            fut = cls.waiters.popleft()
+            if fut.done():
+                continue
+            self.vtime = cls.pass_
+            cls.pass_ += 1.0 / cls.weight
+            self._grant(cls)
+            fut.set_result(None)
+
+    def _overloaded(self, cls: PriorityClass, reason: str) -> Overloaded:
+        parallel = max(1, min(self.slots, cls.max_active))
+        retry_after = min(60, max(1, math.ceil((len(cls.waiters) + 1) * cls.service_time / parallel)))
+        log.warning("admission_shed", priority=cls.name, reason=reason, active=self.active,
+                    queued=len(cls.waiters), retry_after=retry_after)
+        return Overloaded(cls.name, retry_after, reason)
+
+    def stats(self) -> Dict[str, object]:
+        return {"slots": self.slots, "active": self.active,
+                "classes": {name: c.stats() for name, c in self.classes.items()}}
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        s = settings
+        _controller = AdmissionController(s.INSIGHTS_ADMIT_SLOTS, [
+            PriorityClass(INTERACTIVE, weight=4, max_active=s.INSIGHTS_ADMIT_SLOTS,
+                          queue_limit=s.INSIGHTS_ADMIT_QUEUE, deadline=s.INSIGHTS_ADMIT_DEADLINE),
+            PriorityClass(BULK, weight=1, max_active=s.INSIGHTS_ADMIT_BULK_SLOTS,
+                          queue_limit=s.INSIGHTS_ADMIT_BULK_QUEUE, deadline=s.INSIGHTS_ADMIT_BULK_DEADLINE),
+        ])
+    return _controller
+
+
+def admit(priority: str):
+    """``async with admit(INTERACTIVE): ...`` around the work a request must not start unadmitted."""
+    return get_controller().slot(priority)
@@ -0,0 +1,166 @@
+"""HTTP plumbing for the API: JSON response class, ETag helpers and the conditional-GET
+and compression ASGI middlewares installed by `app.main`."""
+from __future__ import annotations
+import gzip, hashlib
+import anyio
+from typing import Optional
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+JSONResponseClass = ORJSONResponse if orjson is not None else JSONResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024
+OFFLOAD_SIZE = 256 * 1024  # compress bigger bodies in a worker thread, off the event loop
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+# ---------- ETags ----------
+def etag_for(content_hash: str, request: Request) -> str:
+    """Weak ETag for one representation of a brand: its content hash plus the route and query."""
+    key = f"{content_hash}|{request.url.path}|{sorted(request.query_params.multi_items())}"
+    return 'W/"%s"' % hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((t.strip()[2:] if t.strip().startswith("W/") else t.strip()) == opaque
+               for t in if_none_match.split(","))
+
+
+def not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """A 304 response if the client already has `etag`, else None."""
+    if etag and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+# ---------- Middleware ----------
+# Both buffer only responses sent as a single body message; streaming responses
+# (more_body=True, e.g. /export) pass through untouched.
+class ConditionalGetMiddleware:
+    """Adds a body-hash ETag to complete 200 GET responses that lack one and turns matching
+    If-None-Match requests into 304s. Routes that can tell from the brand's content hash set
+    their own ETag (and can answer 304 without doing the work)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                return await send(message)
+            held, start = start, None
+            if held["status"] != 200 or message.get("more_body", False):
+                await send(held)
+                return await send(message)
+            headers = MutableHeaders(raw=held["headers"])
+            etag = headers.get("etag")
+            if etag is None:
+                body_hash = hashlib.blake2b(message.get("body", b""), digest_size=16).hexdigest()
+                etag = headers["etag"] = f'W/"{body_hash}"'
+                held["headers"] = headers.raw
+            if etag_matches(if_none_match, etag):
+                await send({"type": "http.response.start", "status": 304,
+                            "headers": [(k, v) for k, v in held["headers"]
+                                        if k not in (b"content-length", b"content-type", b"content-encoding")]})
+                return await send({"type": "http.response.body", "body": b""})
+            await send(held)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best of br/gzip the client accepts (q > 0), preferring br on ties."""
+    if not accept_encoding:
+        return None
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    candidates = [e for e in (("br", "gzip") if brotli is not None else ("gzip",))
+                  if offered.get(e, offered.get("*", 0.0)) > 0]
+    return max(candidates, key=lambda e: offered.get(e, offered.get("*", 0.0)), default=None)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                return await send(message)
+            held, start = start, None
+            headers = MutableHeaders(raw=held["headers"])
+            body = message.get("body", b"")
+            if message.get("more_body", False) or "content-encoding" in headers or len(body) < self.minimum_size:
+                await send(held)
+                return await send(message)
+            if len(body) > OFFLOAD_SIZE:
+                body = await anyio.to_thread.run_sync(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            held["headers"] = headers.raw
+            await send(held)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,19 +1,59 @@
 
-from fastapi import APIRouter, HTTPException, Query
+from __future__ import annotations
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
-from app.schemas.models import BrandContext, ErrorResponse
-from app.services.insights_service import gather_insights, gather_insights_and_persist, competitor_insights
+import datetime
+from typing import TYPE_CHECKING, Optional, List, Literal
+from starlette.concurrency import run_in_threadpool
+from app.core.lazy import lazy_module
+from app.db import get_db
+from app.api.http import etag_for, not_modified
+from app.api.admission import INTERACTIVE, BULK, admit, get_controller
+from app.schemas.models import BrandContext, ErrorResponse, StoredBrand, ProductPage, Policy, SearchResults, PricePoint, PolicyChangeEntry
+from app.services import export
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+# Services (scrapers, extractors, SQLAlchemy, numpy) load on first use so that importing the
+# app, and answering /healthz, stays cheap. See benchmarks/bench_startup.py.
+orm = lazy_module("sqlalchemy.orm")
+analytics = lazy_module("app.services.analytics")
+brand_store = lazy_module("app.services.brand_store")
+insights_service = lazy_module("app.services.insights_service")
+search_service = lazy_module("app.services.search")
+similarity = lazy_module("app.services.similarity")
+snapshots = lazy_module("app.services.snapshots")
 router = APIRouter()
+def _brand_ids(db: Session, brands: Optional[List[str]]) -> Optional[List[int]]:
+    if not brands:
+        return None
+    ids = [brand_store.brand_id_for(db, b) for b in brands]
+    if None in ids:
+        raise HTTPException(status_code=404, detail="Brand not found")
+    return ids
+def _brand_etag(db: Session, domain: str, request: Request, response: Response, with_fetched_at: bool = False) -> Optional[Response]:
+    """Set the ETag derived from the brand's content hash (and crawl time, for bodies that
+    include fetched_at); returns a 304 if the client is current."""
+    version = brand_store.brand_version(db, domain, with_fetched_at)
+    if version is None:
+        return None
+    etag = etag_for(version, request)
+    response.headers["ETag"] = etag
+    return not_modified(request, etag)
 class InsightsRequest(BaseModel):
     website_url: HttpUrl
-@router.post("/insights", response_model=BrandContext, responses={401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
+@router.post("/insights", response_model=BrandContext, responses={401: {"model": ErrorResponse}, 500: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
 async def insights(req: InsightsRequest, persist: Optional[bool] = Query(False, description="Persist results to DB"), mode: Optional[str] = Query('full', description='fast uses lightweight fetch, full uses async scraper')):
     try:
-        if persist:
-            result = await gather_insights_and_persist(str(req.website_url))
-        else:
-            result = await gather_insights(str(req.website_url))
+        url = str(req.website_url)
+        # a shared-cache hit is cheap to serve, so only a crawl has to wait for a slot
+        hit, result = await insights_service.cached_insights(url)
+        if not hit:
+            async with admit(INTERACTIVE):
+                result = await insights_service.gather_insights(url)
+        if persist and result is not None:
+            await insights_service.persist_insights(result)
         if result is None:
             raise HTTPException(status_code=401, detail="Website not found or not a Shopify storefront")
         return result
@@ -21,12 +61,132 @@ async def insights(req: InsightsRequest, persist: Optional[bool] = Query(False,
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {e}")
-@router.post('/competitors', response_model=dict)
-async def competitors(req: InsightsRequest, limit: Optional[int] = Query(3, ge=1, le=10)):
+def _local_competitors(db: Session, website: str, limit: int) -> Optional[dict]:
+    brand_id = brand_store.brand_id_for(db, website)
+    if brand_id is None:
+        return None
+    results = similarity.similar_brands(db, brand_id, limit)
+    return {"source": brand_store.brand_key(website), "engine": "local", "competitors_found": len(results), "results": results}
+@router.post('/competitors', response_model=dict, responses={404: {"model": ErrorResponse}, 503: {"model": ErrorResponse}})
+async def competitors(req: InsightsRequest, limit: Optional[int] = Query(3, ge=1, le=10), live: bool = Query(False, description="Fall back to a live web search (and crawl) when no persisted store is similar"), db: Session = Depends(get_db)):
     try:
-        data = await competitor_insights(str(req.website_url), limit=limit)
+        data = await run_in_threadpool(_local_competitors, db, str(req.website_url), limit)
+        if data is not None and (data["results"] or not live):
+            return data
+        if not live:
+            raise HTTPException(status_code=404, detail="Brand not found; persist it with POST /insights?persist=true or pass live=true")
+        async with admit(BULK):
+            data = await insights_service.competitor_insights(str(req.website_url), limit=limit)
+        data["engine"] = "live"
         return data
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {e}")
+@router.get('/metrics/admission', response_model=dict)
+async def admission_metrics():
+    """Slots in use, queue depth and shed/expired counts per priority class, for this worker."""
+    return get_controller().stats()
+@router.get('/brands/{domain}', response_model=StoredBrand, responses={404: {"model": ErrorResponse}})
+def get_brand(domain: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = _brand_etag(db, domain, request, response, with_fetched_at=True)
+    if cached is not None:
+        return cached
+    brand = brand_store.get_brand(db, domain)
+    if brand is None:
+        raise HTTPException(status_code=404, detail="Brand not found")
+    return brand
+@router.get('/brands/{domain}/products', response_model=ProductPage, responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}})
+def get_brand_products(
+    domain: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=250),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: Literal["id", "title", "-title", "price", "-price"] = Query("id"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    tag: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    cached = _brand_etag(db, domain, request, response)
+    if cached is not None:
+        return cached
+    try:
+        page = brand_store.list_brand_products(db, domain, limit=limit, cursor=cursor, sort=sort, min_price=min_price, max_price=max_price, tag=tag)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Brand not found")
+    return page
+@router.get('/brands/{domain}/policies', response_model=List[Policy], responses={404: {"model": ErrorResponse}})
+def get_brand_policies(domain: str, request: Request, response: Response, type: Optional[str] = Query(None), db: Session = Depends(get_db)):
+    cached = _brand_etag(db, domain, request, response)
+    if cached is not None:
+        return cached
+    policies = brand_store.get_brand_policies(db, domain, type=type)
+    if policies is None:
+        raise HTTPException(status_code=404, detail="Brand not found")
+    return policies
+@router.get('/search', response_model=SearchResults, responses={404: {"model": ErrorResponse}})
+def search(
+    q: str = Query(..., min_length=1, description="Free-text query"),
+    kind: Optional[List[Literal["products", "policies", "faqs"]]] = Query(None, description="Restrict to these indexes; hits are grouped by kind in this order"),
+    brand: Optional[str] = Query(None, description="Restrict to one brand domain"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    db: Session = Depends(get_db),
+):
+    brand_id = None
+    if brand:
+        brand_id = brand_store.brand_id_for(db, brand)
+        if brand_id is None:
+            raise HTTPException(status_code=404, detail="Brand not found")
+    return search_service.search(db, q, kinds=kind, brand_id=brand_id, limit=limit, offset=offset)
+@router.get('/brands/{domain}/history/products/{handle}', response_model=List[PricePoint], responses={404: {"model": ErrorResponse}})
+def get_price_history(domain: str, handle: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    cached = _brand_etag(db, domain, request, response)
+    if cached is not None:
+        return cached
+    brand_id = brand_store.brand_id_for(db, domain)
+    if brand_id is None:
+        raise HTTPException(status_code=404, detail="Brand not found")
+    return snapshots.price_history(db, brand_id, handle)
+@router.get('/policy-changes', response_model=List[PolicyChangeEntry])
+def get_policy_changes(
+    type: Optional[str] = Query(None, description="Policy type, e.g. refund"),
+    days: int = Query(7, ge=1, le=365, description="Look-back window"),
+    include_diff: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    return snapshots.policy_changes(db, type=type, since=since, include_diff=include_diff)
+@router.get('/analytics', response_model=dict, responses={404: {"model": ErrorResponse}})
+def get_analytics(
+    brand: Optional[List[str]] = Query(None, description="Brand domains; omit for every persisted brand"),
+    group_by: Optional[Literal["tag", "product_type"]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    brand_ids = _brand_ids(db, brand)
+    return analytics.price_analytics(analytics.persisted_columns(db, brand_ids), group_by=group_by)
+@router.get('/export', responses={200: {"content": {m: {} for m in export.EXPORT_FORMATS.values()}}, 400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}})
+def export_catalog(
+    format: Literal["csv", "ndjson", "parquet"] = Query("csv"),
+    brand: Optional[List[str]] = Query(None, description="Brand domains; omit to export every persisted brand"),
+    chunk_size: int = Query(export.DEFAULT_CHUNK_SIZE, ge=100, le=10000),
+    db: Session = Depends(get_db),
+):
+    brand_ids = _brand_ids(db, brand)
+    # the stream outlives this request scope, so it gets its own session
+    stream_db = orm.Session(bind=db.get_bind())
+    try:
+        media_type, body = export.export_stream(stream_db, format, brand_ids, chunk_size)
+    except ValueError as e:
+        stream_db.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    def stream():
+        try:
+            yield from body
+        finally:
+            stream_db.close()
+    return StreamingResponse(stream(), media_type=media_type, headers={"Content-Disposition": f'attachment; filename="catalog.{format}"'})
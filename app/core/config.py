@@ -1,11 +1,38 @@
 from pydantic_settings import BaseSettings
 from pydantic import HttpUrl
+from typing import Optional
 
 class Settings(BaseSettings):
     INSIGHTS_USER_AGENT: str = "ShopifyInsightsBot/1.0 (+https://example.com)"
     INSIGHTS_TIMEOUT: float = 20.0
     INSIGHTS_MAX_CONCURRENCY: int = 8
     INSIGHTS_MAX_PRODUCTS: int = 2000  # safety cap
+    INSIGHTS_MAX_BODY_BYTES: int = 5_000_000  # HTML/text responses
+    INSIGHTS_MAX_JSON_BYTES: int = 40_000_000  # one products.json page, parsed incrementally
+    INSIGHTS_MAX_JSON_ITEM_BYTES: int = 2_000_000  # a single product object inside that page
+    INSIGHTS_RAW_BODY_HTML: bool = True  # keep body_html in Product.raw (responses and products.raw)
+    INSIGHTS_WARMUP: bool = False  # import scrapers/extractors/DB in the background at startup
+    INSIGHTS_HERO_BUDGET: float = 5.0  # seconds for homepage hero lookups outside the catalog
+    INSIGHTS_ARCHIVE_DIR: Optional[str] = None  # record raw responses of every crawl (app/scraping/archive.py)
+    # Deployment (app/core/gunicorn_conf.py)
+    INSIGHTS_BIND: str = "0.0.0.0:8000"
+    INSIGHTS_WORKERS: int = 1
+    INSIGHTS_WORKER_TIMEOUT: int = 120
+    # Shared cross-process state (app/core/shared_state.py); unset disables caching and rate limiting
+    INSIGHTS_SHARED_STATE_PATH: Optional[str] = None
+    INSIGHTS_PAGE_CACHE_TTL: float = 300.0
+    INSIGHTS_RESULT_CACHE_TTL: float = 900.0
+    INSIGHTS_NEGATIVE_CACHE_TTL: float = 120.0  # non-200 pages and non-Shopify sites
+    INSIGHTS_HOST_RATE: float = 5.0  # requests per second per upstream host, across all workers
+    INSIGHTS_HOST_BURST: int = 20
+    INSIGHTS_HOST_MAX_WAIT: float = 10.0  # longer queues for a host fail fast as 429 instead of sleeping
+    # Admission control per worker (app/api/admission.py)
+    INSIGHTS_ADMIT_SLOTS: int = 16  # crawls running at once
+    INSIGHTS_ADMIT_QUEUE: int = 64  # interactive (/insights) requests waiting for a slot
+    INSIGHTS_ADMIT_DEADLINE: float = 10.0  # seconds an interactive request may wait before a 503
+    INSIGHTS_ADMIT_BULK_SLOTS: int = 4  # slots bulk work (live /competitors) may hold
+    INSIGHTS_ADMIT_BULK_QUEUE: int = 8
+    INSIGHTS_ADMIT_BULK_DEADLINE: float = 30.0
     class Config:
         env_file = ".env"
 
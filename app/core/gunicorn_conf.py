@@ -0,0 +1,21 @@
+"""Gunicorn settings driven by `Settings`: ``gunicorn -c python:app.core.gunicorn_conf app.main:app``.
+
+With more than one worker, set INSIGHTS_SHARED_STATE_PATH so caches and per-host rate
+limits are shared instead of multiplied by the worker count.
+"""
+from app.core.config import settings
+
+bind = settings.INSIGHTS_BIND
+workers = max(1, settings.INSIGHTS_WORKERS)
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = settings.INSIGHTS_WORKER_TIMEOUT
+graceful_timeout = 30
+keepalive = 5
+# Workers import the app themselves, so no SQLite connection or event loop crosses a fork.
+preload_app = False
+accesslog = "-"
+
+if settings.INSIGHTS_WORKERS > 1 and not settings.INSIGHTS_SHARED_STATE_PATH:
+    from app.core.logging import log
+    log.warning("shared_state_disabled", workers=workers,
+                hint="set INSIGHTS_SHARED_STATE_PATH to share caches and rate limits between workers")
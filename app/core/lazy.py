@@ -0,0 +1,24 @@
+import importlib
+
+
+class LazyModule:
+    """Module proxy that imports ``name`` on first attribute access.
+
+    Lets a module name its heavy dependencies at the top, like ordinary imports, without
+    loading them at import time. Imports go through ``importlib``, so concurrent first
+    use from the threadpool is serialized by the import lock.
+    """
+    __slots__ = ("_name",)
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
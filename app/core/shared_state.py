@@ -0,0 +1,185 @@
+"""Cross-process caches and per-host rate limiting backed by one SQLite file in WAL mode.
+
+Every worker process opens the same file, so a page fetched, a result computed or a host
+throttled in one worker is visible to all of them. Disabled (``get_store()`` returns None)
+unless ``INSIGHTS_SHARED_STATE_PATH`` is set.
+
+The store is synchronous; async callers use the ``a*`` methods, which run it in a worker
+thread. Lock waits are kept short: when another process holds the file, a cache read is a
+miss, a write is dropped and rate limiting falls back to a per-process bucket.
+"""
+from __future__ import annotations
+import asyncio, os, random, sqlite3, threading, time, zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.logging import log
+
+PAGES, RESULTS, NEGATIVE = "page", "result", "negative"
+BUSY_TIMEOUT = 0.1  # seconds to wait for another process's write lock
+PURGE_CHANCE = 0.01  # fraction of writes that also delete expired entries
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    ns TEXT NOT NULL, key TEXT NOT NULL, value BLOB, expires REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS host_buckets (
+    host TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SharedStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._local: Dict[str, Tuple[float, float]] = {}  # host -> (tokens, updated) while the file is busy
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # ---------- Cache ----------
+    def get(self, ns: str, key: str) -> Optional[bytes]:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM cache WHERE ns = ? AND key = ? AND expires > ?", (ns, key, time.time())
+                ).fetchone()
+        except sqlite3.OperationalError as e:
+            log.warning("shared_state_busy", op="get", error=str(e))
+            return None
+        return zlib.decompress(row[0]) if row else None
+
+    def set(self, ns: str, key: str, value: bytes, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        data = zlib.compress(value, 6)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                    (ns, key, data, time.time() + ttl),
+                )
+        except sqlite3.OperationalError as e:
+            log.warning("shared_state_busy", op="set", error=str(e))
+            return
+        if random.random() < PURGE_CHANCE:
+            self.purge_expired()
+
+    def get_text(self, ns: str, key: str) -> Optional[str]:
+        raw = self.get(ns, key)
+        return raw.decode("utf-8") if raw is not None else None
+
+    def set_text(self, ns: str, key: str, value: str, ttl: float) -> None:
+        self.set(ns, key, value.encode("utf-8"), ttl)
+
+    def purge_expired(self) -> int:
+        try:
+            with self._lock:
+                return self._conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),)).rowcount
+        except sqlite3.OperationalError as e:
+            log.warning("shared_state_busy", op="purge", error=str(e))
+            return 0
+
+    async def aget(self, ns: str, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, ns, key)
+
+    async def aset(self, ns: str, key: str, value: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self.set, ns, key, value, ttl)
+
+    async def aget_text(self, ns: str, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get_text, ns, key)
+
+    async def aset_text(self, ns: str, key: str, value: str, ttl: float) -> None:
+        await asyncio.to_thread(self.set_text, ns, key, value, ttl)
+
+    # ---------- Rate limiting ----------
+    def reserve(self, host: str, rate: float, burst: float, max_wait: float = float("inf")) -> Optional[float]:
+        """Take one token from `host`'s bucket and return how long to wait before using it.
+
+        Tokens refill at `rate` per second up to `burst`. The bucket may go negative: a
+        caller that finds it empty still reserves the next free slot, so concurrent callers
+        in any process are spaced out instead of all retrying at once. A reservation that
+        would wait longer than `max_wait` is refused (None) and leaves the bucket alone.
+        """
+        if rate <= 0:
+            return 0.0
+        return self._update_bucket(host, rate, burst, -1.0, max_wait)
+
+    def refund(self, host: str, rate: float, burst: float) -> None:
+        """Return a token reserved for a request that was never sent."""
+        if rate > 0:
+            self._update_bucket(host, rate, burst, 1.0)
+
+    async def areserve(self, host: str, rate: float, burst: float, max_wait: float = float("inf")) -> Optional[float]:
+        return await asyncio.to_thread(self.reserve, host, rate, burst, max_wait)
+
+    def _update_bucket(self, host: str, rate: float, burst: float, delta: float,
+                       max_wait: float = float("inf")) -> Optional[float]:
+        def apply(row: Optional[Tuple[float, float]], now: float) -> Optional[float]:
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            if tokens + delta < -rate * max_wait:
+                return None
+            return tokens + delta
+
+        with self._lock:
+            now = time.time()
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                log.warning("shared_state_busy", op="reserve", host=host, error=str(e))
+                tokens = apply(self._local.get(host), now)
+                if tokens is not None:
+                    self._local[host] = (tokens, now)
+            else:
+                try:
+                    row = self._conn.execute("SELECT tokens, updated FROM host_buckets WHERE host = ?", (host,)).fetchone()
+                    tokens = apply(row, now)
+                    if tokens is not None:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO host_buckets (host, tokens, updated) VALUES (?, ?, ?)", (host, tokens, now)
+                        )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        if tokens is None:
+            return None
+        return 0.0 if tokens >= 0 else -tokens / rate
+
+
+_store: Optional[Tuple[int, SharedStore]] = None
+_bypassed: ContextVar[bool] = ContextVar("shared_state_bypassed", default=False)
+
+
+@contextmanager
+def bypass():
+    """Ignore the store (caches and rate limits) for the current context and the tasks it
+    starts. Used for archive replay, which must never touch the network or shared state."""
+    token = _bypassed.set(True)
+    try:
+        yield
+    finally:
+        _bypassed.reset(token)
+
+
+def get_store() -> Optional[SharedStore]:
+    """The process-wide store, or None when shared state is not configured.
+
+    Connections are opened per process (keyed by pid) so a store created before a fork is
+    never reused by a child.
+    """
+    global _store
+    path = settings.INSIGHTS_SHARED_STATE_PATH
+    if not path or _bypassed.get():
+        return None
+    if _store is None or _store[0] != os.getpid() or _store[1].path != path:
+        _store = (os.getpid(), SharedStore(path))
+    return _store[1]
@@ -1,10 +1,45 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./insights.db")
-engine = create_engine(DATABASE_URL, echo=False, future=True)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
-Base = declarative_base()
+# SQLAlchemy is imported on first use of `engine`, `SessionLocal` or `Base` (PEP 562),
+# so processes that never touch the DB don't pay for it at startup.
+_LAZY = ("engine", "SessionLocal", "Base")
+_initialized = False
+def _setup():
+    if "engine" in globals():
+        return
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker, declarative_base
+    g = globals()
+    g["engine"] = create_engine(DATABASE_URL, echo=False, future=True)
+    if DATABASE_URL.startswith("sqlite:///") and DATABASE_URL != "sqlite:///:memory:":
+        _sqlite_wal(g["engine"])
+    g["SessionLocal"] = sessionmaker(bind=g["engine"], autocommit=False, autoflush=False)
+    g["Base"] = declarative_base()
+def _sqlite_wal(engine):
+    # several worker processes write to the same file; WAL lets readers run alongside a writer
+    from sqlalchemy import event
+    @event.listens_for(engine, "connect")
+    def _pragmas(conn, _):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+def __getattr__(name):
+    if name in _LAZY:
+        _setup()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 def init_db():
-    from app import models
-    Base.metadata.create_all(bind=engine)
+    global _initialized
+    if _initialized:
+        return
+    _setup()
+    from app import models, migrations
+    from app.services import search  # registers FTS DDL on create_all
+    migrations.upgrade(engine)
+    _initialized = True
+def get_db():
+    init_db()
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,8 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.routes import router
+from app.api.http import JSONResponseClass, ConditionalGetMiddleware, CompressionMiddleware
+from app.core.config import settings
+from app.core.logging import log
 
-app = FastAPI(title="Shopify Insights-Fetcher", version="1.0.0")
+def warm_up():
+    """Import the heavy modules the routes load lazily, so the first real request doesn't pay for them."""
+    import trafilatura, extruct, w3lib.html  # noqa: F401
+    import app.services.insights_service  # noqa: F401
+    import app.scraping.async_scraper  # noqa: F401
+    from app.db import init_db
+    init_db()
+
+def _log_warmup(fut: asyncio.Future) -> None:
+    if fut.cancelled():
+        log.info("warmup_cancelled")
+        return
+    error = fut.exception()
+    log.info("warmup_done", error=str(error) if error else None)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = None
+    if settings.INSIGHTS_WARMUP:
+        # off the event loop and not awaited: /healthz answers while this runs
+        task = asyncio.get_running_loop().run_in_executor(None, warm_up)
+        task.add_done_callback(_log_warmup)
+    yield
+    if task is not None and not task.done():
+        await task
+
+app = FastAPI(title="Shopify Insights-Fetcher", version="1.0.0", lifespan=lifespan, default_response_class=JSONResponseClass)
 app.include_router(router)
+# outermost last: ETags are computed on the uncompressed body
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(CompressionMiddleware)
 
 @app.get("/healthz")
 async def health():
@@ -0,0 +1,124 @@
+"""In-place upgrade of databases created by older versions of the app.
+
+`create_all` only creates missing tables. `upgrade()` runs at startup (from `init_db`) and
+brings tables that already existed up to the current models: missing columns and indexes
+are added, new columns are filled from the data already stored, and policy/FAQ text moves
+from the retired `policies.content_text` / `faqs.answer` columns into `text_blobs`. Every
+step is idempotent, so several workers starting at once are harmless.
+"""
+from __future__ import annotations
+from typing import Dict, Set, Tuple
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+from app.core.logging import log
+from app.db import Base
+
+# (table, retired text column) -> foreign key into text_blobs that replaces it
+LEGACY_TEXT = {("policies", "content_text"): "content_id", ("faqs", "answer"): "answer_id"}
+
+
+def upgrade(engine: Engine) -> None:
+    existed = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        added = _add_missing_columns(conn, existed)
+        for name in existed & set(Base.metadata.tables):
+            for index in Base.metadata.tables[name].indexes:
+                index.create(conn, checkfirst=True)
+        if ("products", "price_value") in added or ("products", "product_type") in added:
+            _backfill_products(conn)
+        if ("brand_vectors", "seq") in added:
+            # any order will do for rows written before seq existed
+            conn.execute(text("UPDATE brand_vectors SET seq = brand_id WHERE seq IS NULL"))
+        if "product_tags" not in existed and "products" in existed:
+            _backfill_product_tags(conn)
+        _move_legacy_text(conn)
+    if "products_fts" not in existed and "brands" in existed and engine.dialect.name == "sqlite":
+        _reindex_search(engine)
+
+
+def _add_missing_columns(conn: Connection, existed: Set[str]) -> Set[Tuple[str, str]]:
+    added = set()
+    insp = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    for name in existed & set(Base.metadata.tables):
+        present = {c["name"] for c in insp.get_columns(name)}
+        for col in Base.metadata.tables[name].columns:
+            if col.name in present:
+                continue
+            ddl = f"ALTER TABLE {quote(name)} ADD COLUMN {quote(col.name)} {col.type.compile(dialect=conn.dialect)}"
+            try:
+                with conn.begin_nested():
+                    conn.execute(text(ddl))
+            except (OperationalError, ProgrammingError):
+                # another worker added it first; that worker also backfills it
+                continue
+            log.info("db_column_added", table=name, column=col.name)
+            added.add((name, col.name))
+    return added
+
+
+def _backfill_products(conn: Connection) -> None:
+    """price_value from the price string and product_type from the raw product JSON."""
+    from app.models import Product
+    values = []
+    for row_id, price, raw in conn.execute(select(Product.id, Product.price, Product.raw)):
+        try:
+            value = float(price) if price is not None else None
+        except ValueError:
+            value = None
+        values.append({"row_id": row_id, "price_value": value, "product_type": (raw or {}).get("product_type") or None})
+    if values:
+        conn.execute(
+            update(Product.__table__).where(Product.id == bindparam("row_id"))
+            .values(price_value=bindparam("price_value"), product_type=bindparam("product_type")),
+            values,
+        )
+
+
+def _backfill_product_tags(conn: Connection) -> None:
+    from app.models import Product, ProductTag
+    rows = []
+    for row_id, brand_id, tags in conn.execute(
+        select(Product.id, Product.brand_id, Product.tags)
+        .where(~select(ProductTag.id).where(ProductTag.product_id == Product.id).exists())
+    ):
+        rows.extend({"brand_id": brand_id, "product_id": row_id, "tag": tag} for tag in dict.fromkeys(tags or []))
+    if rows:
+        conn.execute(ProductTag.__table__.insert(), rows)
+
+
+def _move_legacy_text(conn: Connection) -> None:
+    from app.services.text_blobs import text_hash
+    insp = inspect(conn)
+    for (table, old), new in LEGACY_TEXT.items():
+        if old not in {c["name"] for c in insp.get_columns(table)}:
+            continue
+        rows = conn.execute(text(
+            f"SELECT id, {old} FROM {table} WHERE {new} IS NULL AND {old} IS NOT NULL AND {old} != ''"
+        )).all()
+        if not rows:
+            continue
+        hashes: Dict[str, str] = {text_hash(t): t for _, t in rows}
+        conn.execute(
+            text("INSERT INTO text_blobs (sha256, text) SELECT :h, :t"
+                 " WHERE NOT EXISTS (SELECT 1 FROM text_blobs WHERE sha256 = :h)"),
+            [{"h": h, "t": t} for h, t in hashes.items()],
+        )
+        # the old copy is cleared once it is referenced, so this only ever runs once per row
+        conn.execute(
+            text(f"UPDATE {table} SET {new} = (SELECT id FROM text_blobs WHERE sha256 = :h), {old} = NULL WHERE id = :id"),
+            [{"h": text_hash(t), "id": row_id} for row_id, t in rows],
+        )
+        log.info("db_text_moved", table=table, rows=len(rows), blobs=len(hashes))
+
+
+def _reindex_search(engine: Engine) -> None:
+    from app import models
+    from app.services.search import index_brand
+    with Session(bind=engine) as db:
+        for brand in db.query(models.Brand):
+            index_brand(db, brand.id, brand.products, brand.policies, brand.faqs)
+        db.commit()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Float, Index, Boolean, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db import Base
@@ -10,6 +10,7 @@ class Brand(Base):
     about_text = Column(Text)
     fetched_at = Column(DateTime, default=datetime.utcnow)
     meta = Column(JSON, default={})
+    content_hash = Column(String(64))  # brand_store.brand_content_hash of the last persisted crawl
     products = relationship("Product", back_populates="brand", cascade="delete")
     policies = relationship("Policy", back_populates="brand", cascade="delete")
     faqs = relationship("FAQ", back_populates="brand", cascade="delete")
@@ -23,34 +24,109 @@ class Product(Base):
     url = Column(String(1024))
     images = Column(JSON)
     price = Column(String(64))
+    price_value = Column(Float)  # numeric copy of price for sorting/filtering
     currency = Column(String(16))
+    product_type = Column(String(255))
     sku = Column(JSON)
     tags = Column(JSON)
     variants = Column(JSON)
     raw = Column(JSON)
     brand = relationship("Brand", back_populates="products")
+    __table_args__ = (
+        Index("ix_products_brand_handle", "brand_id", "handle"),
+        Index("ix_products_brand_title", "brand_id", "title", "id"),
+        Index("ix_products_brand_price", "brand_id", "price_value", "id"),
+    )
+class ProductTag(Base):
+    __tablename__ = "product_tags"
+    id = Column(Integer, primary_key=True)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    tag = Column(String(255), nullable=False)
+    __table_args__ = (
+        Index("ix_product_tags_brand_tag", "brand_id", "tag", "product_id"),
+    )
+class TextBlob(Base):
+    """Policy and FAQ text stored once per distinct content (sha256 of the text)."""
+    __tablename__ = "text_blobs"
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), unique=True, nullable=False)
+    text = Column(Text, nullable=False)
 class Policy(Base):
     __tablename__ = "policies"
     id = Column(Integer, primary_key=True, index=True)
     brand_id = Column(Integer, ForeignKey("brands.id"))
     type = Column(String(64))
     url = Column(String(1024))
-    content_text = Column(Text)
+    content_id = Column(Integer, ForeignKey("text_blobs.id"), index=True)
     content_html = Column(Text)
     brand = relationship("Brand", back_populates="policies")
+    content = relationship("TextBlob", lazy="joined")
+    __table_args__ = (Index("ix_policies_brand_type", "brand_id", "type"),)
+    @property
+    def content_text(self):
+        return self.content.text if self.content is not None else None
 class FAQ(Base):
     __tablename__ = "faqs"
     id = Column(Integer, primary_key=True, index=True)
-    brand_id = Column(Integer, ForeignKey("brands.id"))
+    brand_id = Column(Integer, ForeignKey("brands.id"), index=True)
     question = Column(Text)
-    answer = Column(Text)
+    answer_id = Column(Integer, ForeignKey("text_blobs.id"), index=True)
     url = Column(String(1024))
     brand = relationship("Brand", back_populates="faqs")
+    answer_blob = relationship("TextBlob", lazy="joined")
+    @property
+    def answer(self):
+        return self.answer_blob.text if self.answer_blob is not None else None
+class BrandVector(Base):
+    """Feature vector of a brand's catalog for similarity search (app/services/similarity.py)."""
+    __tablename__ = "brand_vectors"
+    brand_id = Column(Integer, ForeignKey("brands.id"), primary_key=True)
+    vector = Column(LargeBinary, nullable=False)  # float32[similarity.DIMS]
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    seq = Column(Integer, index=True)  # max(seq) + 1 at write time; SQLite's single writer makes it commit-ordered
 class Social(Base):
     __tablename__ = "socials"
     id = Column(Integer, primary_key=True, index=True)
-    brand_id = Column(Integer, ForeignKey("brands.id"))
+    brand_id = Column(Integer, ForeignKey("brands.id"), index=True)
     platform = Column(String(64))
     url = Column(String(1024))
     handle = Column(String(255))
     brand = relationship("Brand", back_populates="socials")
+class CrawlSnapshot(Base):
+    __tablename__ = "crawl_snapshots"
+    id = Column(Integer, primary_key=True)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False)
+    crawled_at = Column(DateTime, nullable=False)
+    variant_changes = Column(Integer, default=0)
+    policy_changes = Column(Integer, default=0)
+    delta = Column(LargeBinary)  # zlib-compressed JSON: added/removed product handles
+    __table_args__ = (Index("ix_crawl_snapshots_brand_time", "brand_id", "crawled_at"),)
+class VariantPriceChange(Base):
+    __tablename__ = "variant_price_changes"
+    id = Column(Integer, primary_key=True)
+    snapshot_id = Column(Integer, ForeignKey("crawl_snapshots.id"), nullable=False)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False)
+    handle = Column(String(255), nullable=False)
+    variant_id = Column(String(64), nullable=False)
+    crawled_at = Column(DateTime, nullable=False)
+    change = Column(String(16), nullable=False)  # added | changed | removed
+    price = Column(Float)
+    compare_at_price = Column(Float)
+    available = Column(Boolean)
+    __table_args__ = (Index("ix_variant_price_changes_brand_handle", "brand_id", "handle", "crawled_at"),)
+class PolicyChange(Base):
+    __tablename__ = "policy_changes"
+    id = Column(Integer, primary_key=True)
+    snapshot_id = Column(Integer, ForeignKey("crawl_snapshots.id"), nullable=False)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False)
+    type = Column(String(64), nullable=False)
+    url = Column(String(1024))
+    crawled_at = Column(DateTime, nullable=False)
+    change = Column(String(16), nullable=False)  # added | changed | removed
+    content_hash = Column(String(64))
+    diff = Column(LargeBinary)  # zlib-compressed unified diff against the previous text
+    __table_args__ = (
+        Index("ix_policy_changes_type_time", "type", "crawled_at"),
+        Index("ix_policy_changes_brand_type", "brand_id", "type", "crawled_at"),
+    )
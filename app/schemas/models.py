@@ -60,3 +60,49 @@ class BrandContext(BaseModel):
 class ErrorResponse(BaseModel):
     detail: str
     code: Optional[str] = None
+
+class StoredBrand(BaseModel):
+    website: HttpUrl
+    brand_name: Optional[str] = None
+    about_text: Optional[str] = None
+    fetched_at: Optional[datetime] = None
+    product_count: int = 0
+    policies: List[Policy] = []
+    faqs: List[FAQ] = []
+    socials: List[SocialHandle] = []
+    meta: Dict[str, Any] = {}
+
+class ProductPage(BaseModel):
+    items: List[Product] = []
+    next_cursor: Optional[str] = None
+
+class SearchHit(BaseModel):
+    kind: Literal["products", "policies", "faqs"]
+    id: int
+    brand: str
+    title: Optional[str] = None
+    url: Optional[str] = None
+    snippet: Optional[str] = None
+    score: float = 0.0
+
+class SearchResults(BaseModel):
+    query: str
+    hits: List[SearchHit] = []
+    next_offset: Optional[int] = None
+
+class PricePoint(BaseModel):
+    variant_id: str
+    crawled_at: datetime
+    change: Literal["added", "changed", "removed"]
+    price: Optional[float] = None
+    compare_at_price: Optional[float] = None
+    available: Optional[bool] = None
+
+class PolicyChangeEntry(BaseModel):
+    brand: str
+    type: str
+    url: Optional[str] = None
+    crawled_at: datetime
+    change: Literal["added", "changed", "removed"]
+    content_hash: Optional[str] = None
+    diff: Optional[str] = None
@@ -0,0 +1,224 @@
+"""Raw response archive for record/replay crawls.
+
+Responses are appended zlib-compressed to ``pages.dat`` and indexed by crawl and URL in
+``index.db`` (SQLite), both under ``INSIGHTS_ARCHIVE_DIR``. The archive sits under the
+fetchers as an httpx transport: `RecordingTransport` tees every response body into the
+archive as the fetchers stream it, and `ReplayTransport` serves a recorded crawl with no
+network access, so extractors can be re-run over past crawls. Pages a recording crawl gets
+from the shared page cache instead of the network are archived by the fetchers through
+`active_recorder()`.
+"""
+from __future__ import annotations
+import asyncio, fcntl, json, os, sqlite3, threading, time, zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+import httpx
+from app.core.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    id INTEGER PRIMARY KEY, base TEXT NOT NULL, started_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_crawls_base ON crawls (base, started_at);
+CREATE TABLE IF NOT EXISTS pages (
+    crawl_id INTEGER NOT NULL, url TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL,
+    offset INTEGER NOT NULL, length INTEGER NOT NULL, fetched_at REAL NOT NULL,
+    PRIMARY KEY (crawl_id, url)
+) WITHOUT ROWID;
+"""
+# headers that describe the stored bytes; hop-by-hop and length headers are recomputed
+KEEP_HEADERS = ("content-type", "content-encoding", "location", "etag", "last-modified")
+
+
+class ArchiveMiss(Exception):
+    pass
+
+
+class PageArchive:
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.data_path = os.path.join(directory, "pages.dat")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.db"), timeout=10.0,
+                                   isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    # ---------- Writes ----------
+    def start_crawl(self, base: str, started_at: Optional[float] = None) -> int:
+        with self._lock:
+            return self._db.execute("INSERT INTO crawls (base, started_at) VALUES (?, ?)",
+                                    (base, started_at or time.time())).lastrowid
+
+    def put(self, crawl_id: int, url: str, status: int, headers: List[Tuple[str, str]], body: bytes) -> None:
+        self.put_compressed(crawl_id, url, status, headers, zlib.compress(body, 6))
+
+    def put_compressed(self, crawl_id: int, url: str, status: int, headers: List[Tuple[str, str]], blob: bytes) -> None:
+        """Store a body already zlib-compressed (as `_TeeStream` produces it while streaming)."""
+        with open(self.data_path, "ab") as f:
+            # appends from several processes must not interleave
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(blob)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (crawl_id, url, status, headers, offset, length, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (crawl_id, url, status, json.dumps(headers), offset, len(blob), time.time()),
+            )
+
+    # ---------- Reads ----------
+    def get(self, crawl_id: int, url: str) -> Optional[Tuple[int, List[Tuple[str, str]], bytes]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, headers, offset, length FROM pages WHERE crawl_id = ? AND url = ?", (crawl_id, url)
+            ).fetchone()
+        if row is None:
+            return None
+        status, headers, offset, length = row
+        with open(self.data_path, "rb") as f:
+            f.seek(offset)
+            body = zlib.decompress(f.read(length))
+        return status, [tuple(h) for h in json.loads(headers)], body
+
+    def crawl(self, crawl_id: int) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            return self._db.execute("SELECT base, started_at FROM crawls WHERE id = ?", (crawl_id,)).fetchone()
+
+    def latest_crawl(self, base: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM crawls WHERE base = ? ORDER BY started_at DESC, id DESC LIMIT 1", (base,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def crawls(self, latest_only: bool = True) -> List[Tuple[int, str, float]]:
+        """(crawl_id, base, started_at) for every recorded crawl, or the newest per store."""
+        # SQLite returns the bare columns of the row holding MAX(started_at)
+        sql = ("SELECT id, base, MAX(started_at) FROM crawls GROUP BY base" if latest_only
+               else "SELECT id, base, started_at FROM crawls")
+        with self._lock:
+            return [tuple(r) for r in self._db.execute(f"SELECT * FROM ({sql}) ORDER BY 2, 3")]
+
+    # ---------- Transports ----------
+    def recorder(self, base: str, inner: Optional[httpx.AsyncBaseTransport] = None) -> "RecordingTransport":
+        return RecordingTransport(self, self.start_crawl(base), inner)
+
+    def replayer(self, base: str, crawl_id: Optional[int] = None) -> "ReplayTransport":
+        crawl_id = crawl_id if crawl_id is not None else self.latest_crawl(base)
+        if crawl_id is None:
+            raise ArchiveMiss(f"no archived crawl for {base}")
+        return ReplayTransport(self, crawl_id)
+
+
+class _TeeStream(httpx.AsyncByteStream):
+    """Passes the upstream body through, compressing it chunk by chunk, and archives it once
+    it has been read completely."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_complete):
+        self.stream = stream
+        self.on_complete = on_complete
+        self.compressor = zlib.compressobj(6)
+        self.parts: List[bytes] = []
+        self.complete = False
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.parts.append(self.compressor.compress(chunk))
+            yield chunk
+        self.complete = True
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            blob = b"".join(self.parts) + self.compressor.flush() if self.complete else None
+            self.parts = []
+            await self.on_complete(blob)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, archive: PageArchive, crawl_id: int, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.archive = archive
+        self.crawl_id = crawl_id
+        self.inner = inner or httpx.AsyncHTTPTransport(
+            http2=True, limits=httpx.Limits(max_keepalive_connections=20, max_connections=40))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        if request.method != "GET":
+            return response
+        url, status = str(request.url), response.status_code
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() in KEEP_HEADERS]
+        if response.is_stream_consumed:
+            # in-memory transports hand over an already decoded body
+            await self.record(url, status, [h for h in headers if h[0].lower() != "content-encoding"], response.content)
+            return response
+
+        async def on_complete(blob: Optional[bytes]):
+            # bodies abandoned part-way (size limits) are only kept for non-200 statuses
+            if blob is not None or status != 200:
+                await asyncio.to_thread(self.archive.put_compressed, self.crawl_id, url, status, headers,
+                                        blob if blob is not None else zlib.compress(b""))
+
+        response.stream = _TeeStream(response.stream, on_complete)
+        return response
+
+    async def record(self, url: str, status: int, headers: List[Tuple[str, str]], body: bytes) -> None:
+        await asyncio.to_thread(self.archive.put, self.crawl_id, str(httpx.URL(url)), status, headers, body)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves one recorded crawl; URLs it never fetched answer 404, nothing touches the network."""
+
+    def __init__(self, archive: PageArchive, crawl_id: int):
+        self.archive = archive
+        self.crawl_id = crawl_id
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        hit = self.archive.get(self.crawl_id, str(request.url))
+        if hit is None:
+            return httpx.Response(404, headers={"x-archive-miss": "1"}, request=request)
+        status, headers, body = hit
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+
+_archive: Optional[Tuple[int, PageArchive]] = None
+_recorder: ContextVar[Optional[RecordingTransport]] = ContextVar("archive_recorder", default=None)
+
+
+@contextmanager
+def recording(recorder: RecordingTransport):
+    """Make `recorder` the `active_recorder()` for the current context and the tasks it starts."""
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def active_recorder() -> Optional[RecordingTransport]:
+    return _recorder.get()
+
+
+def get_archive() -> Optional[PageArchive]:
+    """The process-wide archive, or None unless INSIGHTS_ARCHIVE_DIR is set."""
+    global _archive
+    directory = settings.INSIGHTS_ARCHIVE_DIR
+    if not directory:
+        return None
+    if _archive is None or _archive[0] != os.getpid() or _archive[1].directory != directory:
+        _archive = (os.getpid(), PageArchive(directory))
+    return _archive[1]
@@ -1,10 +1,16 @@
-import httpx, re, asyncio
-from bs4 import BeautifulSoup
+import httpx, re, asyncio, json
+from selectolax.parser import HTMLParser
 from urllib.parse import urljoin, urlparse
 from app.schemas.models import Product
 from app.schemas.models import FAQ as FAQModel, SocialHandle as SocialModel, ContactInfo as ContactModel, ImportantLinks as LinksModel
+from app.core.config import settings
+from app.scraping.fetcher import fetch_body, fetch_json_items, first_success
+from app.scraping.catalog import raw_drop_fields
+from app.scraping.links import classify_links
 from app.utils import helpers as helpers_mod
 
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
 class AsyncShopifyScraper:
     def __init__(self, base_url: str, timeout: float = 15.0):
         self.base_url = self._normalize_url(base_url)
@@ -17,69 +23,79 @@ class AsyncShopifyScraper:
     async def fetch(self, path: str):
         url = urljoin(self.base_url + "/", path.lstrip('/'))
         try:
-            r = await self.client.get(url)
-            if r.status_code == 200:
-                return r.text
-            return None
+            _, body = await fetch_body(self.client, url)
+            return body
         except Exception:
             return None
     async def fetch_json(self, path: str):
         url = urljoin(self.base_url + "/", path.lstrip('/'))
         try:
-            r = await self.client.get(url)
-            if r.status_code == 200:
-                return r.json()
+            _, body = await fetch_body(self.client, url, max_bytes=settings.INSIGHTS_MAX_JSON_BYTES)
+            return json.loads(body) if body is not None else None
+        except Exception:
             return None
+    async def fetch_products(self, path: str):
+        url = urljoin(self.base_url + "/", path.lstrip('/'))
+        try:
+            return await fetch_json_items(self.client, url, 'products', self._product_from_json)
         except Exception:
             return None
+    def _product_from_json(self, p):
+        return Product(
+            handle=p.get('handle'),
+            title=p.get('title'),
+            url=urljoin(self.base_url+'/', f"products/{p.get('handle')}") if p.get('handle') else None,
+            images=[img.get('src') for img in (p.get('images') or []) if img.get('src')],
+            price=float((p.get('variants') or [{}])[0].get('price')) if p.get('variants') else None,
+            currency=None,
+            sku=[v.get('sku') for v in (p.get('variants') or []) if v.get('sku')],
+            tags=(p.get('tags') or '').split(',') if p.get('tags') else [],
+            variants=p.get('variants') or [],
+            raw={k: v for k, v in p.items() if k not in raw_drop_fields()}
+        )
     async def close(self):
         await self.client.aclose()
     async def scrape(self):
+        # Every fallback chain runs as a concurrent first-success race (priority order kept),
+        # and the home page, catalog, policy and FAQ groups all start together.
+        groups = [
+            # products via /products.json (with collections fallback)
+            first_success(self.fetch_products('/products.json'), self.fetch_products('/collections/all/products.json'),
+                          accept=lambda r: r is not None),
+            # policies
+            first_success(self.fetch('/policies/privacy-policy'), self.fetch('/policies/privacy'), self.fetch('/pages/privacy')),
+            first_success(self.fetch('/policies/refund-policy'), self.fetch('/policies/refund'), self.fetch('/pages/refund')),
+            first_success(self.fetch('/policies/return-policy'), self.fetch('/policies/return'), self.fetch('/pages/return')),
+            # faqs
+            first_success(self.fetch('/pages/faqs'), self.fetch('/pages/faq'), self.fetch('/pages/help')),
+        ]
+        rest = asyncio.gather(*groups)
         # quick health
         home = await self.fetch('/')
         if not home:
+            rest.cancel()
+            await asyncio.gather(rest, return_exceptions=True)
             await self.close()
             return None
-        # products via /products.json (with collections fallback)
-        products_json = await self.fetch_json('/products.json')
-        if not products_json:
-            products_json = await self.fetch_json('/collections/all/products.json') or {}
-        products = []
-        for p in (products_json.get('products') or []):
-            prod = Product(
-                handle=p.get('handle'),
-                title=p.get('title'),
-                url=urljoin(self.base_url+'/', f"products/{p.get('handle')}") if p.get('handle') else None,
-                images=[img.get('src') for img in (p.get('images') or []) if img.get('src')],
-                price=float((p.get('variants') or [{}])[0].get('price')) if p.get('variants') else None,
-                currency=None,
-                sku=[v.get('sku') for v in (p.get('variants') or []) if v.get('sku')],
-                tags=(p.get('tags') or '').split(',') if p.get('tags') else [],
-                variants=p.get('variants') or [],
-                raw=p
-            )
-            products.append(prod)
+        products, privacy, refund, returns, faq_html = await rest
+        products = products or []
         # hero products from home
-        hero = self._extract_hero_products(home, products)
-        # policies
-        privacy = await self.fetch('/policies/privacy-policy') or await self.fetch('/policies/privacy') or await self.fetch('/pages/privacy')
-        refund = await self.fetch('/policies/refund-policy') or await self.fetch('/policies/refund') or await self.fetch('/pages/refund')
-        returns = await self.fetch('/policies/return-policy') or await self.fetch('/policies/return') or await self.fetch('/pages/return')
-        # faqs
-        faq_html = await self.fetch('/pages/faqs') or await self.fetch('/pages/faq') or await self.fetch('/pages/help')
+        home_tree = HTMLParser(home)
+        hero = self._extract_hero_products(home_tree, products)
         faqs = []
         if faq_html:
             faqs = self._parse_faqs(faq_html)
             faqs = [FAQModel(**f) for f in faqs]
         # socials and contacts
-        socials = helpers_mod.extract_socials(home, self.base_url)
+        anchors = classify_links(home_tree)
+        socials = helpers_mod.extract_socials(home, self.base_url, anchors)
         contacts = helpers_mod.extract_contacts(home, self.base_url, None)
-        links = helpers_mod.extract_important_links(home, self.base_url)
+        links = helpers_mod.extract_important_links(home, self.base_url, anchors)
         # about and brand name
-        about = helpers_mod.extract_about_text(home) or None
-        brand_name = helpers_mod.extract_brand_name_from_ld(home, self.base_url + '/')
+        about = helpers_mod.extract_about_text(home, tree=home_tree) or None
+        brand_name = helpers_mod.extract_brand_name_from_ld(home, self.base_url + '/', tree=home_tree)
         # seo meta
-        seo = self._extract_seo(home)
+        seo = self._extract_seo(home_tree)
         # price insights
         price = self._price_insights(products)
         await self.close()
@@ -97,14 +113,29 @@ class AsyncShopifyScraper:
             'seo': seo,
             'price_insights': price
         }
+    # Documents are parsed once with selectolax and the tree is shared by every extractor
+    # that reads it; the extractors also accept raw HTML. Outputs match the previous
+    # BeautifulSoup('html.parser') implementation (tests/test_async_scraper_parity.py).
+    @staticmethod
+    def _tree(doc):
+        return doc if isinstance(doc, HTMLParser) else HTMLParser(doc or '')
+    @staticmethod
+    def _strings(tree):
+        # BeautifulSoup.get_text(strip=True) semantics: stripped, non-empty text nodes in
+        # document order, skipping script/style/template contents and comments.
+        for node in tree.root.traverse(include_text=True):
+            if node.tag == '-text' and node.parent is not None and node.parent.tag not in NON_TEXT_TAGS:
+                text = node.text_content.strip()
+                if text:
+                    yield text
     def _extract_hero_products(self, home_html, product_objs):
-        soup = BeautifulSoup(home_html, 'html.parser')
+        tree = self._tree(home_html)
         hero = []
         handles = {p.handle for p in product_objs if p.handle}
-        for a in soup.find_all('a', href=True):
-            m = re.match(r"/products/([^/]+)", a['href'])
+        for a in tree.css('a[href]'):
+            m = re.match(r"/products/([^/]+)", a.attributes.get('href') or '')
             if m and m.group(1) in handles:
-                hero.append({'handle': m.group(1), 'title': a.get_text(strip=True)})
+                hero.append({'handle': m.group(1), 'title': a.text(strip=True)})
         # dedupe
         seen = set(); out = []
         for h in hero:
@@ -113,52 +144,46 @@ class AsyncShopifyScraper:
                 out.append(h); seen.add(k)
         return out[:12]
     def _parse_faqs(self, html):
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = self._tree(html)
         faqs = []
-        for q in soup.find_all(['h2','h3','strong']):
-            question = q.get_text(strip=True)
-            nxt = q.find_next_sibling('p')
-            answer = nxt.get_text(strip=True) if nxt else ''
+        for q in tree.root.traverse():
+            if q.tag not in ('h2', 'h3', 'strong'):
+                continue
+            question = q.text(strip=True)
+            nxt = q.next
+            while nxt is not None and nxt.tag != 'p':
+                nxt = nxt.next
+            answer = nxt.text(strip=True) if nxt is not None else ''
             if len(question)>3 and len(answer)>3:
                 faqs.append({'question': question, 'answer': answer, 'url': None})
         if not faqs:
-            text = soup.get_text('\n', strip=True)
+            text = '\n'.join(self._strings(tree))
             for m in re.finditer(r'Q[:\)]\s*(.+?)\nA[:\)]\s*(.+?)(?=\nQ[:\)]|\Z)', text, re.DOTALL|re.I):
                 faqs.append({'question': m.group(1).strip(), 'answer': m.group(2).strip(), 'url': None})
         return faqs
     def _extract_seo(self, html):
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = self._tree(html)
         meta = {}
-        if soup.title and soup.title.string:
-            meta['title'] = soup.title.string.strip()
-        desc = soup.find('meta', attrs={'name':'description'}) or soup.find('meta', attrs={'property':'og:description'})
-        if desc and desc.get('content'):
-            meta['description'] = desc.get('content').strip()
+        title = tree.css_first('title')
+        if title is not None and title.text():
+            meta['title'] = title.text().strip()
+        desc_name = desc_og = None
         og = {}
-        for tag in soup.find_all('meta'):
-            if tag.get('property','').startswith('og:') or tag.get('name','').startswith('twitter:'):
-                og_key = tag.get('property') or tag.get('name')
-                og[og_key] = tag.get('content')
+        for tag in tree.css('meta'):
+            attrs = tag.attributes
+            name, prop = attrs.get('name') or '', attrs.get('property') or ''
+            if desc_name is None and name == 'description':
+                desc_name = tag
+            if desc_og is None and prop == 'og:description':
+                desc_og = tag
+            if prop.startswith('og:') or name.startswith('twitter:'):
+                og[prop or name] = attrs.get('content')
+        desc = desc_name or desc_og
+        if desc is not None and desc.attributes.get('content'):
+            meta['description'] = desc.attributes.get('content').strip()
         meta['og'] = og
         return meta
     def _price_insights(self, products):
-        prices = [p.price for p in products if p.price is not None]
-        variants = sum(len(p.variants) for p in products)
-        if not prices:
-            return {}
-        avg = sum(prices)/len(prices)
-        maxp = max(prices); minp = min(prices)
-        # compute discount if variant contains compare_at_price
-        discounts = []
-        for p in products:
-            for v in (p.variants or []):
-                try:
-                    cp = float(v.get('compare_at_price')) if v.get('compare_at_price') else None
-                    price = float(v.get('price')) if v.get('price') else None
-                    if cp and price and cp>price:
-                        discounts.append(((cp-price)/cp)*100)
-                except Exception:
-                    continue
-        avg_discount = sum(discounts)/len(discounts) if discounts else 0.0
-        on_sale = len(discounts)
-        return {'average_price': avg, 'min_price': minp, 'max_price': maxp, 'avg_discount_pct': round(avg_discount,2), 'products_on_sale': on_sale, 'total_products': len(products), 'total_variants': variants}
+        # numpy-backed; imported here so importing the scraper stays cheap
+        from app.services.analytics import CatalogColumns, legacy_price_insights
+        return legacy_price_insights(CatalogColumns(products))
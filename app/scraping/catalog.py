@@ -0,0 +1,127 @@
+"""Compact in-memory catalog used while a crawl is in flight.
+
+`fetch_all_products` keeps one `ProductRecord` per product instead of a pydantic
+`Product` plus its variant dicts plus the raw Shopify dict. Records use ``__slots__``,
+variants are slotted records too, and repeated strings (tags, vendors, product types,
+variant titles, raw field names) are interned so a catalog shares one copy of each.
+Pydantic `Product` models are only built at the response edge (`to_products`).
+"""
+from __future__ import annotations
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from app.core.config import settings
+from app.schemas.models import Product
+
+# Shopify fields dropped from Product.raw because they are materialized on the record itself
+RAW_DROP_FIELDS = ("variants", "images")
+
+_intern = sys.intern
+MAX_LAYOUTS = 1024
+_layouts: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _istr(v: Any) -> Any:
+    return _intern(v) if type(v) is str else v
+
+
+def raw_drop_fields() -> Tuple[str, ...]:
+    """RAW_DROP_FIELDS, plus body_html when INSIGHTS_RAW_BODY_HTML is off."""
+    return RAW_DROP_FIELDS if settings.INSIGHTS_RAW_BODY_HTML else RAW_DROP_FIELDS + ("body_html",)
+
+
+def _float(x) -> Optional[float]:
+    try:
+        return float(x)
+    except Exception:
+        return None
+
+
+def _tags(value) -> Tuple[str, ...]:
+    if isinstance(value, list):
+        return tuple(_istr(t) for t in value)
+    if isinstance(value, str):
+        return tuple(_intern(t.strip()) for t in value.split(",") if t.strip())
+    return ()
+
+
+class VariantRecord:
+    __slots__ = ("id", "title", "price", "compare_at_price", "available", "sku")
+    FIELDS = __slots__
+
+    def __init__(self, v: Dict[str, Any]):
+        self.id = v.get("id")
+        self.title = _istr(v.get("title"))
+        self.price = _float(v.get("price"))
+        self.compare_at_price = _float(v.get("compare_at_price"))
+        self.available = v.get("available")
+        self.sku = v.get("sku")
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Dict-style read access, so code written against variant dicts works unchanged."""
+        return getattr(self, name, default) if name in self.FIELDS else default
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {f: getattr(self, f) for f in self.FIELDS}
+
+
+class ProductRecord:
+    __slots__ = ("handle", "title", "url", "images", "tags", "product_type", "vendor", "variants",
+                 "_raw_keys", "_raw_values")
+
+    def __init__(self, base: str, p: Dict[str, Any]):
+        handle = p.get("handle")
+        self.handle = handle
+        self.title = p.get("title")
+        self.url = urljoin(base, f"/products/{handle or ''}")
+        self.images = tuple(img.get("src") for img in (p.get("images") or []) if img.get("src"))
+        self.tags = _tags(p.get("tags"))
+        self.product_type = _istr(p.get("product_type")) or None
+        self.vendor = _istr(p.get("vendor")) or None
+        self.variants = tuple(VariantRecord(v) for v in (p.get("variants") or []))
+        drop = raw_drop_fields()
+        keys = tuple(k for k in p if k not in drop)
+        # products of one store share a handful of field layouts; keep one tuple per layout
+        layout = _layouts.get(keys)
+        if layout is None:
+            layout = tuple(_intern(k) for k in keys)
+            if len(_layouts) < MAX_LAYOUTS:
+                _layouts[layout] = layout
+        self._raw_keys = layout
+        self._raw_values = tuple(_istr(p[k]) for k in keys)
+
+    @property
+    def price(self) -> Optional[float]:
+        return self.variants[0].price if self.variants else None
+
+    @property
+    def sku(self) -> List[str]:
+        return [v.sku for v in self.variants if v.sku]
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        return dict(zip(self._raw_keys, self._raw_values))
+
+    def to_product(self) -> Product:
+        return Product(
+            handle=self.handle,
+            title=self.title,
+            url=self.url,
+            images=list(self.images),
+            price=self.price,
+            currency=None,
+            sku=self.sku,
+            tags=list(self.tags),
+            variants=[v.as_dict() for v in self.variants],
+            raw=self.raw,
+        )
+
+
+def to_products(records: List[ProductRecord]) -> List[Product]:
+    """Build the response models, emptying `records` as it goes: each record is released as
+    soon as its `Product` exists, so the catalog is never held in both forms at once."""
+    records.reverse()
+    out = []
+    while records:
+        out.append(records.pop().to_product())
+    return out
@@ -1,9 +1,11 @@
 from __future__ import annotations
 import re, asyncio
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 from urllib.parse import urljoin
 import httpx
 from selectolax.parser import HTMLParser
+from app.scraping.fetcher import fetch_body
+from app.scraping.links import Anchor, absolute_url, classify_links, first_labelled, keyword_classifier
 
 POLICY_CANDIDATES = [
     ("privacy", ["privacy-policy","privacy","policies/privacy-policy"]),
@@ -12,36 +14,39 @@ POLICY_CANDIDATES = [
     ("shipping", ["shipping-policy","shipping","delivery"]),
     ("terms", ["terms-of-service","terms","tos"]),
 ]
+FAQ_KEYWORDS = ["faq","faqs","help","support","returns","shipping"]
+ABOUT_KEYWORDS = ["about","about-us","our-story"]
+CONTACT_KEYWORDS = ["contact","contact-us","support","help"]
 
 def find_links_by_keywords(html: str, base: str, keywords: List[str]) -> List[str]:
-    tree = HTMLParser(html)
-    links = []
-    for a in tree.css("a[href]"):
-        href = a.attributes.get("href","")
-        text = (a.text() or "").lower()
-        for kw in keywords:
-            if kw in href.lower() or kw in text:
-                links.append(urljoin(base, href))
-    return list(dict.fromkeys(links))
+    anchors = keyword_classifier(tuple(keywords)).classify(html)
+    return _labelled_links(anchors, base, "match")
+
+def _labelled_links(anchors: Sequence[Anchor], base: str, label: str) -> List[str]:
+    # "help@..." mailto links match the FAQ keywords but cannot be fetched
+    urls = (absolute_url(base, a.href) for a in anchors if label in a.labels)
+    return list(dict.fromkeys(u for u in urls if u.startswith(("http://", "https://"))))
 
 async def fetch_text(client: httpx.AsyncClient, url: str) -> str:
-    r = await client.get(url, follow_redirects=True)
-    r.raise_for_status()
-    return r.text
+    status, body = await fetch_body(client, url)
+    if body is None:
+        raise httpx.HTTPError(f"GET {url} failed with status {status} or exceeded the size limit")
+    return body
 
 async def discover_sitemaps(client: httpx.AsyncClient, base: str) -> List[str]:
     candidates = ["/sitemap.xml", "/sitemap_index.xml"]
     sitemaps = []
     for c in candidates:
         try:
-            r = await client.get(base + c, follow_redirects=True)
-            if r.status_code == 200 and ("<urlset" in r.text or "<sitemapindex" in r.text):
+            status, body = await fetch_body(client, base + c)
+            if body and ("<urlset" in body or "<sitemapindex" in body):
                 sitemaps.append(base + c)
         except Exception:
             pass
     return sitemaps
 
-async def discover_policy_urls(client: httpx.AsyncClient, base: str, home_html: str) -> List[Tuple[str,str]]:
+async def discover_policy_urls(client: httpx.AsyncClient, base: str, home_html: str,
+                              anchors: Optional[Sequence[Anchor]] = None) -> List[Tuple[str,str]]:
     found = []
     # First, try canonical Shopify policy routes
     canonical = [
@@ -49,15 +54,15 @@ async def discover_policy_urls(client: httpx.AsyncClient, base: str, home_html:
     ]
     for t, url in canonical:
         try:
-            r = await client.get(url, follow_redirects=True)
-            if r.status_code == 200 and len(r.text) > 400:
+            status, body = await fetch_body(client, url)
+            if body and len(body) > 400:
                 found.append((t, url))
         except Exception:
             pass
     # Next, scan home page footer/header
+    anchors = anchors if anchors is not None else classify_links(home_html)
     for t, slugs in POLICY_CANDIDATES:
-        links = find_links_by_keywords(home_html, base, slugs)
-        for l in links:
+        for l in _labelled_links(anchors, base, f"policy:{t}"):
             if (t,l) not in found:
                 found.append((t,l))
     return found
@@ -72,21 +77,25 @@ def extract_product_links_from_home(home_html: str, base: str, limit: int = 24)
     deduped = list(dict.fromkeys(links))
     return deduped[:limit]
 
-async def discover_faq_urls(client: httpx.AsyncClient, base: str, home_html: str) -> List[str]:
-    keywords = ["faq","faqs","help","support","returns","shipping"]
-    links = find_links_by_keywords(home_html, base, keywords)
-    return links[:8]
+async def discover_faq_urls(client: httpx.AsyncClient, base: str, home_html: str,
+                           anchors: Optional[Sequence[Anchor]] = None) -> List[str]:
+    anchors = anchors if anchors is not None else classify_links(home_html)
+    return _labelled_links(anchors, base, "faq")[:8]
 
-async def discover_about_url(client: httpx.AsyncClient, base: str, home_html: str) -> Optional[str]:
-    for kw in ["about","about-us","our-story"]:
-        links = find_links_by_keywords(home_html, base, [kw])
-        if links:
-            return links[0]
+async def discover_about_url(client: httpx.AsyncClient, base: str, home_html: str,
+                            anchors: Optional[Sequence[Anchor]] = None) -> Optional[str]:
+    anchors = anchors if anchors is not None else classify_links(home_html)
+    for kw in ABOUT_KEYWORDS:
+        a = first_labelled(anchors, f"about:{kw}")
+        if a:
+            return absolute_url(base, a.href)
     return None
 
-async def discover_contact_url(client: httpx.AsyncClient, base: str, home_html: str) -> Optional[str]:
-    for kw in ["contact","contact-us","support","help"]:
-        links = find_links_by_keywords(home_html, base, [kw])
-        if links:
-            return links[0]
+async def discover_contact_url(client: httpx.AsyncClient, base: str, home_html: str,
+                              anchors: Optional[Sequence[Anchor]] = None) -> Optional[str]:
+    anchors = anchors if anchors is not None else classify_links(home_html)
+    for kw in CONTACT_KEYWORDS:
+        a = first_labelled(anchors, f"contact:{kw}")
+        if a:
+            return absolute_url(base, a.href)
     return None
@@ -0,0 +1,75 @@
+"""Memo of text extraction results keyed by a normalized hash of the fetched HTML.
+
+Storefronts on the same theme (or the same page served under several URLs) return HTML
+that differs only in scripts, nonces, CSRF tokens and whitespace; none of that changes
+what trafilatura extracts. Results are kept in a small per-process LRU and, when shared
+state is configured, in the cross-process store so every worker benefits.
+"""
+from __future__ import annotations
+import hashlib, re, threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from app.core.config import settings
+from app.core.shared_state import get_store
+
+EXTRACTIONS = "extract"
+MEMO_VERSION = 1  # bump when an extractor changes so shared results from older code are ignored
+MEMO_SIZE = 512
+_NOISE = re.compile(
+    rb"<script\b.*?</script\s*>|<style\b.*?</style\s*>|<!--.*?-->"
+    rb"|\s(?:nonce|integrity|data-csrf[\w-]*|csrf[\w-]*)=(?:\"[^\"]*\"|'[^']*')",
+    re.I | re.S,
+)
+_SPACE = re.compile(rb"\s+")
+_MISSING = "\x00"  # stored for documents the extractor found nothing in
+
+_memo: "OrderedDict[str, Optional[str]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def content_hash(html: str) -> str:
+    data = _NOISE.sub(b"", html.encode("utf-8", "replace"))
+    return hashlib.blake2b(_SPACE.sub(b" ", data).strip(), digest_size=20).hexdigest()
+
+
+async def amemoized_extract(kind: str, html: str, extract: Callable[[str], Optional[str]]) -> Optional[str]:
+    """Return ``extract(html)``, reusing the result for any document with the same content hash.
+    Shared-store reads and writes run off the event loop."""
+    key = _key(kind, html)
+    hit, text = _local(key)
+    if hit:
+        return text
+    store = get_store()
+    cached = await store.aget_text(EXTRACTIONS, key) if store is not None else None
+    if cached is not None:
+        text = None if cached == _MISSING else cached
+    else:
+        text = extract(html)
+        if store is not None:
+            await store.aset_text(EXTRACTIONS, key, _MISSING if text is None else text, settings.INSIGHTS_RESULT_CACHE_TTL)
+    return _remember(key, text)
+
+
+def _key(kind: str, html: str) -> str:
+    return f"v{MEMO_VERSION}:{kind}:{content_hash(html)}"
+
+
+def _local(key: str) -> Tuple[bool, Optional[str]]:
+    with _lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return True, _memo[key]
+    return False, None
+
+
+def _remember(key: str, text: Optional[str]) -> Optional[str]:
+    with _lock:
+        _memo[key] = text
+        if len(_memo) > MEMO_SIZE:
+            _memo.popitem(last=False)
+    return text
+
+
+def clear_memo() -> None:
+    with _lock:
+        _memo.clear()
@@ -1,80 +1,65 @@
 from __future__ import annotations
-import re, asyncio, json
-from typing import List, Dict, Any, Optional
-from urllib.parse import urljoin, urlparse
+import re, asyncio, json, functools
+from typing import List, Dict, Any, Optional, Sequence
+from urllib.parse import urljoin, urlparse, quote, unquote
 import httpx
 from selectolax.parser import HTMLParser
-import trafilatura
-import extruct
-from w3lib.html import get_base_url
 from app.schemas.models import Product, Policy, FAQ, SocialHandle, ContactInfo, ImportantLinks
-from bs4 import BeautifulSoup
-
-PRODUCT_PAGE_RE = re.compile(r"/products/[^/]+/?$")
+from app.core.config import settings
+from app.scraping.fetcher import JSONItems, fetch_body, fetch_json_items
+from app.core.logging import log
+from app.scraping.extraction_memo import amemoized_extract
+from app.scraping.links import Anchor, absolute_url, classify_links
+from app.scraping.catalog import ProductRecord
 
 async def fetch_json(client: httpx.AsyncClient, url: str) -> Optional[dict]:
-    r = await client.get(url, follow_redirects=True)
-    if r.status_code == 200:
+    status, body = await fetch_body(client, url, max_bytes=settings.INSIGHTS_MAX_JSON_BYTES)
+    if body is not None:
         try:
-            return r.json()
+            return json.loads(body)
         except Exception:
             return None
     return None
 
 async def fetch_text(client: httpx.AsyncClient, url: str) -> Optional[str]:
-    r = await client.get(url, follow_redirects=True)
-    if r.status_code == 200:
-        return r.text
-    return None
+    status, body = await fetch_body(client, url)
+    return body
 
 # ---------- Products via products.json ----------
-async def fetch_all_products(client: httpx.AsyncClient, base: str, cap: int = 2000) -> List[Product]:
+def product_from_json(base: str, p: dict) -> ProductRecord:
+    return ProductRecord(base, p)
+
+async def fetch_all_products(client: httpx.AsyncClient, base: str, cap: int = 2000) -> JSONItems:
+    """Crawl products.json pages into compact records; call `to_products` at the response edge.
+
+    ``truncated`` is set on the result when a page was cut short by the size limits; paging
+    stops there, since the catalog is known to be incomplete.
+    """
     page = 1
-    out: List[Product] = []
+    out = JSONItems()
     per_page = 250
+    to_product = functools.partial(product_from_json, base)
     while True:
         url = f"{base}/products.json?limit={per_page}&page={page}"
-        r = await client.get(url, follow_redirects=True)
-        if r.status_code != 200:
+        products = await fetch_json_items(client, url, "products", to_product)
+        if products is None:
             # try collections all
             if page == 1:
                 url2 = f"{base}/collections/all/products.json?limit={per_page}&page={page}"
-                r2 = await client.get(url2, follow_redirects=True)
-                if r2.status_code != 200:
+                products = await fetch_json_items(client, url2, "products", to_product)
+                if products is None:
                     break
-                data = r2.json()
             else:
                 break
-        else:
-            data = r.json()
-        products = data.get("products") or []
         if not products:
             break
-        for p in products:
-            urlp = urljoin(base, f"/products/{p.get('handle','')}")
-            variants = []
-            for v in (p.get("variants") or []):
-                variants.append({
-                    "id": v.get("id"),
-                    "title": v.get("title"),
-                    "price": safe_float(v.get("price")),
-                    "available": v.get("available"),
-                    "sku": v.get("sku")
-                })
-            out.append(Product(
-                handle=p.get("handle"),
-                title=p.get("title"),
-                url=urlp,
-                images=[img.get("src") for img in (p.get("images") or []) if img.get("src")],
-                price=safe_float((p.get("variants") or [{}])[0].get("price")) if p.get("variants") else None,
-                currency=None,
-                sku=[v.get("sku") for v in (p.get("variants") or []) if v.get("sku")],
-                tags=ensure_list(p.get("tags")),  # <-- FIXED
-                variants=variants,
-                raw=p
-            ))
-            if len(out) >= cap:
-                return out
+        out.extend(products[:cap - len(out)])
+        if len(out) >= cap:
+            return out
+        if products.truncated:
+            log.warning("catalog_truncated", base=base, page=page, products=len(out))
+            out.truncated = True
+            break
         if len(products) < per_page:
             break
         page += 1
@@ -95,28 +80,80 @@ def safe_float(x):
         return None
 
 # ---------- Hero Products (from home or JSON-LD) ----------
-async def hero_products_from_home(client: httpx.AsyncClient, base: str, home_html: str, catalog: List[Product]) -> List[Product]:
-    links = []
-    tree = HTMLParser(home_html)
-    for a in tree.css("a[href]"):
-        href = a.attributes.get("href","")
-        if PRODUCT_PAGE_RE.search(href):
-            links.append(urljoin(base, href))
-    # map to catalog or scrape minimal info
-    catalog_by_url = {p.url: p for p in catalog if p.url}
+MAX_HEROES = 12
+
+def product_handle(base: str, href: str) -> Optional[str]:
+    """Handle of a same-store product link, ignoring query strings, fragments, locale and
+    collection prefixes (/en-ca/collections/sale/products/<handle>?variant=1)."""
+    parts = urlparse(urljoin(base + "/", href))
+    host = (parts.hostname or "").removeprefix("www.")
+    if host != (urlparse(base).hostname or "").removeprefix("www."):
+        return None
+    segments = [seg for seg in parts.path.split("/") if seg]
+    if len(segments) >= 2 and segments[-2] == "products":
+        return unquote(segments[-1]).lower()
+    return None
+
+async def _hero_from_store(client: httpx.AsyncClient, base: str, handle: str) -> Optional[Product]:
+    # /products/<handle>.json has the products.json shape; the full page is only fetched
+    # when that fails, still within the caller's budget.
+    url = f"{base}/products/{quote(handle)}"
+    return await _hero_from_json(client, base, url + ".json") or await _hero_from_page(client, url)
+
+async def _hero_from_json(client: httpx.AsyncClient, base: str, url: str) -> Optional[Product]:
+    data = await fetch_json(client, url)
+    if isinstance(data, dict) and isinstance(data.get("product"), dict):
+        return ProductRecord(base, data["product"]).to_product()
+    return None
+
+async def _hero_from_page(client: httpx.AsyncClient, url: str) -> Optional[Product]:
+    html = await fetch_text(client, url)
+    if not html:
+        return None
+    tree = HTMLParser(html)
+    h1 = tree.css_first("h1")
+    og = tree.css_first("meta[property='og:title']")
+    title = h1.text(strip=True) if h1 else (og.attributes.get("content") if og else None)
+    return Product(url=url, title=title)
+
+async def hero_products_from_home(client: httpx.AsyncClient, base: str, home_html: str, catalog: List[ProductRecord],
+                                  budget: Optional[float] = None,
+                                  anchors: Optional[Sequence[Anchor]] = None) -> List[Product]:
+    """Products linked from the homepage, in link order.
+
+    Handles found in the catalog cost nothing; the rest are looked up concurrently through
+    their .json endpoint, falling back to the product page only where that fails.
+    Lookups still running after `budget` seconds (default INSIGHTS_HERO_BUDGET) are dropped.
+    """
+    handles = []
+    for a in (anchors if anchors is not None else classify_links(home_html)):
+        h = product_handle(base, a.href)
+        if h:
+            handles.append(h)
+    handles = list(dict.fromkeys(handles))  # preserve order & dedupe
+    by_handle = {r.handle.lower(): r for r in catalog if r.handle}
+    # only look up as many missing handles as could still make the first MAX_HEROES
+    wanted, found = [], 0
+    for h in handles:
+        wanted.append(h)
+        found += h in by_handle
+        if len(wanted) - found >= MAX_HEROES or found >= MAX_HEROES:
+            break
+    lookups = {h: asyncio.ensure_future(_hero_from_store(client, base, h)) for h in wanted if h not in by_handle}
+    if lookups:
+        done, pending = await asyncio.wait(lookups.values(), timeout=settings.INSIGHTS_HERO_BUDGET if budget is None else budget)
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
     heroes: List[Product] = []
-    for u in dict.fromkeys(links):  # preserve order & dedupe
-        if u in catalog_by_url:
-            heroes.append(catalog_by_url[u])
+    for h in wanted:
+        if h in by_handle:
+            heroes.append(by_handle[h].to_product())
         else:
-            # scrape product title from product page quickly
-            html = await fetch_text(client, u)
-            if not html:
-                continue
-            treep = HTMLParser(html)
-            title = (treep.css_first("h1") or treep.css_first("meta[property='og:title']")).text(strip=True) if treep.css_first("h1") else None
-            heroes.append(Product(url=u, title=title))
-        if len(heroes) >= 12:
+            t = lookups[h]
+            if t.done() and not t.cancelled() and t.exception() is None and t.result() is not None:
+                heroes.append(t.result())
+        if len(heroes) >= MAX_HEROES:
             break
     return heroes
 
@@ -126,24 +163,25 @@ async def extract_policy(client: httpx.AsyncClient, url: str, typ: str) -> Optio
     html = await fetch_text(client, url)
     if not html:
         return None
-    
+    return Policy(
+        type=typ,
+        url=url,
+        content_html=None,
+        content_text=await amemoized_extract("policy", html, _policy_text)
+    )
+
+def _policy_text(html: str) -> Optional[str]:
     # Use trafilatura to extract readable text
+    import trafilatura  # heavy; imported on first use
     text = trafilatura.extract(html, include_comments=False, include_tables=False)
     
     # Fallback: if trafilatura fails, strip tags manually
     if not text:
-        from selectolax.parser import HTMLParser
         tree = HTMLParser(html)
         text = tree.text(separator=" ").strip()
         if not text:
             text = None
-    
-    return Policy(
-        type=typ,
-        url=url,
-        content_html=None,
-        content_text=text
-    )
+    return text
 # ---------- FAQs ----------
 def parse_faqs_from_html(html: str, base: str, page_url: str) -> List[dict]:
     tree = HTMLParser(html)
@@ -208,20 +246,18 @@ SOCIAL_DOMAINS = {
     "linkedin": "linkedin.com",
 }
 
-def extract_socials(html: str, base: str) -> List[SocialHandle]:
-    tree = HTMLParser(html)
+def extract_socials(html: str, base: str, anchors: Optional[Sequence[Anchor]] = None) -> List[SocialHandle]:
     found = []
-    for a in tree.css("a[href]"):
-        href = a.attributes.get("href","")
-        for platform, domain in SOCIAL_DOMAINS.items():
-            if domain in href:
+    for a in (anchors if anchors is not None else classify_links(html)):
+        for platform in SOCIAL_DOMAINS:
+            if f"social:{platform}" in a.labels:
                 handle = None
                 try:
-                    path = urlparse(href).path.strip("/")
+                    path = urlparse(a.href).path.strip("/")
                     handle = path.split("/")[0] if path else None
                 except Exception:
                     pass
-                found.append(SocialHandle(platform=platform, url=href, handle=handle))
+                found.append(SocialHandle(platform=platform, url=a.href, handle=handle))
     # dedupe by platform
     out = []
     seen = set()
@@ -256,38 +292,39 @@ def extract_contacts(html: str, base: str, contact_url: Optional[str]) -> Contac
     return ContactInfo(emails=sorted(emails), phones=sorted(phones), addresses=[], contact_page=contact_url)
 
 # ---------- Important Links ----------
-def extract_important_links(html: str, base: str) -> ImportantLinks:
-    tree = HTMLParser(html)
+IMPORTANT_LINK_KEYWORDS = {
+    "order_tracking": ["track", "order-tracking"],
+    "contact_us": ["contact"],
+    "blogs": ["blog", "news", "stories"],
+}
+OTHER_LINK_KEYWORDS = ["return", "size", "policy", "faq"]
+
+def extract_important_links(html: str, base: str, anchors: Optional[Sequence[Anchor]] = None) -> ImportantLinks:
+    anchors = anchors if anchors is not None else classify_links(html)
     links = {"order_tracking": None, "contact_us": None, "blogs": None, "sitemap": None, "others": []}
-    def match_and_set(a, key, kws):
-        href = a.attributes.get("href","")
-        text = (a.text() or "").lower()
-        for kw in kws:
-            if kw in text or kw in href.lower():
-                if not links[key]:
-                    links[key] = urljoin(base, href)
-    for a in tree.css("a[href]"):
-        match_and_set(a, "order_tracking", ["track", "order-tracking"])
-        match_and_set(a, "contact_us", ["contact"])
-        match_and_set(a, "blogs", ["blog", "news", "stories"])
-        if "sitemap" in (a.text() or "").lower() or "sitemap.xml" in a.attributes.get("href","").lower():
-            links["sitemap"] = urljoin(base, a.attributes.get("href",""))
+    for a in anchors:
+        for key in IMPORTANT_LINK_KEYWORDS:
+            if not links[key] and f"link:{key}" in a.labels:
+                links[key] = absolute_url(base, a.href)
+        if "link:sitemap_text" in a.labels or "link:sitemap_href" in a.labels:
+            links["sitemap"] = absolute_url(base, a.href)
     # collect other helpful links (returns, size guide)
-    others = []
-    for a in tree.css("a[href]"):
-        href = a.attributes.get("href","")
-        txt = (a.text() or "").strip()
-        if any(k in href.lower() for k in ["return","size","policy","faq"]):
-            others.append(urljoin(base, href))
+    others = [absolute_url(base, a.href) for a in anchors if "link:other" in a.labels]
     links["others"] = list(dict.fromkeys(others))[:20]
     return ImportantLinks(**links)
 
 # ---------- About Text & Brand Name ----------
-def extract_about_text(html: str) -> Optional[str]:
+async def extract_about_text(html: str) -> Optional[str]:
+    return await amemoized_extract("about", html, _about_text)
+
+def _about_text(html: str) -> Optional[str]:
+    import trafilatura
     text = trafilatura.extract(html, include_comments=False) or None
     return text
 
 def extract_brand_name_from_ld(html: str, url: str) -> Optional[str]:
+    import extruct
+    from w3lib.html import get_base_url
     try:
         data = extruct.extract(html, base_url=get_base_url(html, url), syntaxes=["json-ld"], uniform=True)
         for item in data.get("json-ld") or []:
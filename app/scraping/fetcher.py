@@ -1,8 +1,16 @@
-import asyncio, httpx, tldextract, re
+import asyncio, codecs, httpx, json, re
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Optional, Tuple, List, Callable, Any, Awaitable
 from app.core.config import settings
 from app.core.logging import log
+from app.core.shared_state import PAGES, NEGATIVE, SharedStore, get_store
+from app.scraping.archive import active_recorder
+from urllib.parse import urlsplit
+
+_WS = re.compile(r"[\s,]*")
+
+class BodyTooLarge(Exception):
+    pass
 
 def normalize_url(url: str) -> str:
     url = url.strip()
@@ -11,20 +19,229 @@ def normalize_url(url: str) -> str:
     url = url.rstrip('/')
     return url
 
+def _check_declared_size(r: httpx.Response, limit: int) -> None:
+    declared = r.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise BodyTooLarge(f"{r.url}: content-length {declared} > {limit}")
+
+def _cacheable_miss(status: int) -> bool:
+    # definite client errors only; 408/429 and 5xx are transient
+    return 400 <= status < 500 and status not in (408, 429)
+
+async def _throttle(store: SharedStore, url: str) -> bool:
+    """Wait for the host's rate limit; False if its queue is longer than INSIGHTS_HOST_MAX_WAIT."""
+    host, rate, burst = urlsplit(url).hostname or "", settings.INSIGHTS_HOST_RATE, settings.INSIGHTS_HOST_BURST
+    delay = await store.areserve(host, rate, burst, settings.INSIGHTS_HOST_MAX_WAIT)
+    if delay is None:
+        log.warning("host_rate_limited", url=url)
+        return False
+    if delay > 0:
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # a probe cancelled before it was sent (e.g. by first_success) gives its slot back
+            asyncio.get_running_loop().run_in_executor(None, store.refund, host, rate, burst)
+            raise
+    return True
+
+async def _archive_cached(url: str, status: int, text: Optional[str] = None) -> None:
+    """Archive a shared-cache answer when a recording crawl gets it instead of a network response."""
+    recorder = active_recorder()
+    if recorder is not None:
+        # the cache holds decoded text, so it is archived as UTF-8 whatever the original charset
+        headers = [("content-type", "text/plain; charset=utf-8")] if text is not None else []
+        await recorder.record(url, status, headers, (text or "").encode("utf-8"))
+
+async def fetch_body(client: httpx.AsyncClient, url: str, max_bytes: Optional[int] = None, **kwargs) -> Tuple[int, Optional[str]]:
+    """GET `url` streaming, returning (status, text). Text is None unless status is 200.
+
+    Downloads larger than `max_bytes` are aborted as soon as the limit is known to be
+    exceeded (from Content-Length or while streaming) and return (status, None).
+    With shared state configured, pages and 4xx misses are served from the cross-process
+    cache and every network request waits for the host's rate limit.
+    """
+    limit = max_bytes or settings.INSIGHTS_MAX_BODY_BYTES
+    kwargs.setdefault("follow_redirects", True)
+    store = get_store()
+    if store is not None:
+        text = await store.aget_text(PAGES, url)
+        if text is not None:
+            if len(text) > limit:
+                # cached for a caller with a larger limit; at least this many bytes
+                log.warning("body_too_large", url=url, error=f"cached body exceeds {limit} bytes")
+                return 200, None
+            await _archive_cached(url, 200, text)
+            return 200, text
+        miss = await store.aget_text(NEGATIVE, url)
+        if miss is not None:
+            await _archive_cached(url, int(miss))
+            return int(miss), None
+    if store is not None and not await _throttle(store, url):
+        return 429, None
+    async with client.stream("GET", url, **kwargs) as r:
+        if r.status_code != 200:
+            if store is not None and _cacheable_miss(r.status_code):
+                await store.aset_text(NEGATIVE, url, str(r.status_code), settings.INSIGHTS_NEGATIVE_CACHE_TTL)
+            return r.status_code, None
+        try:
+            _check_declared_size(r, limit)
+            buf = bytearray()
+            async for chunk in r.aiter_bytes():
+                buf += chunk
+                if len(buf) > limit:
+                    raise BodyTooLarge(f"{url}: body exceeds {limit} bytes")
+        except BodyTooLarge as e:
+            log.warning("body_too_large", url=url, error=str(e))
+            return r.status_code, None
+        text = buf.decode(r.encoding or "utf-8", errors="replace")
+    if store is not None and len(buf) <= settings.INSIGHTS_MAX_BODY_BYTES:
+        # bodies only a raised max_bytes allows stay out of the shared cache
+        await store.aset_text(PAGES, url, text, settings.INSIGHTS_PAGE_CACHE_TTL)
+    return 200, text
+
+class JSONItems(list):
+    """Items decoded by `fetch_json_items`; `truncated` is set when the download was cut short."""
+    truncated = False
+
+def _decode_items(decoder: json.JSONDecoder, buf: str, out: List[Any], transform: Callable[[dict], Any]) -> Tuple[bool, str]:
+    """Decode the complete array items at the start of `buf` into `out`.
+
+    Returns (array closed, undecoded rest); the rest starts at an incomplete item.
+    """
+    pos = 0
+    while True:
+        pos = _WS.match(buf, pos).end()
+        if pos >= len(buf):
+            return False, ""
+        if buf[pos] == "]":
+            return True, ""
+        try:
+            item, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            return False, buf[pos:]
+        out.append(transform(item))
+
+async def fetch_json_items(
+    client: httpx.AsyncClient,
+    url: str,
+    key: str,
+    transform: Callable[[dict], Any],
+    max_bytes: Optional[int] = None,
+    max_item_bytes: Optional[int] = None,
+) -> Optional[JSONItems]:
+    """Stream a JSON document shaped like {"<key>": [{...}, ...]} and return transform(item) per element.
+
+    Items are decoded one at a time as bytes arrive, so only the transformed values stay
+    in memory. Returns None on non-200 or when `key` is not found. If the body grows past
+    `max_bytes` (or a single item past `max_item_bytes`), or ends before the array does,
+    the items decoded so far are returned with ``truncated`` set.
+    """
+    limit = max_bytes or settings.INSIGHTS_MAX_JSON_BYTES
+    item_limit = max_item_bytes or settings.INSIGHTS_MAX_JSON_ITEM_BYTES
+    decoder = json.JSONDecoder()
+    out = JSONItems()
+    store = get_store()
+    if store is not None:
+        miss = await store.aget_text(NEGATIVE, url)
+        if miss is not None:
+            await _archive_cached(url, int(miss))
+            return None
+    if store is not None and not await _throttle(store, url):
+        return None
+    async with client.stream("GET", url, follow_redirects=True) as r:
+        if r.status_code != 200:
+            if store is not None and _cacheable_miss(r.status_code):
+                await store.aset_text(NEGATIVE, url, str(r.status_code), settings.INSIGHTS_NEGATIVE_CACHE_TTL)
+            return None
+        text = codecs.getincrementaldecoder(r.encoding or "utf-8")(errors="replace")
+        buf, seen, in_array, retry_at = "", 0, False, 0
+        try:
+            _check_declared_size(r, limit)
+            chunks = r.aiter_bytes()
+            async for chunk in chunks:
+                seen += len(chunk)
+                if seen > limit:
+                    raise BodyTooLarge(f"{url}: body exceeds {limit} bytes")
+                buf += text.decode(chunk)
+                if not in_array:
+                    m = re.search(r'"%s"\s*:\s*\[' % re.escape(key), buf)
+                    if not m:
+                        buf = buf[-(len(key) + 64):]  # keep a tail in case the key straddles chunks
+                        continue
+                    buf, in_array = buf[m.end():], True
+                # an incomplete item is re-parsed from its start, so only retry once the
+                # buffer has doubled: linear rather than quadratic in the item's size
+                if len(buf) < retry_at and len(buf) <= item_limit:
+                    continue
+                closed, buf = _decode_items(decoder, buf, out, transform)
+                if closed:
+                    # read the rest (normally just "}") so the response completes and a
+                    # recording transport archives it
+                    async for chunk in chunks:
+                        seen += len(chunk)
+                        if seen > limit:
+                            break
+                    return out
+                if len(buf) > item_limit:
+                    raise BodyTooLarge(f"{url}: item exceeds {item_limit} bytes")
+                retry_at = 2 * len(buf)
+            if not in_array:
+                return None
+            closed, buf = _decode_items(decoder, buf + text.decode(b"", final=True), out, transform)
+            if closed:
+                return out
+            raise BodyTooLarge(f"{url}: body ended inside the {key!r} array")
+        except BodyTooLarge as e:
+            log.warning("json_items_truncated", url=url, error=str(e), items=len(out))
+            out.truncated = True
+            return out
+
+async def first_success(*aws: Awaitable[Any], accept: Callable[[Any], bool] = bool) -> Any:
+    """Run fallback candidates concurrently and return the highest-priority accepted result.
+
+    Equivalent to `await a or await b or await c` (exceptions count as failures), but all
+    candidates start at once. As soon as a candidate is accepted, every lower-priority one
+    is cancelled; the result is returned once every higher-priority candidate has failed.
+    Returns None if nothing is accepted.
+    """
+    tasks = [asyncio.ensure_future(a) for a in aws]
+    order = {t: i for i, t in enumerate(tasks)}
+    best = None
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                i = order[t]
+                if t.cancelled() or t.exception() is not None or not accept(t.result()):
+                    continue
+                if best is None or i < best:
+                    best = i
+                    for loser in tasks[i + 1:]:
+                        loser.cancel()
+            if best is not None and all(t.done() for t in tasks[:best]):
+                return tasks[best].result()
+        return None
+    finally:
+        for t in tasks:
+            t.cancel()
+        # let cancelled probes unwind (and release their connections) before returning
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 async def is_shopify_like(client: httpx.AsyncClient, base: str) -> bool:
     try:
-        r = await client.get(base + "/", follow_redirects=True, timeout=settings.INSIGHTS_TIMEOUT)
-        if r.status_code >= 400:
+        status, html = await fetch_body(client, base + "/", timeout=settings.INSIGHTS_TIMEOUT)
+        if html is None:
             return False
         # Heuristics: look for cdn.shopify.com assets, theme JS, or Shopify meta tags
-        txt = r.text.lower()
+        txt = html.lower()
         return ("cdn.shopify.com" in txt) or ("myshopify.com" in txt) or ("shopify" in txt and "theme" in txt)
     except Exception:
         return False
 
 @asynccontextmanager
-async def client_ctx():
+async def client_ctx(transport: Optional[httpx.AsyncBaseTransport] = None):
     limits = httpx.Limits(max_keepalive_connections=20, max_connections=40)
     headers = {"User-Agent": settings.INSIGHTS_USER_AGENT, "Accept-Encoding": "gzip, deflate"}
-    async with httpx.AsyncClient(headers=headers, limits=limits, http2=True) as client:
+    async with httpx.AsyncClient(headers=headers, limits=limits, http2=True, transport=transport) as client:
         yield client
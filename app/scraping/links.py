@@ -0,0 +1,124 @@
+from __future__ import annotations
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Sequence, Tuple, Union
+from urllib.parse import urljoin
+from selectolax.parser import HTMLParser
+
+# Anchor fields a rule can look at. Both are matched lower-cased.
+HREF, TEXT, ANY = "href", "text", "any"
+
+
+class Anchor(NamedTuple):
+    href: str
+    text: str
+    labels: FrozenSet[str]
+
+
+class LinkClassifier:
+    """Labels anchors with every category whose keywords occur in their href and/or text.
+
+    All keywords are compiled into one regex of the form ``(?=(kw1|kw2|...))`` with longer
+    keywords first, so a single scan per field finds, at every position, the longest keyword
+    starting there. Each keyword's label set also carries the labels of every keyword it
+    contains ("privacy-policy" implies "privacy"), which makes the scan equivalent to testing
+    each keyword separately.
+    """
+
+    def __init__(self, rules: Dict[str, Tuple[Sequence[str], str]]):
+        self.rules = rules
+        direct: Dict[str, Dict[str, set]] = {HREF: {}, TEXT: {}}
+        for label, (keywords, field) in rules.items():
+            for kw in keywords:
+                kw = kw.lower()
+                for f in ((HREF, TEXT) if field == ANY else (field,)):
+                    direct[f].setdefault(kw, set()).add(label)
+        keywords = sorted(set(direct[HREF]) | set(direct[TEXT]), key=lambda k: (-len(k), k))
+        self.pattern = re.compile("(?=(%s))" % "|".join(map(re.escape, keywords))) if keywords else None
+        self.labels: Dict[str, Dict[str, FrozenSet[str]]] = {}
+        for f in (HREF, TEXT):
+            self.labels[f] = {
+                kw: frozenset(l for sub, ls in direct[f].items() if sub in kw for l in ls)
+                for kw in keywords
+            }
+
+    def labels_for(self, href: str, text: str) -> FrozenSet[str]:
+        if self.pattern is None:
+            return frozenset()
+        out = set()
+        href_labels, text_labels = self.labels[HREF], self.labels[TEXT]
+        for kw in set(self.pattern.findall(href.lower())):
+            out |= href_labels[kw]
+        if text:
+            for kw in set(self.pattern.findall(text.lower())):
+                out |= text_labels[kw]
+        return frozenset(out)
+
+    def classify(self, doc: Union[str, HTMLParser]) -> List[Anchor]:
+        """Labelled anchors of `doc` (HTML text, or an already parsed selectolax tree)."""
+        tree = doc if isinstance(doc, HTMLParser) else HTMLParser(doc or "")
+        out = []
+        for a in tree.css("a[href]"):
+            href = a.attributes.get("href", "") or ""
+            text = a.text() or ""
+            out.append(Anchor(href, text, self.labels_for(href, text)))
+        return out
+
+
+@lru_cache(maxsize=64)
+def keyword_classifier(keywords: Tuple[str, ...]) -> LinkClassifier:
+    return LinkClassifier({"match": (keywords, ANY)})
+
+
+# ---------- Shared rule table ----------
+# Kept in sync with the keyword lists used by discovery/extractors/helpers; every
+# consumer reads its own labels from one classification of the page.
+def build_default_rules() -> Dict[str, Tuple[Sequence[str], str]]:
+    from app.scraping.discovery import POLICY_CANDIDATES, FAQ_KEYWORDS, ABOUT_KEYWORDS, CONTACT_KEYWORDS
+    from app.scraping.extractors import SOCIAL_DOMAINS, IMPORTANT_LINK_KEYWORDS, OTHER_LINK_KEYWORDS
+    rules: Dict[str, Tuple[Sequence[str], str]] = {}
+    for typ, slugs in POLICY_CANDIDATES:
+        rules[f"policy:{typ}"] = (slugs, ANY)
+    rules["faq"] = (FAQ_KEYWORDS, ANY)
+    for kw in ABOUT_KEYWORDS:
+        rules[f"about:{kw}"] = ([kw], ANY)
+    for kw in CONTACT_KEYWORDS:
+        rules[f"contact:{kw}"] = ([kw], ANY)
+    for platform, domain in SOCIAL_DOMAINS.items():
+        rules[f"social:{platform}"] = ([domain], HREF)
+    for key, kws in IMPORTANT_LINK_KEYWORDS.items():
+        rules[f"link:{key}"] = (kws, ANY)
+    rules["link:sitemap_text"] = (["sitemap"], TEXT)
+    rules["link:sitemap_href"] = (["sitemap.xml"], HREF)
+    rules["link:other"] = (OTHER_LINK_KEYWORDS, HREF)
+    # app/utils/helpers.py heuristics
+    rules["helpers:order_href"] = (["order"], HREF)
+    rules["helpers:track_text"] = (["track"], TEXT)
+    rules["helpers:contact_text"] = (["contact", "support"], TEXT)
+    rules["helpers:blog_text"] = (["blog"], TEXT)
+    rules["helpers:sitemap"] = (["sitemap"], ANY)
+    return rules
+
+
+@lru_cache(maxsize=1)
+def default_classifier() -> LinkClassifier:
+    return LinkClassifier(build_default_rules())
+
+
+def classify_links(doc: Union[str, HTMLParser]) -> Tuple[Anchor, ...]:
+    """Classify every anchor of `doc` with the default rules.
+
+    A crawl calls this once for the homepage and passes the anchors to every discovery
+    helper and extractor (their ``anchors`` argument), so the page is parsed and scanned once.
+    """
+    return tuple(default_classifier().classify(doc))
+
+
+@lru_cache(maxsize=4096)
+def absolute_url(base: str, href: str) -> str:
+    """Memoized urljoin; link-heavy pages repeat the same hrefs across labels and sections."""
+    return urljoin(base, href)
+
+
+def first_labelled(anchors: Iterable[Anchor], label: str):
+    return next((a for a in anchors if label in a.labels), None)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+from typing import Optional, List, Dict, Any, Iterable
+import numpy as np
+
+PERCENTILES = (10, 25, 50, 75, 90)
+DISCOUNT_BINS = np.array([0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100.0001])
+MAX_GROUPS = 25
+
+
+def _to_float_array(values: List[Any]) -> np.ndarray:
+    cleaned = [v if v not in (None, "") else "nan" for v in values]
+    try:
+        return np.asarray(cleaned, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.full(len(cleaned), np.nan)
+        for i, v in enumerate(cleaned):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def _field(p, name):
+    return p.get(name) if isinstance(p, dict) else getattr(p, name, None)
+
+
+class CatalogColumns:
+    """Variant-level columns for one or many catalogs.
+
+    `product` maps each variant row to its product index; tags and product types
+    are stored once per product as integer codes into `tag_names` / `type_names`.
+    """
+    __slots__ = ("product", "price", "compare_at", "available", "product_types",
+                 "type_names", "tag_product", "tag_codes", "tag_names", "n_products")
+
+    def __init__(self, products: Iterable[Any]):
+        product_idx, prices, caps, avail = [], [], [], []
+        tag_product, tag_codes, types = [], [], []
+        tag_lookup: Dict[str, int] = {}
+        type_lookup: Dict[str, int] = {}
+        n = 0
+        for n, p in enumerate(products, 1):
+            i = n - 1
+            for v in _field(p, "variants") or []:
+                product_idx.append(i)
+                prices.append(v.get("price"))
+                caps.append(v.get("compare_at_price"))
+                a = v.get("available")
+                avail.append(-1 if a is None else int(bool(a)))
+            for t in dict.fromkeys(_field(p, "tags") or []):
+                tag_product.append(i)
+                tag_codes.append(tag_lookup.setdefault(t, len(tag_lookup)))
+            raw = _field(p, "raw")
+            ptype = _field(p, "product_type") or (raw.get("product_type") if isinstance(raw, dict) else None)
+            types.append(type_lookup.setdefault(ptype, len(type_lookup)) if ptype else -1)
+        self.n_products = n
+        self.product = np.asarray(product_idx, dtype=np.int64)
+        self.price = _to_float_array(prices)
+        self.compare_at = _to_float_array(caps)
+        self.available = np.asarray(avail, dtype=np.int8)
+        self.tag_product = np.asarray(tag_product, dtype=np.int64)
+        self.tag_codes = np.asarray(tag_codes, dtype=np.int64)
+        self.tag_names = list(tag_lookup)
+        self.product_types = np.asarray(types, dtype=np.int64)
+        self.type_names = list(type_lookup)
+
+    def product_prices(self) -> np.ndarray:
+        """Lowest variant price per product (NaN when a product has no priced variant)."""
+        out = np.full(self.n_products, np.inf)
+        np.fmin.at(out, self.product, self.price)
+        out[np.isinf(out)] = np.nan
+        return out
+
+
+def _describe(values: np.ndarray) -> Dict[str, Any]:
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return {"count": 0}
+    pct = np.percentile(values, PERCENTILES)
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 2),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "median": float(pct[2]),
+        "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, pct)},
+    }
+
+
+def _group_bands(group_codes: np.ndarray, values: np.ndarray, names: List[str]) -> List[Dict[str, Any]]:
+    keep = ~np.isnan(values) & (group_codes >= 0)
+    codes, values = group_codes[keep], values[keep]
+    if not codes.size:
+        return []
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, codes.size])
+    medians = (values[starts + (counts - 1) // 2] + values[starts + counts // 2]) / 2
+    mins, maxs = values[starts], values[starts + counts - 1]
+    top = np.argsort(-counts, kind="stable")[:MAX_GROUPS]
+    return [
+        {"group": names[codes[starts[i]]], "products": int(counts[i]), "median": float(medians[i]),
+         "min": float(mins[i]), "max": float(maxs[i])}
+        for i in top
+    ]
+
+
+def price_analytics(cols: CatalogColumns, group_by: Optional[str] = None) -> Dict[str, Any]:
+    price, cap = cols.price, cols.compare_at
+    with np.errstate(invalid="ignore", divide="ignore"):
+        on_sale = (cap > price) & (price > 0)
+        discount = np.where(on_sale, (cap - price) / cap * 100.0, np.nan)
+    discounts = discount[on_sale]
+    hist, _ = np.histogram(discounts, bins=DISCOUNT_BINS)
+    known = cols.available >= 0
+    out: Dict[str, Any] = {
+        "total_products": cols.n_products,
+        "total_variants": int(price.size),
+        "product_prices": _describe(cols.product_prices()),
+        "variant_prices": _describe(price),
+        "discounts": {
+            "variants_on_sale": int(on_sale.sum()),
+            "avg_discount_pct": round(float(discounts.mean()), 2) if discounts.size else 0.0,
+            "median_discount_pct": round(float(np.median(discounts)), 2) if discounts.size else 0.0,
+            "histogram": {f"{int(lo)}-{int(round(hi))}": int(c) for lo, hi, c in zip(DISCOUNT_BINS[:-1], DISCOUNT_BINS[1:], hist)},
+        },
+        "in_stock_ratio": round(float(cols.available[known].mean()), 4) if known.any() else None,
+    }
+    if group_by == "tag":
+        out["price_bands"] = _group_bands(cols.tag_codes, cols.product_prices()[cols.tag_product], cols.tag_names)
+    elif group_by == "product_type":
+        out["price_bands"] = _group_bands(cols.product_types, cols.product_prices(), cols.type_names)
+    return out
+
+
+def legacy_price_insights(cols: CatalogColumns) -> Dict[str, Any]:
+    """The flat summary `AsyncShopifyScraper` has always returned, computed from columns."""
+    _, first = np.unique(cols.product, return_index=True)
+    prices = cols.price[first]
+    prices = prices[~np.isnan(prices)]
+    if not prices.size:
+        return {}
+    stats = price_analytics(cols)
+    return {
+        "average_price": float(prices.mean()),
+        "min_price": float(prices.min()),
+        "max_price": float(prices.max()),
+        "avg_discount_pct": stats["discounts"]["avg_discount_pct"],
+        "products_on_sale": stats["discounts"]["variants_on_sale"],
+        "total_products": cols.n_products,
+        "total_variants": stats["total_variants"],
+        "analytics": stats,
+    }
+
+
+def persisted_columns(db, brand_ids: Optional[List[int]] = None) -> CatalogColumns:
+    from sqlalchemy import select
+    from app import models
+    q = select(models.Product.tags, models.Product.product_type, models.Product.variants)
+    if brand_ids is not None:
+        q = q.where(models.Product.brand_id.in_(brand_ids))
+    return CatalogColumns(db.execute(q.execution_options(yield_per=1000)))
@@ -0,0 +1,268 @@
+from __future__ import annotations
+import base64, datetime, hashlib, json
+from typing import Optional, List, Tuple, Any
+from pydantic import HttpUrl
+from sqlalchemy import and_, or_, select, func
+from sqlalchemy.orm import Session, selectinload, defer
+from app import models
+from app.schemas.models import BrandContext, StoredBrand, ProductPage, Product, Policy, FAQ, SocialHandle
+from app.scraping.fetcher import normalize_url
+from app.services.search import index_brand
+from app.services.similarity import update_brand_vector
+from app.services.snapshots import record_snapshot
+from app.services.text_blobs import intern_texts, prune_blobs, text_hash
+
+PRODUCT_SORTS = {
+    "id": (models.Product.id, False),
+    "title": (models.Product.title, False),
+    "-title": (models.Product.title, True),
+    "price": (models.Product.price_value, False),
+    "-price": (models.Product.price_value, True),
+}
+
+
+def brand_key(website: str) -> str:
+    """Canonical `brands.domain` value for a website url or bare domain."""
+    return str(HttpUrl(normalize_url(str(website))))
+
+
+def brand_content_hash(ctx: BrandContext) -> str:
+    """Hash of everything a crawl found except when it ran, so identical crawls hash alike."""
+    data = ctx.model_dump(mode="json", exclude={"fetched_at"})
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+# ---------- Writes ----------
+def persist_brand_context(db: Session, ctx: BrandContext) -> models.Brand:
+    """Store a crawl, replacing the brand's previous one. A crawl that is already stored
+    (same content hash and fetched_at, e.g. a cached result persisted again) is a no-op."""
+    data = ctx.model_dump(mode="json")
+    domain = brand_key(data["website"])
+    content_hash = brand_content_hash(ctx)
+    brand = db.query(models.Brand).filter(models.Brand.domain == domain).first()
+    if brand is not None and brand.content_hash == content_hash and _same_time(brand.fetched_at, ctx.fetched_at):
+        return brand
+
+    if not brand:
+        brand = models.Brand(domain=domain)
+        db.add(brand)
+    brand.name = ctx.brand_name
+    brand.about_text = ctx.about_text
+    brand.fetched_at = ctx.fetched_at
+    brand.meta = data["meta"]
+    brand.content_hash = content_hash
+    db.flush()
+    record_snapshot(db, brand.id, ctx.fetched_at, data["product_catalog"], data["policies"])
+
+    # replace products (tags first, they reference product rows)
+    db.query(models.ProductTag).filter(models.ProductTag.brand_id == brand.id).delete()
+    db.query(models.Product).filter(models.Product.brand_id == brand.id).delete()
+    rows = []
+    for p in data["product_catalog"]:
+        rows.append(models.Product(
+            brand_id=brand.id,
+            handle=p["handle"],
+            title=p["title"],
+            url=p["url"],
+            images=p["images"],
+            price=str(p["price"]) if p["price"] is not None else None,
+            price_value=p["price"],
+            currency=p["currency"],
+            product_type=(p["raw"] or {}).get("product_type") or None,
+            sku=p["sku"],
+            tags=p["tags"],
+            variants=p["variants"],
+            raw=p["raw"],
+        ))
+    db.add_all(rows)
+    db.flush()
+    db.add_all([
+        models.ProductTag(brand_id=brand.id, product_id=row.id, tag=tag)
+        for row in rows for tag in dict.fromkeys(row.tags or [])
+    ])
+
+    # replace policies, FAQs and socials; policy and answer text is shared through text_blobs
+    old_blobs = set(db.execute(
+        select(models.Policy.content_id).where(models.Policy.brand_id == brand.id)
+        .union(select(models.FAQ.answer_id).where(models.FAQ.brand_id == brand.id))
+    ).scalars())
+    blobs = intern_texts(db, [pol["content_text"] for pol in data["policies"]] + [f["answer"] for f in data["faqs"]])
+    db.query(models.Policy).filter(models.Policy.brand_id == brand.id).delete()
+    policies = [
+        models.Policy(brand_id=brand.id, type=pol["type"], url=pol["url"],
+                      content=blobs.get(text_hash(pol["content_text"])), content_html=pol["content_html"])
+        for pol in data["policies"]
+    ]
+    db.add_all(policies)
+    db.query(models.FAQ).filter(models.FAQ.brand_id == brand.id).delete()
+    faqs = [
+        models.FAQ(brand_id=brand.id, question=f["question"], answer_blob=blobs.get(text_hash(f["answer"])), url=f["url"])
+        for f in data["faqs"]
+    ]
+    db.add_all(faqs)
+    db.query(models.Social).filter(models.Social.brand_id == brand.id).delete()
+    db.add_all([
+        models.Social(brand_id=brand.id, platform=s["platform"], url=s["url"], handle=s["handle"])
+        for s in data["socials"]
+    ])
+    db.flush()
+    prune_blobs(db, old_blobs)
+    index_brand(db, brand.id, rows, policies, faqs)
+    update_brand_vector(db, brand.id, rows, ctx.about_text)
+    db.commit()
+    return brand
+
+
+def _same_time(stored: Optional[datetime.datetime], crawled: datetime.datetime) -> bool:
+    # DateTime columns drop the tzinfo they were given
+    return stored is not None and stored.replace(tzinfo=None) == crawled.replace(tzinfo=None)
+
+
+# ---------- Reads ----------
+def get_brand(db: Session, domain: str) -> Optional[StoredBrand]:
+    brand = db.execute(
+        select(models.Brand)
+        .where(models.Brand.domain == brand_key(domain))
+        .options(
+            selectinload(models.Brand.policies),
+            selectinload(models.Brand.faqs),
+            selectinload(models.Brand.socials),
+        )
+    ).scalar_one_or_none()
+    if brand is None:
+        return None
+    count = db.execute(
+        select(func.count(models.Product.id)).where(models.Product.brand_id == brand.id)
+    ).scalar_one()
+    return StoredBrand(
+        website=brand.domain,
+        brand_name=brand.name,
+        about_text=brand.about_text,
+        fetched_at=brand.fetched_at,
+        product_count=count,
+        policies=[_policy(p) for p in brand.policies],
+        faqs=[FAQ(question=f.question, answer=f.answer, url=f.url) for f in brand.faqs],
+        socials=[SocialHandle(platform=s.platform, url=s.url, handle=s.handle) for s in brand.socials],
+        meta=brand.meta or {},
+    )
+
+
+def get_brand_policies(db: Session, domain: str, type: Optional[str] = None) -> Optional[List[Policy]]:
+    brand_id = brand_id_for(db, domain)
+    if brand_id is None:
+        return None
+    q = select(models.Policy).where(models.Policy.brand_id == brand_id)
+    if type:
+        q = q.where(models.Policy.type == type)
+    return [_policy(p) for p in db.execute(q.order_by(models.Policy.id)).scalars()]
+
+
+def list_brand_products(
+    db: Session,
+    domain: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    tag: Optional[str] = None,
+) -> Optional[ProductPage]:
+    brand_id = brand_id_for(db, domain)
+    if brand_id is None:
+        return None
+    col, desc = PRODUCT_SORTS[sort]
+    q = (
+        select(models.Product)
+        .where(models.Product.brand_id == brand_id)
+        .options(defer(models.Product.raw))
+    )
+    if min_price is not None:
+        q = q.where(models.Product.price_value >= min_price)
+    if max_price is not None:
+        q = q.where(models.Product.price_value <= max_price)
+    if tag:
+        q = q.where(models.Product.id.in_(
+            select(models.ProductTag.product_id).where(
+                models.ProductTag.brand_id == brand_id, models.ProductTag.tag == tag
+            )
+        ))
+    if cursor:
+        q = q.where(_after(col, desc, *decode_cursor(cursor)))
+    id_order = models.Product.id.desc() if desc else models.Product.id.asc()
+    if col is models.Product.id:
+        q = q.order_by(id_order)
+    else:
+        # NULLs always sort last, in either direction
+        q = q.order_by(col.is_(None), col.desc() if desc else col.asc(), id_order)
+    rows = db.execute(q.limit(limit + 1)).scalars().all()
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, col.key), last.id)
+    return ProductPage(items=[_product(p) for p in items], next_cursor=next_cursor)
+
+
+def encode_cursor(value: Any, last_id: int) -> str:
+    raw = json.dumps([value, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return value, int(last_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def _after(col, desc: bool, value: Any, last_id: int):
+    """Keyset predicate for rows strictly after (value, last_id) in the sort order."""
+    pid = models.Product.id
+    id_after = pid < last_id if desc else pid > last_id
+    if col is pid:
+        return id_after
+    if value is None:
+        return and_(col.is_(None), id_after)
+    beyond = col < value if desc else col > value
+    return or_(
+        col.is_(None),
+        and_(col.is_not(None), or_(beyond, and_(col == value, id_after))),
+    )
+
+
+def brand_version(db: Session, domain: str, with_fetched_at: bool = False) -> Optional[str]:
+    """Content hash of the brand's last persisted crawl (None if unknown). With
+    `with_fetched_at`, the crawl time too, for representations that report it."""
+    row = db.execute(
+        select(models.Brand.content_hash, models.Brand.fetched_at).where(models.Brand.domain == brand_key(domain))
+    ).one_or_none()
+    if row is None or row.content_hash is None:
+        return None
+    if with_fetched_at and row.fetched_at is not None:
+        return f"{row.content_hash}|{row.fetched_at.isoformat()}"
+    return row.content_hash
+
+
+def brand_id_for(db: Session, domain: str) -> Optional[int]:
+    return db.execute(
+        select(models.Brand.id).where(models.Brand.domain == brand_key(domain))
+    ).scalar_one_or_none()
+
+
+def _policy(p: models.Policy) -> Policy:
+    return Policy(type=p.type, url=p.url, content_text=p.content_text, content_html=p.content_html)
+
+
+def _product(p: models.Product) -> Product:
+    return Product(
+        handle=p.handle,
+        title=p.title,
+        url=p.url,
+        images=p.images or [],
+        price=p.price_value,
+        currency=p.currency,
+        sku=p.sku or [],
+        tags=p.tags or [],
+        variants=p.variants or [],
+    )
@@ -0,0 +1,136 @@
+from __future__ import annotations
+import csv, io, json
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Iterator, Tuple
+from app.core.lazy import lazy_module
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+# the API imports this module for its formats and defaults; the DB layer loads on first export
+sa = lazy_module("sqlalchemy")
+models = lazy_module("app.models")
+
+EXPORT_COLUMNS = [
+    "brand", "handle", "title", "product_type", "tags", "product_url",
+    "variant_id", "variant_title", "sku", "price", "compare_at_price", "available",
+]
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _num(x) -> Optional[float]:
+    try:
+        return float(x) if x not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_variant_rows(db: Session, brand_ids: Optional[List[int]] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of flattened one-row-per-variant dicts, reading products through a server-side cursor."""
+    q = (
+        sa.select(models.Brand.domain, models.Product.handle, models.Product.title, models.Product.product_type,
+               models.Product.tags, models.Product.url, models.Product.variants)
+        .join(models.Brand, models.Brand.id == models.Product.brand_id)
+        .order_by(models.Product.brand_id, models.Product.id)
+    )
+    if brand_ids is not None:
+        q = q.where(models.Product.brand_id.in_(brand_ids))
+    result = db.execute(q.execution_options(stream_results=True, yield_per=chunk_size))
+    for part in result.partitions():
+        batch = []
+        for domain, handle, title, ptype, tags, url, variants in part:
+            base = {"brand": domain, "handle": handle, "title": title, "product_type": ptype,
+                    "tags": ",".join(tags or []), "product_url": url}
+            for v in variants or [{}]:
+                batch.append({
+                    **base,
+                    "variant_id": str(v["id"]) if v.get("id") is not None else None,
+                    "variant_title": v.get("title"),
+                    "sku": v.get("sku"),
+                    "price": _num(v.get("price")),
+                    "compare_at_price": _num(v.get("compare_at_price")),
+                    "available": v.get("available"),
+                })
+        yield batch
+
+
+def iter_csv(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def iter_ndjson(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch).encode("utf-8")
+
+
+class _DrainSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the caller instead of keeping them."""
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        self.pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.pos
+
+    def drain(self) -> bytes:
+        out = b"".join(self.chunks)
+        self.chunks.clear()
+        return out
+
+
+def iter_parquet(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ("brand", pa.string()), ("handle", pa.string()), ("title", pa.string()),
+        ("product_type", pa.string()), ("tags", pa.string()), ("product_url", pa.string()),
+        ("variant_id", pa.string()), ("variant_title", pa.string()), ("sku", pa.string()),
+        ("price", pa.float64()), ("compare_at_price", pa.float64()), ("available", pa.bool_()),
+    ])
+    sink = _DrainSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def export_stream(db: Session, fmt: str, brand_ids: Optional[List[int]] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[str, Iterator[bytes]]:
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported format: {fmt}")
+    if fmt == "parquet" and not parquet_available():
+        raise ValueError("parquet export requires pyarrow")
+    batches = iter_variant_rows(db, brand_ids, chunk_size)
+    writer = {"csv": iter_csv, "ndjson": iter_ndjson, "parquet": iter_parquet}[fmt]
+    return EXPORT_FORMATS[fmt], writer(batches)
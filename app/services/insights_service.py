@@ -1,10 +1,11 @@
 from __future__ import annotations
 import asyncio, datetime, urllib.parse
-from typing import Optional, List
+from typing import Optional, List, Tuple, Union
 from app.core.config import settings
+from app.core.shared_state import RESULTS, NEGATIVE, get_store, bypass
+from app.scraping.archive import ArchiveMiss, get_archive, recording
 from app.schemas.models import BrandContext
-from app.scraping.fetcher import client_ctx, normalize_url, is_shopify_like
-from app.scraping.async_scraper import AsyncShopifyScraper
+from app.scraping.fetcher import client_ctx, normalize_url, is_shopify_like, fetch_body
 from app.scraping.discovery import (
     discover_policy_urls, discover_faq_urls, discover_about_url, discover_contact_url
 )
@@ -14,28 +15,80 @@ from app.scraping.extractors import (
     extract_contacts, extract_important_links,
     extract_about_text, extract_brand_name_from_ld, fetch_text
 )
-from app.db import SessionLocal, init_db
-from app import models
+from app.scraping.catalog import to_products
+from app.scraping.links import classify_links
+from app.services.analytics import CatalogColumns, price_analytics
 
 
-async def gather_insights(website_url: str) -> Optional[BrandContext]:
+async def gather_insights(website_url: str, replay: Optional[Union[int, str]] = None) -> Optional[BrandContext]:
+    """Crawl a storefront. Results (and "not a Shopify store" answers) are reused from the
+    shared cross-process cache when one is configured.
+
+    With `replay` ("latest" or a crawl id) the crawl runs entirely against the page archive
+    (INSIGHTS_ARCHIVE_DIR): no network, no shared caches, fetched_at of the recorded crawl.
+    """
     base = normalize_url(website_url)
-    async with client_ctx() as client:
+    if replay is not None:
+        archive = get_archive()
+        if archive is None:
+            raise ArchiveMiss("replay needs INSIGHTS_ARCHIVE_DIR")
+        transport = archive.replayer(base, None if replay == "latest" else int(replay))
+        _, started_at = archive.crawl(transport.crawl_id)
+        with bypass():
+            return await _crawl(base, transport, datetime.datetime.fromtimestamp(started_at, datetime.timezone.utc))
+    hit, ctx = await cached_insights(base)
+    if hit:
+        return ctx
+    store = get_store()
+    ctx = await _crawl(base)
+    if store is None:
+        return ctx
+    if ctx is None:
+        await store.aset(NEGATIVE, "insights:" + base, b"1", settings.INSIGHTS_NEGATIVE_CACHE_TTL)
+    else:
+        await store.aset_text(RESULTS, base, ctx.model_dump_json(), settings.INSIGHTS_RESULT_CACHE_TTL)
+    return ctx
+
+
+async def cached_insights(website_url: str) -> Tuple[bool, Optional[BrandContext]]:
+    """Look a site up in the shared result cache without crawling: ``(True, result)`` on a hit,
+    where result is None for a remembered "not a Shopify store", and ``(False, None)`` otherwise."""
+    store = get_store()
+    if store is None:
+        return False, None
+    base = normalize_url(website_url)
+    if await store.aget(NEGATIVE, "insights:" + base) is not None:
+        return True, None
+    cached = await store.aget_text(RESULTS, base)
+    if cached is None:
+        return False, None
+    return True, BrandContext.model_validate_json(cached)
+
+
+async def _crawl(base: str, transport=None, fetched_at: Optional[datetime.datetime] = None) -> Optional[BrandContext]:
+    archive = get_archive() if transport is None else None
+    if archive is not None:
+        # network responses are archived by the transport, shared-cache hits by the fetchers
+        recorder = await asyncio.to_thread(archive.recorder, base)
+        with recording(recorder):
+            return await _crawl(base, recorder, fetched_at)
+    async with client_ctx(transport) as client:
         ok = await is_shopify_like(client, base)
         if not ok:
             return None
 
-        r = await client.get(base + "/", follow_redirects=True, timeout=settings.INSIGHTS_TIMEOUT)
-        home_html = r.text
+        _, home_html = await fetch_body(client, base + "/", timeout=settings.INSIGHTS_TIMEOUT)
+        home_html = home_html or ""
+        anchors = classify_links(home_html)  # parsed once, shared by every helper below
 
         # concurrent tasks
         products_task = asyncio.create_task(
             fetch_all_products(client, base, cap=settings.INSIGHTS_MAX_PRODUCTS)
         )
-        faq_urls_task = asyncio.create_task(discover_faq_urls(client, base, home_html))
-        about_url_task = asyncio.create_task(discover_about_url(client, base, home_html))
-        contact_url_task = asyncio.create_task(discover_contact_url(client, base, home_html))
-        policies_task = asyncio.create_task(discover_policy_urls(client, base, home_html))
+        faq_urls_task = asyncio.create_task(discover_faq_urls(client, base, home_html, anchors))
+        about_url_task = asyncio.create_task(discover_about_url(client, base, home_html, anchors))
+        contact_url_task = asyncio.create_task(discover_contact_url(client, base, home_html, anchors))
+        policies_task = asyncio.create_task(discover_policy_urls(client, base, home_html, anchors))
 
         catalog = await products_task
         faq_urls = await faq_urls_task
@@ -43,7 +96,7 @@ async def gather_insights(website_url: str) -> Optional[BrandContext]:
         contact_url = await contact_url_task
         policy_pairs = await policies_task
 
-        heroes = await hero_products_from_home(client, base, home_html, catalog)
+        heroes = await hero_products_from_home(client, base, home_html, catalog, anchors=anchors)
 
         # extract policies
         policies = []
@@ -53,32 +106,40 @@ async def gather_insights(website_url: str) -> Optional[BrandContext]:
                 policies.append(pol)
 
         faqs = await extract_faqs(client, faq_urls) if faq_urls else []
-        socials = extract_socials(home_html, base)
+        socials = extract_socials(home_html, base, anchors)
         contacts = extract_contacts(home_html, base, contact_url)
-        important_links = extract_important_links(home_html, base)
+        important_links = extract_important_links(home_html, base, anchors)
 
         about_text = None
         brand_name = extract_brand_name_from_ld(home_html, base + "/")
 
         if about_url:
             about_html = await fetch_text(client, about_url) or ""
-            about_text = extract_about_text(about_html) or about_text
+            about_text = await extract_about_text(about_html) or about_text
             brand_name = brand_name or extract_brand_name_from_ld(about_html, about_url)
 
+        # analytics read the records; to_products then consumes them
+        price_insights = price_analytics(CatalogColumns(catalog), group_by="product_type")
         ctx = BrandContext(
             website=base,
             brand_name=brand_name,
             about_text=about_text,
             hero_products=heroes,
-            product_catalog=catalog,
+            product_catalog=to_products(catalog),
             policies=policies,
             faqs=faqs,
             socials=socials,
             contacts=contacts,
             important_links=important_links,
-            fetched_at=datetime.datetime.utcnow(),
-            meta={"source": "shopify-insights-fetcher", "version": "1.0.0"},
+            fetched_at=fetched_at or datetime.datetime.now(datetime.timezone.utc),
+            meta={
+                "source": "shopify-insights-fetcher",
+                "version": "1.0.0",
+                "price_insights": price_insights,
+            },
         )
+        if catalog.truncated:
+            ctx.meta["catalog_truncated"] = True
         return ctx
 
 
@@ -86,101 +147,33 @@ async def gather_insights_and_persist(website_url: str) -> Optional[BrandContext
     ctx = await gather_insights(website_url)
     if ctx is None:
         return None
+    await persist_insights(ctx)
+    return ctx
+
+
+async def persist_insights(ctx: BrandContext) -> None:
+    # serializing, hashing and writing the brand is blocking work; keep it off the event loop
+    await asyncio.to_thread(_persist, ctx)
 
+
+def _persist(ctx: BrandContext) -> None:
+    from app.db import SessionLocal, init_db
+    from app.services.brand_store import persist_brand_context
     init_db()
     db = SessionLocal()
     try:
-        domain = ctx.website
-        brand = db.query(models.Brand).filter(models.Brand.domain == domain).first()
-
-        if not brand:
-            brand = models.Brand(
-                domain=domain,
-                name=ctx.brand_name,
-                about_text=ctx.about_text,
-                fetched_at=ctx.fetched_at,
-                meta=ctx.meta,
-            )
-            db.add(brand)
-            db.commit()
-            db.refresh(brand)
-        else:
-            brand.name = ctx.brand_name
-            brand.about_text = ctx.about_text
-            brand.fetched_at = ctx.fetched_at
-            brand.meta = ctx.meta
-            db.commit()
-
-        # replace products
-        db.query(models.Product).filter(models.Product.brand_id == brand.id).delete()
-        for p in ctx.product_catalog:
-            prod = models.Product(
-                brand_id=brand.id,
-                handle=p.handle,
-                title=p.title,
-                url=str(p.url) if p.url else None,
-                images=p.images,
-                price=str(p.price) if p.price else None,
-                currency=p.currency,
-                sku=p.sku,
-                tags=p.tags,
-                variants=p.variants,
-                raw=p.raw,
-            )
-            db.add(prod)
-        db.commit()
-
-        # replace policies
-        db.query(models.Policy).filter(models.Policy.brand_id == brand.id).delete()
-        for pol in ctx.policies:
-            db.add(
-                models.Policy(
-                    brand_id=brand.id,
-                    type=pol.type,
-                    url=str(pol.url),
-                    content_text=pol.content_text,
-                    content_html=pol.content_html,
-                )
-            )
-        db.commit()
-
-        # replace FAQs
-        db.query(models.FAQ).filter(models.FAQ.brand_id == brand.id).delete()
-        for f in ctx.faqs:
-            db.add(
-                models.FAQ(
-                    brand_id=brand.id,
-                    question=f.question,
-                    answer=f.answer,
-                    url=str(f.url) if f.url else None,
-                )
-            )
-        db.commit()
-
-        # replace socials
-        db.query(models.Social).filter(models.Social.brand_id == brand.id).delete()
-        for s in ctx.socials:
-            db.add(
-                models.Social(
-                    brand_id=brand.id,
-                    platform=s.platform,
-                    url=str(s.url),
-                    handle=s.handle,
-                )
-            )
-        db.commit()
+        persist_brand_context(db, ctx)
     finally:
         db.close()
 
-    return ctx
-
 
-# competitor_insights uses DuckDuckGo HTML search to find candidate Shopify stores and runs gather_insights on them
+# competitor_insights uses DuckDuckGo HTML search to find candidate Shopify stores and runs gather_insights on them;
+# /competitors only uses it with live=true, when the local similarity index (services/similarity.py) has no match
 async def competitor_insights(website_url: str, limit: int = 3):
     base = normalize_url(website_url)
     async with client_ctx() as client:
-        r = await client.get(base + "/", follow_redirects=True, timeout=settings.INSIGHTS_TIMEOUT)
-        home_html = r.text
+        _, home_html = await fetch_body(client, base + "/", timeout=settings.INSIGHTS_TIMEOUT)
+        home_html = home_html or ""
 
         brand_name = extract_brand_name_from_ld(home_html, base + "/") or ""
         domain_name = urllib.parse.urlparse(base).hostname or ""
@@ -188,12 +181,12 @@ async def competitor_insights(website_url: str, limit: int = 3):
         query = "+".join([urllib.parse.quote_plus(k) for k in keywords if k]) or urllib.parse.quote_plus(domain_name)
 
         search_url = f"https://duckduckgo.com/html/?q={query}+shopify"
-        resp = await client.get(search_url, follow_redirects=True, timeout=15)
+        _, search_html = await fetch_body(client, search_url, timeout=15)
 
         links = []
-        if resp.status_code == 200:
+        if search_html:
             from selectolax.parser import HTMLParser
-            tree = HTMLParser(resp.text)
+            tree = HTMLParser(search_html)
             for a in tree.css("a[href]")[:60]:
                 href = a.attributes.get("href", "")
                 if "uddg=" in href:
@@ -229,6 +222,7 @@ async def competitor_insights(website_url: str, limit: int = 3):
 
 async def gather_insights_async_wrapper(website_url: str):
     """Backward-compatible wrapper that uses AsyncShopifyScraper to enrich data"""
+    from app.scraping.async_scraper import AsyncShopifyScraper
     scraper = AsyncShopifyScraper(website_url)
     data = await scraper.scrape()
     return data
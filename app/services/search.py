@@ -0,0 +1,136 @@
+from __future__ import annotations
+import re
+from typing import Optional, List, Iterable
+from sqlalchemy import event, text, or_, select
+from sqlalchemy.orm import Session
+from app.db import Base
+from app import models
+from app.schemas.models import SearchHit, SearchResults
+
+# FTS5 virtual tables (SQLite only). Other backends fall back to LIKE scans.
+FTS_TABLES = {
+    "products": "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+                "title, tags, brand_id UNINDEXED, row_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')",
+    "policies": "CREATE VIRTUAL TABLE IF NOT EXISTS policies_fts USING fts5("
+                "type, content, brand_id UNINDEXED, row_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')",
+    "faqs": "CREATE VIRTUAL TABLE IF NOT EXISTS faqs_fts USING fts5("
+            "question, answer, brand_id UNINDEXED, row_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')",
+}
+SEARCH_KINDS = ("products", "policies", "faqs")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _is_sqlite(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_tables(target, connection, **kw):
+    if _is_sqlite(connection):
+        for ddl in FTS_TABLES.values():
+            connection.execute(text(ddl))
+
+
+def index_brand(db: Session, brand_id: int, products: Iterable[models.Product],
+                policies: Iterable[models.Policy], faqs: Iterable[models.FAQ]) -> None:
+    """Replace a brand's FTS rows; call inside the persisting transaction."""
+    if not _is_sqlite(db.get_bind()):
+        return
+    for kind in SEARCH_KINDS:
+        db.execute(text(f"DELETE FROM {kind}_fts WHERE brand_id = :b"), {"b": brand_id})
+    rows = [{"a": p.title or "", "b": " ".join(p.tags or []), "bid": brand_id, "rid": p.id} for p in products]
+    if rows:
+        db.execute(text("INSERT INTO products_fts (title, tags, brand_id, row_id) VALUES (:a, :b, :bid, :rid)"), rows)
+    rows = [{"a": p.type or "", "b": p.content_text or "", "bid": brand_id, "rid": p.id} for p in policies]
+    if rows:
+        db.execute(text("INSERT INTO policies_fts (type, content, brand_id, row_id) VALUES (:a, :b, :bid, :rid)"), rows)
+    rows = [{"a": f.question or "", "b": f.answer or "", "bid": brand_id, "rid": f.id} for f in faqs]
+    if rows:
+        db.execute(text("INSERT INTO faqs_fts (question, answer, brand_id, row_id) VALUES (:a, :b, :bid, :rid)"), rows)
+
+
+def fts_query(q: str) -> str:
+    """Turn free text into an FTS5 expression: every token must match, last token as prefix."""
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return ""
+    parts = ['"%s"' % t for t in tokens]
+    parts[-1] += "*"
+    return " ".join(parts)
+
+
+def search(db: Session, q: str, kinds: Optional[List[str]] = None, brand_id: Optional[int] = None,
+           limit: int = 20, offset: int = 0) -> SearchResults:
+    kinds = kinds or list(SEARCH_KINDS)
+    window = limit + offset + 1
+    if _is_sqlite(db.get_bind()):
+        match = fts_query(q)
+        hits = [h for kind in kinds for h in _fts_hits(db, kind, match, brand_id, window)] if match else []
+    else:
+        hits = [h for kind in kinds for h in _like_hits(db, kind, q, brand_id, window)]
+    # bm25 scores of different tables are not comparable, so hits stay grouped by kind (in
+    # `kinds` order), each group best first
+    page = hits[offset:offset + limit]
+    next_offset = offset + limit if len(hits) > offset + limit else None
+    return SearchResults(query=q, hits=page, next_offset=next_offset)
+
+
+_FTS_SELECT = {
+    "products": ("SELECT f.row_id, bm25(products_fts, 10.0, 3.0) AS score, b.domain, p.title, p.url, "
+                 "snippet(products_fts, 0, '[', ']', '…', 12) FROM products_fts f "
+                 "JOIN products p ON p.id = f.row_id JOIN brands b ON b.id = f.brand_id "
+                 "WHERE products_fts MATCH :q {brand} ORDER BY score LIMIT :n"),
+    "policies": ("SELECT f.row_id, bm25(policies_fts, 1.0, 1.0) AS score, b.domain, p.type, p.url, "
+                 "snippet(policies_fts, 1, '[', ']', '…', 16) FROM policies_fts f "
+                 "JOIN policies p ON p.id = f.row_id JOIN brands b ON b.id = f.brand_id "
+                 "WHERE policies_fts MATCH :q {brand} ORDER BY score LIMIT :n"),
+    "faqs": ("SELECT f.row_id, bm25(faqs_fts, 5.0, 1.0) AS score, b.domain, q.question, q.url, "
+             "snippet(faqs_fts, -1, '[', ']', '…', 16) FROM faqs_fts f "
+             "JOIN faqs q ON q.id = f.row_id JOIN brands b ON b.id = f.brand_id "
+             "WHERE faqs_fts MATCH :q {brand} ORDER BY score LIMIT :n"),
+}
+
+
+def _fts_hits(db: Session, kind: str, match: str, brand_id: Optional[int], n: int) -> List[SearchHit]:
+    sql = _FTS_SELECT[kind].format(brand="AND f.brand_id = :b" if brand_id is not None else "")
+    rows = db.execute(text(sql), {"q": match, "b": brand_id, "n": n}).all()
+    # rows come best first; scores are scaled by the best hit, so 1.0 is the best match of
+    # this kind (and only comparable with other hits of the same kind)
+    best = rows[0][1] if rows else 0.0
+    return [
+        SearchHit(kind=kind, id=rid, brand=domain, title=title, url=url, snippet=snip,
+                  score=round(score / best, 4) if best < 0 else 0.0)
+        for rid, score, domain, title, url, snip in rows
+    ]
+
+
+def like_pattern(q: str) -> str:
+    """``%q%`` with LIKE wildcards in `q` escaped (use with ``escape="\\"``)."""
+    return "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _like_hits(db: Session, kind: str, q: str, brand_id: Optional[int], n: int) -> List[SearchHit]:
+    blob = models.TextBlob
+    model, title_col, cols, blob_fk = {
+        "products": (models.Product, models.Product.title, [models.Product.title], None),
+        "policies": (models.Policy, models.Policy.type, [blob.text], models.Policy.content_id),
+        "faqs": (models.FAQ, models.FAQ.question, [models.FAQ.question, blob.text], models.FAQ.answer_id),
+    }[kind]
+    stmt = (
+        select(model.id, models.Brand.domain, title_col, model.url)
+        .join(models.Brand, models.Brand.id == model.brand_id)
+    )
+    if blob_fk is not None:
+        stmt = stmt.outerjoin(blob, blob.id == blob_fk)
+    pattern = like_pattern(q)
+    conds = [c.ilike(pattern, escape="\\") for c in cols]
+    if kind == "products":
+        tag = models.ProductTag
+        conds.append(select(tag.id).where(tag.product_id == model.id, tag.tag.ilike(pattern, escape="\\")).exists())
+    stmt = stmt.where(or_(*conds)).limit(n)
+    if brand_id is not None:
+        stmt = stmt.where(model.brand_id == brand_id)
+    return [
+        SearchHit(kind=kind, id=rid, brand=domain, title=title, url=url, score=0.0)
+        for rid, domain, title, url in db.execute(stmt)
+    ]
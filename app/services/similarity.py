@@ -0,0 +1,219 @@
+"""Local nearest-neighbour index of persisted brands, used by `/competitors`.
+
+Each brand is reduced to a fixed-size vector (feature hashing) of its product-title words,
+tags, product types, price bands and about-page words. Vectors are written to
+`brand_vectors` whenever a brand is persisted; each process keeps them in one float32
+matrix and pulls in only rows written since its last look, so a query is one
+matrix-vector product instead of a web search plus a crawl per candidate.
+
+Rows are versioned by `seq`, computed inside the writing statement as max(seq) + 1.
+SQLite admits one writer at a time, so a row that becomes visible later always has a
+higher `seq` than every row already read (a flush-time timestamp does not have that
+property). The index is also reloaded in full every `FULL_RELOAD_SECONDS` as a backstop.
+"""
+from __future__ import annotations
+import datetime, math, re, threading, time, weakref, zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app import models
+
+DIMS = 512  # power of two; the low bits of the token hash pick the slot
+# relative weight of each feature group in the combined vector
+GROUP_WEIGHTS = {"title": 1.0, "tag": 1.0, "type": 0.8, "price": 0.6, "about": 0.5}
+PRICE_BANDS = (10, 25, 50, 100, 200, 500, 1000)
+MIN_SCORE = 0.05
+FULL_RELOAD_SECONDS = 300.0
+_WORD_RE = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+_STOPWORDS = frozenset(
+    "the and for with our you your are was from this that all new set pack size one"
+    " not but have has its out can will more who what about shop store".split()
+)
+
+
+def _words(text: Optional[str]) -> List[str]:
+    return [w for w in _WORD_RE.findall((text or "").lower()) if w not in _STOPWORDS]
+
+
+def price_band(price: Optional[float]) -> Optional[str]:
+    if price is None:
+        return None
+    for edge in PRICE_BANDS:
+        if price < edge:
+            return f"<{edge}"
+    return f">={PRICE_BANDS[-1]}"
+
+
+def brand_features(products: Iterable, about_text: Optional[str]) -> Dict[str, Counter]:
+    """Token counts per feature group. `products` need title, tags, product_type and price_value."""
+    groups = {g: Counter() for g in GROUP_WEIGHTS}
+    for p in products:
+        groups["title"].update(set(_words(p.title)))
+        groups["tag"].update({t.strip().lower() for t in (p.tags or []) if t and t.strip()})
+        if p.product_type:
+            groups["type"][p.product_type.strip().lower()] += 1
+        band = price_band(p.price_value)
+        if band:
+            groups["price"][band] += 1
+    groups["about"].update(_words(about_text))
+    return groups
+
+
+def vectorize(groups: Dict[str, Counter]) -> np.ndarray:
+    """Signed feature hashing with sublinear counts; each group is normalized before it is
+    weighted, so a large catalog does not drown the about text or the price profile."""
+    out = np.zeros(DIMS, dtype=np.float32)
+    for group, counts in groups.items():
+        if not counts:
+            continue
+        part = np.zeros(DIMS, dtype=np.float32)
+        for token, n in counts.items():
+            h = zlib.crc32(f"{group}:{token}".encode("utf-8"))
+            part[h & (DIMS - 1)] += (1.0 + math.log(n)) * (1.0 if h & 0x80000000 else -1.0)
+        norm = np.linalg.norm(part)
+        if norm:
+            out += part * (GROUP_WEIGHTS[group] / norm)
+    norm = np.linalg.norm(out)
+    return out / norm if norm else out
+
+
+def _next_seq():
+    return select(func.coalesce(func.max(models.BrandVector.seq), 0) + 1).scalar_subquery()
+
+
+def update_brand_vector(db: Session, brand_id: int, products: Iterable, about_text: Optional[str]) -> None:
+    """Store the brand's vector; call inside the persisting transaction."""
+    vector = vectorize(brand_features(products, about_text)).tobytes()
+    row = db.get(models.BrandVector, brand_id)
+    if row is None:
+        db.add(models.BrandVector(brand_id=brand_id, vector=vector, seq=_next_seq()))
+    else:
+        row.vector = vector
+        row.updated_at = datetime.datetime.utcnow()
+        row.seq = _next_seq()
+
+
+def backfill_vectors(db: Session) -> int:
+    """Compute vectors for brands persisted before they existed; returns how many were added.
+
+    Workers may run this at the same time; rows another worker stored first are skipped."""
+    missing = db.execute(
+        select(models.Brand.id, models.Brand.about_text)
+        .where(models.Brand.id.not_in(select(models.BrandVector.brand_id)))
+    ).all()
+    if not missing:
+        return 0
+    rows = []
+    for brand_id, about_text in missing:
+        products = db.execute(
+            select(models.Product).where(models.Product.brand_id == brand_id)
+        ).scalars()
+        rows.append({"brand_id": brand_id, "vector": vectorize(brand_features(products, about_text)).tobytes(),
+                     "updated_at": datetime.datetime.utcnow(), "seq": _next_seq()})
+    insert = (postgresql if db.get_bind().dialect.name == "postgresql" else sqlite).insert
+    added = 0
+    for row in rows:
+        added += db.execute(insert(models.BrandVector).values(**row).on_conflict_do_nothing()).rowcount
+    db.commit()
+    return added
+
+
+class VectorIndex:
+    """Brute-force cosine index over unit vectors, grown in place as brands are added."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.matrix = np.zeros((0, DIMS), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.rows: Dict[int, int] = {}
+        self.seen: Optional[int] = None  # highest seq loaded
+        self.loaded_at = 0.0  # monotonic time of the last full load
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def upsert(self, items: List[Tuple[int, np.ndarray]]) -> None:
+        with self.lock:
+            for brand_id, vec in items:
+                row = self.rows.get(brand_id)
+                if row is None:
+                    row = self.rows[brand_id] = len(self.rows)
+                    if row == len(self.matrix):
+                        grow = max(64, len(self.matrix))
+                        self.matrix = np.vstack([self.matrix, np.zeros((grow, DIMS), dtype=np.float32)])
+                        self.ids = np.concatenate([self.ids, np.full(grow, -1, dtype=np.int64)])
+                    self.ids[row] = brand_id
+                self.matrix[row] = vec
+
+    def refresh(self, db: Session) -> None:
+        """Load vectors written (by any process) since the last refresh."""
+        if self.seen is None:
+            backfill_vectors(db)
+        full = self.seen is None or time.monotonic() - self.loaded_at > FULL_RELOAD_SECONDS
+        q = select(models.BrandVector.brand_id, models.BrandVector.vector, models.BrandVector.seq)
+        if not full:
+            q = q.where(models.BrandVector.seq > self.seen)
+        rows = db.execute(q).all()
+        if rows:
+            self.upsert([(bid, np.frombuffer(vec, dtype=np.float32)) for bid, vec, _ in rows])
+        seen = max((r.seq or 0 for r in rows), default=0)
+        self.seen = seen if full else max(self.seen, seen)
+        if full:
+            self.loaded_at = time.monotonic()
+
+    def vector(self, brand_id: int) -> Optional[np.ndarray]:
+        row = self.rows.get(brand_id)
+        return None if row is None else self.matrix[row]
+
+    def query(self, vec: np.ndarray, k: int, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        with self.lock:
+            n = len(self.rows)
+            scores = self.matrix[:n] @ vec
+            ids = self.ids[:n]
+        skip = np.isin(ids, list(exclude))
+        scores = np.where(skip, -np.inf, scores)
+        k = min(k, n)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] >= MIN_SCORE]
+
+
+_indexes: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def get_index(db: Session) -> VectorIndex:
+    """The process-wide index for the session's engine, refreshed from `brand_vectors`."""
+    engine = db.get_bind()
+    with _indexes_lock:
+        index = _indexes.get(engine)
+        if index is None:
+            index = _indexes[engine] = VectorIndex()
+    index.refresh(db)
+    return index
+
+
+def similar_brands(db: Session, brand_id: int, k: int = 3) -> List[dict]:
+    """The `k` persisted brands closest to `brand_id`, best first."""
+    index = get_index(db)
+    vec = index.vector(brand_id)
+    if vec is None:
+        return []
+    hits = index.query(vec, k, exclude=(brand_id,))
+    if not hits:
+        return []
+    brands = {
+        b.id: b for b in db.execute(
+            select(models.Brand.id, models.Brand.domain, models.Brand.name)
+            .where(models.Brand.id.in_([bid for bid, _ in hits]))
+        )
+    }
+    return [
+        {"website": brands[bid].domain, "brand_name": brands[bid].name, "score": round(score, 4)}
+        for bid, score in hits if bid in brands
+    ]
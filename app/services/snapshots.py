@@ -0,0 +1,151 @@
+from __future__ import annotations
+import datetime, difflib, hashlib, json, zlib
+from typing import Optional, List, Dict, Tuple, Any
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import models
+from app.schemas.models import PricePoint, PolicyChangeEntry
+from app.services.text_blobs import text_hash
+
+VariantState = Tuple[Optional[float], Optional[float], Optional[bool]]
+
+
+def compress(obj: Any) -> bytes:
+    data = obj if isinstance(obj, str) else json.dumps(obj, separators=(",", ":"))
+    return zlib.compress(data.encode("utf-8"), 9)
+
+
+def decompress(blob: Optional[bytes]) -> Optional[str]:
+    return zlib.decompress(blob).decode("utf-8") if blob else None
+
+
+def _num(x) -> Optional[float]:
+    try:
+        return float(x) if x not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def variant_states(products: List[Dict[str, Any]]) -> Dict[Tuple[str, str], VariantState]:
+    """(handle, variant_id) -> (price, compare_at_price, available) for a list of product dicts."""
+    out = {}
+    for p in products:
+        handle = p.get("handle")
+        if not handle:
+            continue
+        for i, v in enumerate(p.get("variants") or []):
+            vid = str(v.get("id") if v.get("id") is not None else i)
+            out[(handle, vid)] = (_num(v.get("price")), _num(v.get("compare_at_price")), v.get("available"))
+    return out
+
+
+def record_snapshot(db: Session, brand_id: int, crawled_at: datetime.datetime,
+                    products: List[Dict[str, Any]], policies: List[Dict[str, Any]]) -> models.CrawlSnapshot:
+    """Store this crawl as a delta against the rows currently persisted for the brand.
+
+    Must run before the brand's products/policies are replaced. Only changed variants
+    and policies produce rows, so storage grows with churn rather than catalog size.
+    """
+    prev_products = [
+        {"handle": h, "variants": v}
+        for h, v in db.execute(
+            select(models.Product.handle, models.Product.variants).where(models.Product.brand_id == brand_id)
+        )
+    ]
+    prev = variant_states(prev_products)
+    cur = variant_states(products)
+
+    snap = models.CrawlSnapshot(brand_id=brand_id, crawled_at=crawled_at)
+    db.add(snap)
+    db.flush()
+
+    changes = []
+    for key, state in cur.items():
+        before = prev.get(key)
+        if before != state:
+            changes.append((key, "added" if before is None else "changed", state))
+    for key in prev.keys() - cur.keys():
+        changes.append((key, "removed", (None, None, None)))
+    db.add_all([
+        models.VariantPriceChange(
+            snapshot_id=snap.id, brand_id=brand_id, handle=handle, variant_id=vid, crawled_at=crawled_at,
+            change=change, price=price, compare_at_price=cap, available=avail,
+        )
+        for (handle, vid), change, (price, cap, avail) in changes
+    ])
+
+    # compare by content hash; previous text is only loaded for policies that changed
+    prev_policies = {
+        (t, u): (h, blob_id)
+        for t, u, blob_id, h in db.execute(
+            select(models.Policy.type, models.Policy.url, models.Policy.content_id, models.TextBlob.sha256)
+            .outerjoin(models.TextBlob, models.TextBlob.id == models.Policy.content_id)
+            .where(models.Policy.brand_id == brand_id)
+        )
+    }
+    cur_policies = {(p["type"], p["url"]): p.get("content_text") or "" for p in policies}
+    policy_rows = []
+    for (typ, url), text in cur_policies.items():
+        digest = text_hash(text)
+        before = prev_policies.get((typ, url))
+        if before is not None and before[0] == digest:
+            continue
+        prev_text = db.get(models.TextBlob, before[1]).text if before is not None and before[1] else ""
+        diff = "".join(difflib.unified_diff(
+            prev_text.splitlines(keepends=True), text.splitlines(keepends=True),
+            fromfile="previous", tofile="current", n=1,
+        ))
+        policy_rows.append(models.PolicyChange(
+            snapshot_id=snap.id, brand_id=brand_id, type=typ, url=url, crawled_at=crawled_at,
+            change="added" if before is None else "changed",
+            content_hash=hashlib.sha256(text.encode("utf-8")).hexdigest(), diff=compress(diff),
+        ))
+    for typ, url in prev_policies.keys() - cur_policies.keys():
+        policy_rows.append(models.PolicyChange(
+            snapshot_id=snap.id, brand_id=brand_id, type=typ, url=url, crawled_at=crawled_at, change="removed",
+        ))
+    db.add_all(policy_rows)
+
+    prev_handles = {p["handle"] for p in prev_products if p["handle"]}
+    cur_handles = {p.get("handle") for p in products if p.get("handle")}
+    snap.variant_changes = len(changes)
+    snap.policy_changes = len(policy_rows)
+    snap.delta = compress({
+        "added": sorted(cur_handles - prev_handles),
+        "removed": sorted(prev_handles - cur_handles),
+    })
+    return snap
+
+
+# ---------- Queries ----------
+def price_history(db: Session, brand_id: int, handle: str) -> List[PricePoint]:
+    rows = db.execute(
+        select(models.VariantPriceChange)
+        .where(models.VariantPriceChange.brand_id == brand_id, models.VariantPriceChange.handle == handle)
+        .order_by(models.VariantPriceChange.crawled_at, models.VariantPriceChange.id)
+    ).scalars()
+    return [
+        PricePoint(variant_id=r.variant_id, crawled_at=r.crawled_at, change=r.change,
+                   price=r.price, compare_at_price=r.compare_at_price, available=r.available)
+        for r in rows
+    ]
+
+
+def policy_changes(db: Session, type: Optional[str] = None, since: Optional[datetime.datetime] = None,
+                   include_diff: bool = False, include_added: bool = False) -> List[PolicyChangeEntry]:
+    q = (
+        select(models.PolicyChange, models.Brand.domain)
+        .join(models.Brand, models.Brand.id == models.PolicyChange.brand_id)
+        .order_by(models.PolicyChange.crawled_at.desc(), models.PolicyChange.id.desc())
+    )
+    if type:
+        q = q.where(models.PolicyChange.type == type)
+    if since:
+        q = q.where(models.PolicyChange.crawled_at >= since)
+    if not include_added:
+        q = q.where(models.PolicyChange.change != "added")
+    return [
+        PolicyChangeEntry(brand=domain, type=c.type, url=c.url, crawled_at=c.crawled_at, change=c.change,
+                          content_hash=c.content_hash, diff=decompress(c.diff) if include_diff else None)
+        for c, domain in db.execute(q)
+    ]
@@ -0,0 +1,60 @@
+from __future__ import annotations
+import hashlib
+from typing import Optional, Dict, Iterable, Set
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import models
+
+
+def text_hash(text: Optional[str]) -> Optional[str]:
+    """sha256 of non-empty text; empty and missing text are not stored."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest() if text else None
+
+
+def intern_texts(db: Session, texts: Iterable[Optional[str]]) -> Dict[str, models.TextBlob]:
+    """Return sha256 -> TextBlob for every non-empty text, inserting only the unseen ones."""
+    wanted = {text_hash(t): t for t in texts if t}
+    if not wanted:
+        return {}
+    found = _existing(db, wanted)
+    missing = [models.TextBlob(sha256=h, text=t) for h, t in wanted.items() if h not in found]
+    if missing:
+        try:
+            with db.begin_nested():
+                db.add_all(missing)
+        except IntegrityError:
+            # another worker stored some of the same texts first
+            found = _existing(db, wanted)
+            missing = [models.TextBlob(sha256=h, text=t) for h, t in wanted.items() if h not in found]
+            db.add_all(missing)
+            db.flush()
+        found.update((b.sha256, b) for b in missing)
+    return found
+
+
+def _existing(db: Session, wanted: Dict[str, str]) -> Dict[str, models.TextBlob]:
+    out: Dict[str, models.TextBlob] = {}
+    hashes = list(wanted)
+    for i in range(0, len(hashes), 500):
+        for blob in db.execute(select(models.TextBlob).where(models.TextBlob.sha256.in_(hashes[i:i + 500]))).scalars():
+            out[blob.sha256] = blob
+    return out
+
+
+def prune_blobs(db: Session, blob_ids: Set[int]) -> int:
+    """Delete the given blobs unless a policy or FAQ still references them.
+
+    The reference check and the delete are one statement, so a blob another worker has
+    just linked to is never removed from under it."""
+    blob_ids = {b for b in blob_ids if b is not None}
+    if not blob_ids:
+        return 0
+    blob = models.TextBlob
+    return db.execute(
+        delete(blob)
+        .where(blob.id.in_(blob_ids))
+        .where(~select(models.Policy.id).where(models.Policy.content_id == blob.id).exists())
+        .where(~select(models.FAQ.id).where(models.FAQ.answer_id == blob.id).exists())
+        .execution_options(synchronize_session=False)
+    ).rowcount
@@ -1,7 +1,7 @@
 
 from selectolax.parser import HTMLParser
 import re
-from urllib.parse import urljoin
+from app.scraping.links import absolute_url, classify_links
 
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 PHONE_RE = re.compile(r"(?:\+\d{1,3}[-.\s]?)?(?:\(?\d{2,4}\)?[-.\s]?)?\d{3,4}[-.\s]?\d{3,4}")
@@ -17,16 +17,15 @@ def extract_phones(html):
             phones.add(val)
     return list(phones)
 
-def extract_socials(html, base):
-    tree = HTMLParser(html or "")
+SOCIAL_PLATFORMS = ["instagram","facebook","tiktok","x","twitter","youtube","pinterest","linkedin"]
+
+def extract_socials(html, base, anchors=None):
     found = []
-    SOCIAL_DOMAINS = {"instagram":"instagram.com","facebook":"facebook.com","tiktok":"tiktok.com","x":"x.com","twitter":"twitter.com","youtube":"youtube.com","pinterest":"pinterest.com","linkedin":"linkedin.com"}
-    for a in tree.css('a[href]'):
-        href = a.attributes.get('href','')
-        for platform, domain in SOCIAL_DOMAINS.items():
-            if domain in href:
-                handle = href.split('/')[-1].strip('/')
-                found.append({'platform': platform, 'url': href, 'handle': handle})
+    for a in (anchors if anchors is not None else classify_links(html or "")):
+        for platform in SOCIAL_PLATFORMS:
+            if 'social:'+platform in a.labels:
+                handle = a.href.split('/')[-1].strip('/')
+                found.append({'platform': platform, 'url': a.href, 'handle': handle})
     # dedupe by platform
     out=[]; seen=set()
     for s in found:
@@ -38,36 +37,33 @@ def extract_social_links(html):
     return extract_socials(html, None)
 
 def extract_contacts(html, base, contact_url):
-    tree = HTMLParser(html or "")
     emails = extract_emails(html)
     phones = extract_phones(html)
     return {'emails': emails, 'phones': phones, 'addresses': [], 'contact_page': contact_url}
 
-def extract_important_links(html, base):
-    tree = HTMLParser(html or "")
+def extract_important_links(html, base, anchors=None):
     links = {'order_tracking': None, 'contact_us': None, 'blogs': None, 'sitemap': None, 'others': []}
-    for a in tree.css('a[href]'):
-        href = a.attributes.get('href','')
-        text = (a.text() or '').lower()
-        if 'track' in text or 'order' in href:
-            links['order_tracking'] = urljoin(base+'/', href)
-        if 'contact' in text or 'support' in text:
-            links['contact_us'] = urljoin(base+'/', href)
-        if 'blog' in text:
-            links['blogs'] = urljoin(base+'/', href)
-        if 'sitemap' in href or 'sitemap' in text:
-            links['sitemap'] = urljoin(base+'/', href)
+    for a in (anchors if anchors is not None else classify_links(html or "")):
+        labels = a.labels
+        if 'helpers:track_text' in labels or 'helpers:order_href' in labels:
+            links['order_tracking'] = absolute_url(base+'/', a.href)
+        if 'helpers:contact_text' in labels:
+            links['contact_us'] = absolute_url(base+'/', a.href)
+        if 'helpers:blog_text' in labels:
+            links['blogs'] = absolute_url(base+'/', a.href)
+        if 'helpers:sitemap' in labels:
+            links['sitemap'] = absolute_url(base+'/', a.href)
     return links
 
-def extract_about_text(html):
+def extract_about_text(html, tree=None):
     # try to pull main text heuristically
-    tree = HTMLParser(html or "")
+    tree = tree if tree is not None else HTMLParser(html or "")
     body = tree.body.text() if tree.body else ''
     return body.strip()[:3000]
 
-def extract_brand_name_from_ld(html, url):
+def extract_brand_name_from_ld(html, url, tree=None):
     # simple heuristic: title or meta og:site_name
-    tree = HTMLParser(html or "")
+    tree = tree if tree is not None else HTMLParser(html or "")
     title = tree.css_first('title')
     if title:
         return title.text()
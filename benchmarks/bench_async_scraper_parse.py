@@ -0,0 +1,95 @@
+"""CPU cost of AsyncShopifyScraper's HTML extractors: previous BeautifulSoup('html.parser')
+implementation (parsing per extractor) vs. one shared selectolax tree.
+
+    python benchmarks/bench_async_scraper_parse.py --scale 1 10 50
+"""
+import argparse, os, re, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup  # noqa: E402
+from selectolax.parser import HTMLParser  # noqa: E402
+from app.schemas.models import Product  # noqa: E402
+from app.scraping.async_scraper import AsyncShopifyScraper  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "tests", "fixtures", "async_scraper")
+
+
+# ---- previous implementation, kept for comparison ----
+def bs_hero(home_html, product_objs):
+    soup = BeautifulSoup(home_html, 'html.parser')
+    hero = []
+    handles = {p.handle for p in product_objs if p.handle}
+    for a in soup.find_all('a', href=True):
+        m = re.match(r"/products/([^/]+)", a['href'])
+        if m and m.group(1) in handles:
+            hero.append({'handle': m.group(1), 'title': a.get_text(strip=True)})
+    return hero[:12]
+
+
+def bs_faqs(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    faqs = []
+    for q in soup.find_all(['h2', 'h3', 'strong']):
+        question = q.get_text(strip=True)
+        nxt = q.find_next_sibling('p')
+        answer = nxt.get_text(strip=True) if nxt else ''
+        if len(question) > 3 and len(answer) > 3:
+            faqs.append({'question': question, 'answer': answer, 'url': None})
+    return faqs
+
+
+def bs_seo(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    meta = {}
+    if soup.title and soup.title.string:
+        meta['title'] = soup.title.string.strip()
+    og = {}
+    for tag in soup.find_all('meta'):
+        if tag.get('property', '').startswith('og:') or tag.get('name', '').startswith('twitter:'):
+            og[tag.get('property') or tag.get('name')] = tag.get('content')
+    meta['og'] = og
+    return meta
+
+
+def scale_page(html: str, n: int) -> str:
+    body = html.split("<body>", 1)[1].rsplit("</body>", 1)[0]
+    return html.replace(body, body * n, 1)
+
+
+def cpu(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.process_time()
+        fn()
+        best = min(best, time.process_time() - t)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    scraper = AsyncShopifyScraper("https://demo.test")
+    products = [Product(handle=h) for h in ["leather-wallet", "belt", "card-holder"]]
+    home = open(os.path.join(FIXTURES, "home.html"), encoding="utf-8").read()
+    faq = open(os.path.join(FIXTURES, "faq.html"), encoding="utf-8").read()
+    print(f"{'scale':>6} {'home KB':>8} {'bs4 ms':>8} {'selectolax ms':>14} {'speedup':>8}")
+    for n in args.scale:
+        h, f = scale_page(home, n), scale_page(faq, n)
+
+        def old():
+            bs_hero(h, products); bs_seo(h); bs_faqs(f)
+
+        def new():
+            tree = HTMLParser(h)
+            scraper._extract_hero_products(tree, products); scraper._extract_seo(tree); scraper._parse_faqs(f)
+
+        a, b = cpu(old, args.repeat), cpu(new, args.repeat)
+        print(f"{n:>6} {len(h) / 1024:>8.1f} {a * 1000:>8.1f} {b * 1000:>14.1f} {a / b:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Memory retained by an in-flight catalog: pydantic `Product` models (the original
+`product_from_json`, keeping variant dicts and the full raw Shopify dict) vs. the compact
+`ProductRecord`s `fetch_all_products` now returns. Also the peak while the records are
+converted to `Product`s at the response edge, with every record kept alive until the end
+vs. `to_products`, which releases each record as it is converted.
+
+    python benchmarks/bench_catalog_memory.py --products 2000 10000
+"""
+import argparse, gc, json, os, random, sys, tracemalloc
+from urllib.parse import urljoin
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.schemas.models import Product  # noqa: E402
+from app.scraping.catalog import ProductRecord, to_products  # noqa: E402
+
+BASE = "https://demo.test"
+VENDORS = ["Acme", "Northwind", "Globex", "Initech"]
+TYPES = ["Shoes", "Hats", "Bags", "Shirts", "Accessories"]
+TAGS = ["sale", "new", "summer", "winter", "organic", "bestseller", "limited", "gift"]
+
+
+def shopify_product(i: int, rnd: random.Random) -> dict:
+    handle = f"product-{i}"
+    return {
+        "id": 7_000_000 + i, "title": f"Product {i}", "handle": handle,
+        "body_html": "<p>" + "Lorem ipsum dolor sit amet. " * rnd.randint(20, 80) + "</p>",
+        "published_at": "2024-01-01T00:00:00-05:00", "created_at": "2024-01-01T00:00:00-05:00",
+        "updated_at": "2024-02-01T00:00:00-05:00", "vendor": rnd.choice(VENDORS),
+        "product_type": rnd.choice(TYPES), "tags": rnd.sample(TAGS, 3),
+        "variants": [
+            {"id": 40_000_000 + i * 10 + j, "title": size, "option1": size, "option2": None, "option3": None,
+             "sku": f"SKU-{i}-{j}", "requires_shipping": True, "taxable": True, "featured_image": None,
+             "available": bool(j % 2), "price": f"{rnd.uniform(5, 200):.2f}", "grams": 200,
+             "compare_at_price": f"{rnd.uniform(200, 300):.2f}" if j == 0 else None, "position": j + 1,
+             "product_id": 7_000_000 + i, "created_at": "2024-01-01T00:00:00-05:00",
+             "updated_at": "2024-02-01T00:00:00-05:00"}
+            for j, size in enumerate(["S", "M", "L"])
+        ],
+        "images": [
+            {"id": 30_000_000 + i * 10 + k, "src": f"https://cdn.shopify.com/s/files/1/0001/products/{handle}-{k}.jpg",
+             "position": k + 1, "width": 1200, "height": 1200}
+            for k in range(3)
+        ],
+        "options": [{"name": "Size", "position": 1, "values": ["S", "M", "L"]}],
+    }
+
+
+# ---- previous implementation, kept for comparison ----
+def legacy_product(base, p):
+    variants = [
+        {"id": v.get("id"), "title": v.get("title"), "price": float(v["price"]),
+         "compare_at_price": float(v["compare_at_price"]) if v.get("compare_at_price") else None,
+         "available": v.get("available"), "sku": v.get("sku")}
+        for v in p.get("variants") or []
+    ]
+    return Product(
+        handle=p.get("handle"), title=p.get("title"), url=urljoin(base, f"/products/{p.get('handle', '')}"),
+        images=[img.get("src") for img in (p.get("images") or []) if img.get("src")],
+        price=variants[0]["price"] if variants else None, currency=None,
+        sku=[v["sku"] for v in variants if v["sku"]],
+        tags=[t.strip() for t in p["tags"]] if isinstance(p.get("tags"), list) else [],
+        variants=variants, raw=p,
+    )
+
+
+def retained(build, payloads):
+    """Bytes still allocated after building the catalog from freshly decoded items."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    catalog = [build(BASE, json.loads(raw)) for raw in payloads]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del catalog
+    return size
+
+
+def conversion_peak(convert, payloads):
+    """Peak bytes (records plus products) while `convert` turns a record catalog into Products."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [ProductRecord(BASE, json.loads(raw)) for raw in payloads]
+    gc.collect()
+    tracemalloc.reset_peak()
+    products = convert(records)
+    del records
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    del products
+    return peak
+
+
+def keep_records(records):
+    return [r.to_product() for r in records]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, nargs="+", default=[2000, 10000])
+    args = parser.parse_args()
+    print(f"{'products':>9} {'pydantic MB':>12} {'compact MB':>11} {'reduction':>10}")
+    for n in args.products:
+        rnd = random.Random(n)
+        payloads = [json.dumps(shopify_product(i, rnd)) for i in range(n)]
+        old = retained(legacy_product, payloads)
+        new = retained(ProductRecord, payloads)
+        print(f"{n:>9} {old / 2**20:>12.1f} {new / 2**20:>11.1f} {old / new:>9.1f}x")
+    print(f"\n{'products':>9} {'kept peak MB':>13} {'to_products peak MB':>20} {'reduction':>10}")
+    for n in args.products:
+        rnd = random.Random(n)
+        payloads = [json.dumps(shopify_product(i, rnd)) for i in range(n)]
+        kept = conversion_peak(keep_records, payloads)
+        released = conversion_peak(to_products, payloads)
+        print(f"{n:>9} {kept / 2**20:>13.1f} {released / 2**20:>20.1f} {kept / released:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
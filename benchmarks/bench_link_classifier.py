@@ -0,0 +1,154 @@
+"""Microbenchmark: per-function keyword loops vs. the shared single-pass link classifier.
+
+    python benchmarks/bench_link_classifier.py --anchors 5000 --repeat 5
+"""
+import argparse, os, random, sys, time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selectolax.parser import HTMLParser  # noqa: E402
+from app.scraping import discovery, extractors, links  # noqa: E402
+from app.utils import helpers  # noqa: E402
+
+WORDS = ["shop", "new", "sale", "collections", "products", "about-us", "contact", "faq", "blog",
+         "privacy-policy", "refund-policy", "terms-of-service", "shipping", "track", "size-guide"]
+
+
+def make_homepage(n: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    socials = ["https://instagram.com/demo", "https://facebook.com/demo", "https://x.com/demo"]
+    parts = []
+    for i in range(n):
+        if i % 97 == 0:
+            href = rng.choice(socials)
+        else:
+            href = "/" + "/".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) + f"-{i}"
+        parts.append(f'<a href="{href}">{" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))}</a>')
+    return "<html><body>" + "".join(parts) + "</body></html>"
+
+
+# ---- pre-classifier implementations, kept verbatim for comparison ----
+def naive_find_links(html, base, keywords):
+    tree = HTMLParser(html)
+    out = []
+    for a in tree.css("a[href]"):
+        href = a.attributes.get("href", "")
+        text = (a.text() or "").lower()
+        for kw in keywords:
+            if kw in href.lower() or kw in text:
+                out.append(urljoin(base, href))
+    return list(dict.fromkeys(out))
+
+
+def naive_homepage(html, base):
+    for _, slugs in discovery.POLICY_CANDIDATES:
+        naive_find_links(html, base, slugs)
+    naive_find_links(html, base, discovery.FAQ_KEYWORDS)
+    for kw in discovery.ABOUT_KEYWORDS:
+        if naive_find_links(html, base, [kw]):
+            break
+    for kw in discovery.CONTACT_KEYWORDS:
+        if naive_find_links(html, base, [kw]):
+            break
+    # extractors.extract_socials
+    found = []
+    for a in HTMLParser(html).css("a[href]"):
+        href = a.attributes.get("href", "")
+        for platform, domain in extractors.SOCIAL_DOMAINS.items():
+            if domain in href:
+                found.append((platform, href))
+    # extractors.extract_important_links
+    tree = HTMLParser(html)
+    out = {"order_tracking": None, "contact_us": None, "blogs": None, "sitemap": None}
+    for a in tree.css("a[href]"):
+        href, text = a.attributes.get("href", ""), (a.text() or "").lower()
+        for key, kws in extractors.IMPORTANT_LINK_KEYWORDS.items():
+            for kw in kws:
+                if (kw in text or kw in href.lower()) and not out[key]:
+                    out[key] = urljoin(base, href)
+        if "sitemap" in text or "sitemap.xml" in href.lower():
+            out["sitemap"] = urljoin(base, href)
+    others = [urljoin(base, a.attributes.get("href", "")) for a in tree.css("a[href]")
+              if any(k in a.attributes.get("href", "").lower() for k in extractors.OTHER_LINK_KEYWORDS)]
+    # helpers.extract_socials / extract_important_links
+    for a in HTMLParser(html).css("a[href]"):
+        href = a.attributes.get("href", "")
+        for domain in extractors.SOCIAL_DOMAINS.values():
+            if domain in href:
+                found.append(href.split("/")[-1])
+    h = {}
+    for a in HTMLParser(html).css("a[href]"):
+        href, text = a.attributes.get("href", ""), (a.text() or "").lower()
+        if "track" in text or "order" in href:
+            h["order_tracking"] = urljoin(base + "/", href)
+        if "contact" in text or "support" in text:
+            h["contact_us"] = urljoin(base + "/", href)
+        if "blog" in text:
+            h["blogs"] = urljoin(base + "/", href)
+        if "sitemap" in href or "sitemap" in text:
+            h["sitemap"] = urljoin(base + "/", href)
+
+
+def classifier_homepage(html, base):
+    anchors = links.classify_links(html)
+    for typ, _ in discovery.POLICY_CANDIDATES:
+        discovery._labelled_links(anchors, base, f"policy:{typ}")
+    discovery._labelled_links(anchors, base, "faq")
+    for kw in discovery.ABOUT_KEYWORDS:
+        if links.first_labelled(anchors, f"about:{kw}"):
+            break
+    for kw in discovery.CONTACT_KEYWORDS:
+        if links.first_labelled(anchors, f"contact:{kw}"):
+            break
+    extractors.extract_socials(html, base, anchors)
+    extractors.extract_important_links(html, base, anchors)
+    helpers.extract_socials(html, base, anchors)
+    helpers.extract_important_links(html, base, anchors)
+
+
+def naive_labels(html):
+    """Only the keyword matching: one parse and keyword loop per consumer, as before."""
+    keyword_sets = [slugs for _, slugs in discovery.POLICY_CANDIDATES] + [discovery.FAQ_KEYWORDS]
+    keyword_sets += [[kw] for kw in discovery.ABOUT_KEYWORDS + discovery.CONTACT_KEYWORDS]
+    keyword_sets += list(extractors.IMPORTANT_LINK_KEYWORDS.values()) + [extractors.OTHER_LINK_KEYWORDS]
+    keyword_sets += [list(extractors.SOCIAL_DOMAINS.values())] * 2 + [["track", "order", "contact", "support", "blog", "sitemap"]]
+    for kws in keyword_sets:
+        for a in HTMLParser(html).css("a[href]"):
+            href, text = a.attributes.get("href", "").lower(), (a.text() or "").lower()
+            [kw for kw in kws if kw in href or kw in text]
+
+
+def classifier_labels(html):
+    links.default_classifier().classify(html)
+
+
+def bench(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--anchors", type=int, nargs="+", default=[500, 2000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    base = "https://bench.test"
+    print(f"{'scope':>10} {'anchors':>8} {'naive ms':>10} {'classifier ms':>14} {'speedup':>8}")
+    for n in args.anchors:
+        html = make_homepage(n)
+        for scope, naive_fn, fast_fn, fargs in (
+            ("labels", naive_labels, classifier_labels, (html,)),
+            ("extractors", naive_homepage, classifier_homepage, (html, base)),
+        ):
+            naive = bench(naive_fn, *fargs, repeat=args.repeat)
+            fast = bench(fast_fn, *fargs, repeat=args.repeat)
+            print(f"{scope:>10} {n:>8} {naive * 1000:>10.1f} {fast * 1000:>14.1f} {naive / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
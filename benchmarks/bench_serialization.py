@@ -0,0 +1,63 @@
+"""Serialization throughput for large `BrandContext` responses: the stdlib JSON path of
+FastAPI's default JSONResponse vs. orjson (`app.api.http.JSONResponseClass`), and the cost
+and ratio of the gzip/brotli encodings `CompressionMiddleware` negotiates.
+
+    python benchmarks/bench_serialization.py --products 2000 10000
+"""
+import argparse, datetime, json, os, random, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from app.api.http import JSONResponseClass, brotli, compress  # noqa: E402
+from app.schemas.models import BrandContext  # noqa: E402
+from app.scraping.catalog import ProductRecord, to_products  # noqa: E402
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_catalog_memory import shopify_product  # noqa: E402
+
+
+def brand_context(n: int) -> BrandContext:
+    rnd = random.Random(n)
+    records = [ProductRecord("https://demo.test", shopify_product(i, rnd)) for i in range(n)]
+    return BrandContext(website="https://demo.test", brand_name="Demo", product_catalog=to_products(records),
+                        fetched_at=datetime.datetime(2024, 1, 1))
+
+
+def best(fn, repeat):
+    out, t_best = None, float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        t_best = min(t_best, time.perf_counter() - t)
+    return t_best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, nargs="+", default=[2000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(f"{'products':>9} {'MB':>6} {'stdlib MB/s':>12} {'orjson MB/s':>12} {'speedup':>8}"
+          f" {'gzip ms':>8} {'gzip %':>7} {'br ms':>7} {'br %':>6}")
+    for n in args.products:
+        ctx = brand_context(n)
+        # FastAPI has already turned the response model into JSON-compatible data at this point
+        data = ctx.model_dump(mode="json")
+        t_std, body = best(lambda: JSONResponse(data).body, args.repeat)
+        t_fast, fast_body = best(lambda: JSONResponseClass(data).body, args.repeat)
+        assert json.loads(fast_body) == json.loads(body)
+        mb = len(body) / 2**20
+        t_gz, gz = best(lambda: compress(fast_body, "gzip"), args.repeat)
+        line = (f"{n:>9} {mb:>6.1f} {mb / t_std:>12.1f} {mb / t_fast:>12.1f} {t_std / t_fast:>7.1f}x"
+                f" {t_gz * 1000:>8.1f} {100 * len(gz) / len(fast_body):>6.1f}%")
+        if brotli is not None:
+            t_br, br = best(lambda: compress(fast_body, "br"), args.repeat)
+            line += f" {t_br * 1000:>7.1f} {100 * len(br) / len(fast_body):>5.1f}%"
+        else:
+            line += f" {'n/a':>7} {'n/a':>6}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
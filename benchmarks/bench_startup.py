@@ -0,0 +1,79 @@
+"""Cold-start benchmark for the API process, based on `python -X importtime`.
+
+    python benchmarks/bench_startup.py            # report
+    python benchmarks/bench_startup.py --check    # fail on heavy imports or >25% regression vs baseline
+    python benchmarks/bench_startup.py --save     # refresh benchmarks/startup_baseline.json
+
+Each run is a fresh interpreter importing `app.main`; the median over runs is reported.
+"""
+import argparse, json, os, statistics, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "startup_baseline.json")
+# Must not be imported just to serve /healthz; routes load them on first use.
+HEAVY_MODULES = ["trafilatura", "extruct", "w3lib", "bs4", "lxml", "sqlalchemy", "numpy", "app.services.insights_service"]
+PROBE = "import sys, json, app.main; print(json.dumps([m for m in %r if m in sys.modules]))" % (HEAVY_MODULES,)
+
+
+def importtime(target: str = "app.main"):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def heavy_imports():
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def measure(runs: int):
+    samples = [importtime() for _ in range(runs)]
+    total = statistics.median(s["app.main"][1] for s in samples) / 1000
+    last = samples[-1]
+    app_modules = sorted(((n, c) for n, (_, c) in last.items() if n.startswith("app.")), key=lambda x: -x[1])
+    top = sorted(((n, c) for n, (_, c) in last.items()), key=lambda x: -x[1])[:10]
+    return {
+        "import_app_main_ms": round(total, 1),
+        "app_modules_ms": {n: round(c / 1000, 1) for n, c in app_modules[:10]},
+        "top_cumulative_ms": {n: round(c / 1000, 1) for n, c in top},
+        "heavy_modules_loaded": heavy_imports(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    report = measure(args.runs)
+    print(json.dumps(report, indent=2))
+    if args.save:
+        baseline = json.load(open(BASELINE)) if os.path.exists(BASELINE) else {}
+        baseline.update(import_app_main_ms=report["import_app_main_ms"], heavy_modules_loaded=report["heavy_modules_loaded"])
+        with open(BASELINE, "w") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+    if args.check:
+        failures = []
+        if report["heavy_modules_loaded"]:
+            failures.append(f"heavy modules imported at startup: {report['heavy_modules_loaded']}")
+        if os.path.exists(BASELINE):
+            with open(BASELINE) as f:
+                baseline = json.load(f)["import_app_main_ms"]
+            if report["import_app_main_ms"] > baseline * (1 + args.tolerance):
+                failures.append(f"import app.main took {report['import_app_main_ms']}ms, baseline {baseline}ms")
+        if failures:
+            sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Stream persisted catalogs as one row per variant.
+
+    python scripts/export_catalog.py --format csv --brand memy.co.in -o memy.csv
+"""
+import argparse, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import SessionLocal, init_db  # noqa: E402
+from app.services import brand_store, export  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=sorted(export.EXPORT_FORMATS), default="csv")
+    parser.add_argument("--brand", action="append", help="brand domain (repeatable); default: all brands")
+    parser.add_argument("--chunk-size", type=int, default=export.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        brand_ids = None
+        if args.brand:
+            brand_ids = [brand_store.brand_id_for(db, b) for b in args.brand]
+            missing = [b for b, i in zip(args.brand, brand_ids) if i is None]
+            if missing:
+                parser.error(f"unknown brand(s): {', '.join(missing)}")
+        _, body = export.export_stream(db, args.format, brand_ids, args.chunk_size)
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for chunk in body:
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
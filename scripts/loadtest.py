@@ -0,0 +1,371 @@
+"""Load test for POST /insights: sweep client concurrency against a local mock storefront.
+
+    python scripts/loadtest.py --concurrency 1 4 16 64 --duration 10 --products 500 --upstream-latency 20 -o report.json
+    python scripts/loadtest.py --url http://127.0.0.1:8000 --pid <worker pid> ...   # a running server
+    python scripts/loadtest.py ... --baseline previous.json                           # exit 1 on regression
+
+By default the app runs in this process (httpx ASGITransport), so event-loop lag and RSS
+are the app's own. With --url the requests go over localhost to a server started separately
+(uvicorn or gunicorn); RSS is read for --pid and loop lag is only visible through the
+/healthz probe. Either way the crawls hit a mock storefront served from a thread of this
+process, so numbers depend only on the app, the store size and the injected upstream latency.
+
+Requests are spread round-robin over --sites storefronts, each on its own loopback address
+(127.0.0.N, so Linux), and every crawl of a site sees freshly stamped content: per-host rate
+limits, page caches and the extraction memo behave as they would for distinct shops instead
+of serving one hot site. Leave INSIGHTS_SHARED_STATE_PATH unset, or the result cache answers
+repeat visits without crawling.
+
+Each level reports throughput, p50/p95/p99 latency, error rate and status counts, event-loop
+lag, /healthz latency and RSS; the JSON report also records the commit and settings so runs
+can be compared across commits.
+"""
+import argparse, asyncio, datetime, itertools, json, logging, math, os, platform, random, re, subprocess, sys, threading, time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from benchmarks.bench_catalog_memory import shopify_product  # noqa: E402
+
+REPORT_VERSION = 1
+SITE_MARK = "@@site@@"  # replaced with the site and crawl generation in every response
+_PAGE = "<html><head><title>{title}</title></head><body><main><h1>{title}</h1>{body}</main></body></html>"
+
+
+# ---------- Mock storefront ----------
+class MockStorefront:
+    """Just enough of a Shopify storefront for a full crawl, served over HTTP/1.1 from its own
+    thread and event loop so it does not compete with the app for the loop being measured.
+
+    Each of the ``sites`` shops listens on its own loopback address. Fetching a shop's home
+    page starts a new generation of it, and every response carries the shop and generation,
+    so no two crawls see the same documents.
+    """
+
+    def __init__(self, products: int = 250, latency: float = 0.0, sites: int = 64):
+        if not 1 <= sites <= 254:
+            raise ValueError("sites must be between 1 and 254")
+        rnd = random.Random(products)
+        self.catalog = [shopify_product(i, rnd) for i in range(products)]
+        for p in self.catalog:
+            p["title"] += " " + SITE_MARK
+            p["body_html"] += f"<p>{SITE_MARK}</p>"
+        self.handles = {p["handle"] for p in self.catalog}
+        self.latency = latency
+        self.hosts = [f"127.0.0.{i + 1}" for i in range(sites)]
+        self.generations: Dict[str, int] = {}
+        self.requests = 0
+        self._pages: Dict[str, bytes] = {}
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mock-storefront", daemon=True)
+
+    def start(self) -> List[str]:
+        """Start serving; returns the base URL of every site."""
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._serve, self.hosts, 0), self._loop).result()
+        return sorted(f"http://{host}:{port}" for host, port in (s.getsockname()[:2] for s in self._server.sockets))
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                target = lines[0].split(" ")[1]
+                close = any(l.lower() == "connection: close" for l in lines[1:])
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, ctype, body = self.route(target, writer.get_extra_info("sockname")[0])
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Not Found'}\r\n"
+                    f"Content-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+                    f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("latin-1") + body)
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def route(self, target: str, host: str = "127.0.0.1"):
+        path = urlsplit(target).path.rstrip("/") or "/"
+        if path == "/":
+            self.generations[host] = self.generations.get(host, 0) + 1
+        status, ctype, body = self._page(target)
+        stamp = f"{host} #{self.generations.get(host, 0)}".encode()
+        return status, ctype, body.replace(SITE_MARK.encode(), stamp)
+
+    def _page(self, target: str):
+        parts = urlsplit(target)
+        path, query = parts.path.rstrip("/") or "/", parse_qs(parts.query)
+        if path in ("/products.json", "/collections/all/products.json"):
+            limit, page = int(query.get("limit", ["30"])[0]), int(query.get("page", ["1"])[0])
+            key = f"{limit}:{page}"
+            if key not in self._pages:
+                chunk = self.catalog[(page - 1) * limit:page * limit]
+                self._pages[key] = json.dumps({"products": chunk}).encode()
+            return 200, "application/json", self._pages[key]
+        m = re.fullmatch(r"/products/([\w-]+)(\.json)?", path)
+        if m and m.group(1) in self.handles:
+            product = next(p for p in self.catalog if p["handle"] == m.group(1))
+            if m.group(2):
+                return 200, "application/json", json.dumps({"product": product}).encode()
+            return 200, "text/html", _PAGE.format(title=product["title"], body=product["body_html"]).encode()
+        if path == "/":
+            return 200, "text/html", self.home().encode()
+        if path.startswith(("/policies/", "/pages/")):
+            title = path.rsplit("/", 1)[-1].replace("-", " ").title()
+            text = f"<p>{title} for Mock Store {SITE_MARK}. " + "We ship worldwide and accept returns within 30 days. " * 20 + "</p>"
+            if "faq" in path:
+                text += "".join(f"<h3>Question {i}?</h3><p>Answer {i}.</p>" for i in range(10))
+            return 200, "text/html", _PAGE.format(title=title, body=text).encode()
+        return 404, "text/html", b"not found"
+
+    def home(self) -> str:
+        heroes = "".join(f'<a href="/products/{p["handle"]}">{p["title"]}</a>' for p in self.catalog[:6])
+        return (
+            f'<html><head><title>Mock Store {SITE_MARK}</title>'
+            '<link rel="stylesheet" href="https://cdn.shopify.com/s/files/1/0001/theme.css">'
+            '<script type="application/ld+json">{"@context":"https://schema.org","@type":"Organization",'
+            f'"name":"Mock Store {SITE_MARK}"}}</script>'
+            "</head><body>"
+            f"<section>{heroes}</section>"
+            '<footer><a href="/pages/about-us">About us</a> <a href="/pages/faq">FAQ</a> '
+            '<a href="/pages/contact">Contact</a> <a href="/policies/refund-policy">Refund policy</a> '
+            '<a href="/policies/privacy-policy">Privacy policy</a> '
+            '<a href="https://instagram.com/mockstore">Instagram</a>'
+            "</footer></body></html>"
+        )
+
+
+# ---------- Measurements ----------
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile: the smallest value with at least q% of the samples at or below it."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    ms = [v * 1000 for v in values]
+    return {"p50": _r(percentile(ms, 50)), "p95": _r(percentile(ms, 95)), "p99": _r(percentile(ms, 99)),
+            "max": _r(max(ms) if ms else None)}
+
+
+def _r(v: Optional[float]) -> Optional[float]:
+    return round(v, 2) if v is not None else None
+
+
+def rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError):
+        if pid is None:
+            import resource  # peak, not current, where /proc is unavailable
+            return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        return None
+
+
+async def _lag_monitor(samples: List[float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - t - interval))
+
+
+async def _healthz_probe(client: httpx.AsyncClient, samples: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        t = time.perf_counter()
+        try:
+            await client.get("/healthz")
+            samples.append(time.perf_counter() - t)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+
+
+async def run_level(client: httpx.AsyncClient, sites: Iterator[str], concurrency: int, duration: float,
+                    in_process: bool, pid: Optional[int], timeout: float) -> dict:
+    loop = asyncio.get_running_loop()
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lag: List[float] = []
+    healthz: List[float] = []
+    stop = asyncio.Event()
+    deadline = loop.time() + duration
+
+    async def user():
+        while loop.time() < deadline:
+            t = time.perf_counter()
+            try:
+                r = await client.post("/insights", json={"website_url": next(sites)}, timeout=timeout)
+                statuses[str(r.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - t)
+
+    monitors = [asyncio.create_task(_healthz_probe(client, healthz, stop))]
+    if in_process:
+        monitors.append(asyncio.create_task(_lag_monitor(lag, stop)))
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*monitors)
+    total = sum(statuses.values())
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": round(statuses["200"] / elapsed, 2),
+        "error_rate": round(1 - statuses["200"] / total, 4) if total else None,
+        "statuses": dict(statuses),
+        "latency_ms": summarize(latencies),
+        "loop_lag_ms": summarize(lag) if in_process else None,
+        "healthz_ms": summarize(healthz),
+        "rss_mb": rss_mb(pid if not in_process else None),
+    }
+
+
+def saturation(levels: List[dict], p99_slo_ms: float, max_error_rate: float) -> dict:
+    """Highest concurrency still within the p99 SLO and error budget, and the peak throughput."""
+    ok = [l for l in levels if (l["error_rate"] or 0) <= max_error_rate
+          and l["latency_ms"]["p99"] is not None and l["latency_ms"]["p99"] <= p99_slo_ms]
+    peak = max(levels, key=lambda l: l["throughput_rps"], default=None)
+    return {"p99_slo_ms": p99_slo_ms, "max_error_rate": max_error_rate,
+            "max_concurrency_within_slo": max((l["concurrency"] for l in ok), default=None),
+            "peak_throughput_rps": peak["throughput_rps"] if peak else None,
+            "peak_at_concurrency": peak["concurrency"] if peak else None}
+
+
+def compare(baseline: dict, report: dict, tolerance: float) -> List[str]:
+    """Regressions of `report` against `baseline` at the concurrency levels both ran."""
+    old = {l["concurrency"]: l for l in baseline["levels"]}
+    problems = []
+    for level in report["levels"]:
+        before = old.get(level["concurrency"])
+        if before is None:
+            continue
+        c = level["concurrency"]
+        if before["throughput_rps"] and level["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            problems.append(f"c={c}: throughput {before['throughput_rps']} -> {level['throughput_rps']} rps")
+        p99_old, p99_new = before["latency_ms"]["p99"], level["latency_ms"]["p99"]
+        if p99_old and p99_new and p99_new > p99_old * (1 + tolerance):
+            problems.append(f"c={c}: p99 {p99_old} -> {p99_new} ms")
+        if (level["error_rate"] or 0) > (before["error_rate"] or 0) + 0.01:
+            problems.append(f"c={c}: error rate {before['error_rate']} -> {level['error_rate']}")
+    return problems
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def sweep(args) -> dict:
+    storefront = MockStorefront(args.products, args.upstream_latency / 1000, args.sites)
+    sites = itertools.cycle(storefront.start())
+    in_process = args.url is None
+    if in_process:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest")
+    else:
+        client = httpx.AsyncClient(base_url=args.url, limits=httpx.Limits(max_connections=None))
+    levels = []
+    try:
+        async with client:
+            r = await client.post("/insights", json={"website_url": next(sites)}, timeout=args.timeout)  # warm-up
+            if r.status_code != 200:
+                raise SystemExit(f"warm-up crawl failed: {r.status_code} {r.text[:200]}")
+            for c in args.concurrency:
+                level = await run_level(client, sites, c, args.duration, in_process, args.pid, args.timeout)
+                levels.append(level)
+                lat, lag = level["latency_ms"], level["loop_lag_ms"] or {}
+                print(f"{c:>6} {level['requests']:>7} {level['throughput_rps']:>8} {lat['p50']:>9} {lat['p95']:>9}"
+                      f" {lat['p99']:>9} {level['error_rate']:>7} {lag.get('p99', '-'):>8} {level['rss_mb'] or '-':>7}",
+                      file=sys.stderr)
+    finally:
+        storefront.stop()
+    return {
+        "version": REPORT_VERSION,
+        "meta": {
+            "commit": _commit(),
+            "started_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mode": "in-process" if in_process else "localhost",
+            "url": args.url,
+            "products": args.products,
+            "sites": args.sites,
+            "upstream_latency_ms": args.upstream_latency,
+            "duration_s": args.duration,
+            "upstream_requests": storefront.requests,
+            "settings": {k: getattr(settings, k) for k in (
+                "INSIGHTS_ADMIT_SLOTS", "INSIGHTS_ADMIT_QUEUE", "INSIGHTS_ADMIT_DEADLINE",
+                "INSIGHTS_MAX_CONCURRENCY", "INSIGHTS_MAX_PRODUCTS", "INSIGHTS_SHARED_STATE_PATH")},
+        },
+        "levels": levels,
+        "saturation": saturation(levels, args.p99_slo, args.max_error_rate),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--products", type=int, default=250, help="mock store catalog size")
+    parser.add_argument("--sites", type=int, default=64, help="distinct mock stores to spread requests over (max 254)")
+    parser.add_argument("--upstream-latency", type=float, default=20.0, help="ms added to every storefront response")
+    parser.add_argument("--url", help="base URL of a running server; default: run the app in-process")
+    parser.add_argument("--pid", type=int, help="server pid to read RSS from (with --url)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request (s)")
+    parser.add_argument("--p99-slo", type=float, default=5000.0, help="p99 latency (ms) for the saturation summary")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("-o", "--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier report to compare against; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args(argv)
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per upstream request otherwise
+
+    print(f"{'conc':>6} {'reqs':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>7}"
+          f" {'lag p99':>8} {'rss MB':>7}", file=sys.stderr)
+    report = asyncio.run(sweep(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    s = report["saturation"]
+    print(f"within SLO up to concurrency {s['max_concurrency_within_slo']}; "
+          f"peak {s['peak_throughput_rps']} rps at {s['peak_at_concurrency']}", file=sys.stderr)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(json.load(f), report, args.tolerance)
+        for p in problems:
+            print("REGRESSION " + p, file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Re-run extraction over archived crawls, in parallel across CPU cores.
+
+    python scripts/reextract.py --archive ./archive --workers 8 -o contexts.ndjson --persist
+
+Every job replays one recorded crawl through `gather_insights(..., replay=crawl_id)`, so
+current extractors see exactly the responses the store returned at the time, and nothing
+touches the network. Workers return JSON; the parent writes NDJSON and, with --persist,
+stores the results through the usual persistence path (a single DB writer).
+"""
+import argparse, asyncio, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings  # noqa: E402
+from app.scraping.archive import get_archive  # noqa: E402
+
+
+def replay_one(job):
+    base, crawl_id = job
+    from app.services.insights_service import gather_insights
+    try:
+        ctx = asyncio.run(gather_insights(base, replay=crawl_id))
+        return base, crawl_id, ctx.model_dump_json() if ctx is not None else None, None
+    except Exception as e:  # one broken crawl must not stop the batch
+        return base, crawl_id, None, f"{type(e).__name__}: {e}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archive", default=settings.INSIGHTS_ARCHIVE_DIR, help="archive directory (INSIGHTS_ARCHIVE_DIR)")
+    parser.add_argument("--brand", action="append", help="store base URL (repeatable); default: every archived store")
+    parser.add_argument("--all-crawls", action="store_true", help="replay every crawl, not just the newest per store")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-o", "--output", help="NDJSON output file")
+    parser.add_argument("--persist", action="store_true", help="persist results to the database")
+    args = parser.parse_args(argv)
+    if not args.archive:
+        parser.error("--archive or INSIGHTS_ARCHIVE_DIR is required")
+    if args.persist and args.all_crawls:
+        parser.error("--persist replays only the newest crawl per store")
+    # workers started with "spawn" read the setting from the environment
+    os.environ["INSIGHTS_ARCHIVE_DIR"] = settings.INSIGHTS_ARCHIVE_DIR = args.archive
+
+    jobs = [(base, crawl_id) for crawl_id, base, _ in get_archive().crawls(latest_only=not args.all_crawls)
+            if not args.brand or base in args.brand]
+    db = None
+    if args.persist:
+        from app.db import SessionLocal, init_db
+        init_db()
+        db = SessionLocal()
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    started, ok, skipped, failed = time.perf_counter(), 0, 0, 0
+    try:
+        if args.workers > 1 and len(jobs) > 1:
+            pool = ProcessPoolExecutor(max_workers=args.workers)
+            results = pool.map(replay_one, jobs, chunksize=max(1, len(jobs) // (args.workers * 8)))
+        else:
+            pool, results = None, map(replay_one, jobs)
+        for base, crawl_id, payload, error in results:
+            if error:
+                failed += 1
+                print(f"{base} (crawl {crawl_id}): {error}", file=sys.stderr)
+                continue
+            if payload is None:
+                skipped += 1
+                continue
+            ok += 1
+            if out is not None:
+                out.write(payload + "\n")
+            if db is not None:
+                from app.schemas.models import BrandContext
+                from app.services.brand_store import persist_brand_context
+                persist_brand_context(db, BrandContext.model_validate_json(payload))
+        if pool is not None:
+            pool.shutdown()
+    finally:
+        if out is not None:
+            out.close()
+        if db is not None:
+            db.close()
+    print(f"{len(jobs)} crawls: {ok} extracted, {skipped} not Shopify, {failed} failed "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
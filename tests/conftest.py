@@ -0,0 +1,63 @@
+import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi.testclient import TestClient
+from app.db import Base, get_db
+from app import models  # noqa: F401 - registers tables
+from app.main import app
+from app.schemas.models import BrandContext
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    db = Session()
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def client(db_session):
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def _make_context(website="https://demo-store.com", n_products=5, **kw):
+    products = [
+        {
+            "handle": f"item-{i}",
+            "title": f"Item {i}",
+            "url": f"{website}/products/item-{i}",
+            "price": float(10 * (i + 1)),
+            "tags": ["sale"] if i % 2 else ["new"],
+            "variants": [{"id": i, "title": "Default", "price": float(10 * (i + 1)), "available": True, "sku": f"SKU{i}"}],
+        }
+        for i in range(n_products)
+    ]
+    data = {
+        "website": website,
+        "brand_name": "Demo",
+        "about_text": "We sell demo things.",
+        "product_catalog": products,
+        "policies": [{"type": "refund", "url": f"{website}/policies/refund-policy", "content_text": "30 day refunds"}],
+        "faqs": [{"question": "Do you ship?", "answer": "Yes, worldwide."}],
+        "socials": [{"platform": "instagram", "url": "https://instagram.com/demo", "handle": "demo"}],
+        "fetched_at": datetime.datetime(2024, 1, 1),
+    }
+    data.update(kw)
+    return BrandContext(**data)
+
+
+@pytest.fixture
+def make_context():
+    return _make_context
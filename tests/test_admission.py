@@ -0,0 +1,92 @@
+import asyncio, datetime
+import pytest
+from app.api import admission
+from app.core.config import settings
+from app.core.shared_state import RESULTS, get_store
+from app.scraping.fetcher import normalize_url
+from app.schemas.models import BrandContext
+from app.api.admission import AdmissionController, PriorityClass, Overloaded, INTERACTIVE, BULK
+
+
+def _controller(slots=1, bulk_slots=1, queue=4, deadline=1.0):
+    return AdmissionController(slots, [
+        PriorityClass(INTERACTIVE, weight=4, max_active=slots, queue_limit=queue, deadline=deadline),
+        PriorityClass(BULK, weight=1, max_active=bulk_slots, queue_limit=queue, deadline=deadline),
+    ])
+
+
+async def _hold(ctl, priority, order, gate):
+    async with ctl.slot(priority):
+        order.append(priority)
+        await gate.wait()
+
+
+@pytest.mark.asyncio
+async def test_queue_full_and_deadline_shed_with_retry_after():
+    ctl = _controller(queue=1, deadline=0.05)
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold(ctl, INTERACTIVE, [], gate))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold(ctl, INTERACTIVE, [], gate))
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded) as full:
+        await _hold(ctl, INTERACTIVE, [], gate)
+    with pytest.raises(Overloaded):
+        await waiter  # waited past the deadline
+    gate.set()
+    await holder
+    assert full.value.status_code == 503 and int(full.value.headers["Retry-After"]) >= 1
+    stats = ctl.stats()["classes"][INTERACTIVE]
+    assert (stats["admitted"], stats["shed"], stats["expired"], stats["queued"], stats["active"]) == (1, 1, 1, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_weighted_dispatch_and_bulk_cap():
+    ctl = _controller(slots=2, bulk_slots=1, queue=10)
+    order, gate = [], asyncio.Event()
+    tasks = [asyncio.create_task(_hold(ctl, BULK, order, gate)) for _ in range(3)]
+    await asyncio.sleep(0)
+    # bulk holds one slot at most, so interactive still starts immediately
+    tasks.append(asyncio.create_task(_hold(ctl, INTERACTIVE, order, gate)))
+    await asyncio.sleep(0)
+    assert order == [BULK, INTERACTIVE]
+    tasks += [asyncio.create_task(_hold(ctl, INTERACTIVE, order, gate)) for _ in range(4)]
+    await asyncio.sleep(0)
+    assert ctl.stats()["classes"][BULK]["queued"] == 2
+    gate.set()
+    await asyncio.gather(*tasks)
+    # with weights 4:1 the queued interactive requests are served ahead of the queued bulk ones
+    assert order == [BULK] + [INTERACTIVE] * 5 + [BULK] * 2 and ctl.active == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue():
+    ctl = _controller()
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold(ctl, INTERACTIVE, [], gate))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold(ctl, INTERACTIVE, [], gate))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    gate.set()
+    await holder
+    assert ctl.stats()["classes"][INTERACTIVE]["queued"] == 0 and ctl.active == 0
+
+
+def test_insights_sheds_with_503(client, monkeypatch):
+    monkeypatch.setattr(admission, "_controller", _controller(slots=0, queue=0))
+    r = client.post("/insights", json={"website_url": "https://demo-store.com"})
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+    assert client.get("/metrics/admission").json()["classes"]["interactive"]["shed"] == 1
+
+
+def test_cached_insights_skip_admission(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "INSIGHTS_SHARED_STATE_PATH", str(tmp_path / "state.db"))
+    monkeypatch.setattr(admission, "_controller", _controller(slots=0, queue=0))
+    cached = BrandContext(website="https://demo-store.com", brand_name="Demo", fetched_at=datetime.datetime.now(datetime.timezone.utc))
+    get_store().set_text(RESULTS, normalize_url("https://demo-store.com"), cached.model_dump_json(), ttl=60)
+    r = client.post("/insights", json={"website_url": "https://demo-store.com"})
+    assert r.status_code == 200 and r.json()["brand_name"] == "Demo"
+    assert client.get("/metrics/admission").json()["classes"]["interactive"]["shed"] == 0
+    monkeypatch.setattr(settings, "INSIGHTS_SHARED_STATE_PATH", None)
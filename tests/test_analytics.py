@@ -0,0 +1,54 @@
+from app.services.analytics import CatalogColumns, price_analytics, legacy_price_insights
+from app.services.brand_store import persist_brand_context
+
+CATALOG = [
+    {"tags": ["shoes", "sale"], "raw": {"product_type": "Footwear"},
+     "variants": [{"price": "100.00", "compare_at_price": "125.00", "available": True},
+                  {"price": "90.00", "compare_at_price": None, "available": False}]},
+    {"tags": ["shoes"], "raw": {"product_type": "Footwear"},
+     "variants": [{"price": "50", "compare_at_price": "", "available": True}]},
+    {"tags": ["hats"], "raw": {"product_type": "Accessories"},
+     "variants": [{"price": "bad", "compare_at_price": "10", "available": None},
+                  {"price": 20.0, "compare_at_price": 40.0, "available": True}]},
+]
+
+
+def test_price_analytics():
+    stats = price_analytics(CatalogColumns(CATALOG), group_by="tag")
+    assert stats["total_products"] == 3 and stats["total_variants"] == 5
+    assert stats["product_prices"]["median"] == 50.0
+    assert stats["variant_prices"]["count"] == 4
+    assert stats["discounts"]["variants_on_sale"] == 2
+    assert stats["discounts"]["avg_discount_pct"] == 35.0
+    assert stats["discounts"]["histogram"]["20-30"] == 1 and stats["discounts"]["histogram"]["50-60"] == 1
+    assert stats["in_stock_ratio"] == 0.75
+    bands = {b["group"]: b for b in stats["price_bands"]}
+    assert bands["shoes"]["products"] == 2 and bands["shoes"]["median"] == 70.0
+    assert bands["hats"]["min"] == 20.0
+
+
+def test_legacy_price_insights_keys():
+    out = legacy_price_insights(CatalogColumns(CATALOG))
+    assert out["average_price"] == 75.0 and out["products_on_sale"] == 2
+    assert legacy_price_insights(CatalogColumns([])) == {}
+
+
+def test_analytics_endpoint(client, db_session, make_context):
+    persist_brand_context(db_session, make_context(n_products=4))
+    body = client.get("/analytics", params={"brand": "demo-store.com", "group_by": "tag"}).json()
+    assert body["total_products"] == 4
+    assert {b["group"] for b in body["price_bands"]} == {"sale", "new"}
+    assert client.get("/analytics", params={"brand": "nope.com"}).status_code == 404
+
+
+def test_compact_records_match_pydantic_products():
+    from app.scraping.catalog import ProductRecord
+    shopify = [
+        {"handle": f"p{i}", "title": f"P{i}", "tags": c["tags"], "product_type": c["raw"]["product_type"],
+         "body_html": "<p>long</p>", "variants": c["variants"]}
+        for i, c in enumerate(CATALOG)
+    ]
+    records = [ProductRecord("https://shop.test", p) for p in shopify]
+    products = [r.to_product() for r in records]
+    assert price_analytics(CatalogColumns(records), group_by="tag") == price_analytics(CatalogColumns(products), group_by="tag")
+    assert records[0].tags[0] is records[1].tags[0]  # interned
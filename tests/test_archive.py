@@ -0,0 +1,123 @@
+import datetime, gzip, json
+import httpx
+import pytest
+from app.core.config import settings
+from app.core.shared_state import PAGES, get_store
+from app.scraping.archive import ArchiveMiss, PageArchive, RecordingTransport, get_archive, recording
+from app.scraping.fetcher import fetch_body, fetch_json_items
+from app.services.insights_service import gather_insights
+from scripts import reextract
+
+BASE = "https://shop.test"
+HOME = '<html><head><title>Shop</title><script src="https://cdn.shopify.com/x.js"></script></head><body></body></html>'
+PRODUCTS = {"products": [{"id": 1, "handle": "p1", "title": "P1", "tags": "a", "variants": [{"id": 1, "price": "5.00"}]}]}
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INSIGHTS_ARCHIVE_DIR", str(tmp_path / "archive"))
+    return get_archive()
+
+
+@pytest.mark.asyncio
+async def test_recorded_responses_replay_without_network(archive):
+    async def chunked(payload):
+        for i in range(0, len(payload), 16):
+            yield payload[i:i + 16]
+
+    def handler(request):
+        if request.url.path == "/":
+            # streamed and gzip-encoded: archived as raw bytes while the fetcher reads them
+            return httpx.Response(200, content=chunked(gzip.compress(HOME.encode())), headers={"Content-Encoding": "gzip"})
+        if request.url.path == "/big":
+            return httpx.Response(200, content=chunked(b"x" * 100))
+        if request.url.path == "/products.json":
+            return httpx.Response(200, json=PRODUCTS)
+        return httpx.Response(404)
+
+    recorder = archive.recorder(BASE, inner=httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=recorder) as client:
+        assert await fetch_body(client, BASE + "/") == (200, HOME)
+        assert await fetch_body(client, BASE + "/missing") == (404, None)
+        assert await fetch_json_items(client, BASE + "/products.json", "products", lambda p: p["handle"]) == ["p1"]
+        # abandoned for being too large: not archived
+        assert await fetch_body(client, BASE + "/big", max_bytes=10) == (200, None)
+
+    replay = archive.replayer(BASE)
+    assert replay.crawl_id == recorder.crawl_id
+    async with httpx.AsyncClient(transport=replay) as client:
+        assert await fetch_body(client, BASE + "/") == (200, HOME)
+        assert await fetch_body(client, BASE + "/missing") == (404, None)
+        assert await fetch_json_items(client, BASE + "/products.json", "products", lambda p: p["handle"]) == ["p1"]
+        assert await fetch_body(client, BASE + "/never-fetched") == (404, None)
+        assert await fetch_body(client, BASE + "/big") == (404, None)
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_hits_are_archived_while_recording(archive, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INSIGHTS_SHARED_STATE_PATH", str(tmp_path / "state.db"))
+    get_store().set_text(PAGES, BASE + "/cached", "<p>café</p>", ttl=60)
+    network = []
+    recorder = archive.recorder(BASE, inner=httpx.MockTransport(lambda request: network.append(request) or httpx.Response(404)))
+    with recording(recorder):
+        async with httpx.AsyncClient(transport=recorder) as client:
+            assert await fetch_body(client, BASE + "/cached") == (200, "<p>café</p>")
+    assert network == []
+    monkeypatch.setattr(settings, "INSIGHTS_SHARED_STATE_PATH", None)
+    async with httpx.AsyncClient(transport=archive.replayer(BASE)) as client:
+        assert await fetch_body(client, BASE + "/cached") == (200, "<p>café</p>")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [16, 1 << 20])
+async def test_streamed_products_json_is_archived(archive, chunk_size):
+    url = BASE + "/products.json?limit=250&page=1"
+
+    async def chunked(payload):
+        for i in range(0, len(payload), chunk_size):
+            yield payload[i:i + chunk_size]
+
+    def handler(request):
+        if request.url.path == "/":
+            return httpx.Response(200, content=chunked(HOME.encode()))
+        if request.url.path == "/products.json":
+            return httpx.Response(200, content=chunked(json.dumps(PRODUCTS).encode()))
+        return httpx.Response(404)
+
+    recorder = archive.recorder(BASE, inner=httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=recorder) as client:
+        assert await fetch_body(client, BASE + "/") == (200, HOME)
+        # returns once the array closes; the trailing "}" is still read so the body is archived
+        assert await fetch_json_items(client, url, "products", lambda p: p["handle"]) == ["p1"]
+    assert archive.get(recorder.crawl_id, url)[2] == json.dumps(PRODUCTS).encode()
+    ctx = await gather_insights(BASE, replay="latest")
+    assert [p.handle for p in ctx.product_catalog] == ["p1"]
+
+
+def _record_store(archive: PageArchive, base: str, started_at: float):
+    crawl = archive.start_crawl(base, started_at)
+    archive.put(crawl, base + "/", 200, [("content-type", "text/html")], HOME.encode())
+    archive.put(crawl, base + "/products.json?limit=250&page=1", 200, [("content-type", "application/json")],
+                json.dumps(PRODUCTS).encode())
+    return crawl
+
+
+@pytest.mark.asyncio
+async def test_gather_insights_replays_archived_crawl(archive):
+    _record_store(archive, BASE, 1_700_000_000)
+    ctx = await gather_insights(BASE, replay="latest")
+    assert [p.handle for p in ctx.product_catalog] == ["p1"]
+    assert ctx.fetched_at == datetime.datetime(2023, 11, 14, 22, 13, 20, tzinfo=datetime.timezone.utc)
+    with pytest.raises(ArchiveMiss):
+        await gather_insights("https://unknown.test", replay="latest")
+
+
+def test_reextract_cli(archive, tmp_path, capsys):
+    _record_store(archive, "https://a.test", 1_700_000_000)
+    _record_store(archive, "https://a.test", 1_700_000_100)
+    _record_store(archive, "https://b.test", 1_700_000_000)
+    out = tmp_path / "out.ndjson"
+    assert reextract.main(["--archive", settings.INSIGHTS_ARCHIVE_DIR, "--workers", "1", "-o", str(out)]) == 0
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert sorted(r["website"] for r in rows) == ["https://a.test/", "https://b.test/"]
+    assert "2 crawls: 2 extracted" in capsys.readouterr().err
@@ -0,0 +1,25 @@
+"""Parity of AsyncShopifyScraper's selectolax extractors with the recorded outputs of the
+previous BeautifulSoup('html.parser') implementation (tests/fixtures/async_scraper/expected.json)."""
+import json, os
+import pytest
+from app.schemas.models import Product
+from app.scraping.async_scraper import AsyncShopifyScraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "async_scraper")
+EXPECTED = json.load(open(os.path.join(FIXTURES, "expected.json"), encoding="utf-8"))
+HANDLES = ["leather-wallet", "canvas-tote", "belt", "card-holder", "x", "relative"]
+
+
+@pytest.fixture(scope="module")
+def scraper():
+    return AsyncShopifyScraper("https://demo.test")
+
+
+@pytest.mark.parametrize("page", sorted(EXPECTED))
+def test_outputs_match_recorded(scraper, page):
+    html = open(os.path.join(FIXTURES, page + ".html"), encoding="utf-8").read()
+    products = [Product(handle=h) for h in HANDLES]
+    tree = scraper._tree(html)
+    assert scraper._extract_hero_products(tree, products) == EXPECTED[page]["hero"]
+    assert scraper._parse_faqs(html) == EXPECTED[page]["faqs"]
+    assert scraper._extract_seo(tree) == EXPECTED[page]["seo"]
@@ -0,0 +1,40 @@
+from app.services.brand_store import persist_brand_context
+
+
+def test_get_brand_reads_persisted_rows(client, db_session, make_context):
+    persist_brand_context(db_session, make_context())
+    r = client.get("/brands/demo-store.com")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["brand_name"] == "Demo"
+    assert body["product_count"] == 5
+    assert body["policies"][0]["type"] == "refund"
+    assert body["socials"][0]["handle"] == "demo"
+    assert client.get("/brands/unknown.com").status_code == 404
+
+
+def test_products_cursor_pagination_and_filters(client, db_session, make_context):
+    persist_brand_context(db_session, make_context(n_products=7))
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, "sort": "-price"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/brands/demo-store.com/products", params=params).json()
+        seen += [p["price"] for p in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == sorted(seen, reverse=True) and len(seen) == 7
+
+    page = client.get("/brands/demo-store.com/products", params={"tag": "sale", "min_price": 30}).json()
+    assert [p["handle"] for p in page["items"]] == ["item-3", "item-5"]
+    assert client.get("/brands/demo-store.com/products", params={"cursor": "!!"}).status_code == 400
+
+
+def test_persist_replaces_previous_crawl(client, db_session, make_context):
+    persist_brand_context(db_session, make_context(n_products=5))
+    persist_brand_context(db_session, make_context(n_products=2))
+    assert client.get("/brands/demo-store.com").json()["product_count"] == 2
+    policies = client.get("/brands/demo-store.com/policies", params={"type": "refund"}).json()
+    assert len(policies) == 1
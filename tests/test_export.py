@@ -0,0 +1,32 @@
+import csv, io, json
+import pytest
+from app.services import export
+from app.services.brand_store import persist_brand_context
+
+
+def test_csv_and_ndjson_one_row_per_variant(client, db_session, make_context):
+    persist_brand_context(db_session, make_context(n_products=3))
+    persist_brand_context(db_session, make_context(website="https://other-store.com", n_products=2))
+
+    r = client.get("/export", params={"format": "csv", "chunk_size": 100})
+    assert r.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == 5 and rows[0]["sku"] == "SKU0" and rows[0]["price"] == "10.0"
+
+    r = client.get("/export", params={"format": "ndjson", "brand": "other-store.com"})
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert {row["brand"] for row in rows} == {"https://other-store.com/"} and len(rows) == 2
+
+
+def test_rows_are_chunked(db_session, make_context):
+    persist_brand_context(db_session, make_context(n_products=7))
+    batches = list(export.iter_variant_rows(db_session, chunk_size=3))
+    assert [len(b) for b in batches] == [3, 3, 1]
+
+
+def test_parquet_export(client, db_session, make_context):
+    pq = pytest.importorskip("pyarrow.parquet")
+    persist_brand_context(db_session, make_context(n_products=4))
+    r = client.get("/export", params={"format": "parquet", "chunk_size": 100})
+    table = pq.read_table(io.BytesIO(r.content))
+    assert table.num_rows == 4 and table.column("price").to_pylist()[0] == 10.0
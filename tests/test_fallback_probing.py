@@ -0,0 +1,66 @@
+import asyncio, time
+import httpx
+import pytest
+from app.scraping.async_scraper import AsyncShopifyScraper
+from app.scraping.fetcher import first_success
+
+
+async def _after(delay, value, log=None):
+    try:
+        await asyncio.sleep(delay)
+    except asyncio.CancelledError:
+        if log is not None:
+            log.append(value)
+        raise
+    if isinstance(value, Exception):
+        raise value
+    return value
+
+
+@pytest.mark.asyncio
+async def test_priority_wins_over_faster_fallback():
+    assert await first_success(_after(0.05, "primary"), _after(0.0, "fallback")) == "primary"
+    assert await first_success(_after(0.05, None), _after(0.0, "fallback")) == "fallback"
+    assert await first_success(_after(0.0, ValueError()), _after(0.01, "fallback")) == "fallback"
+    assert await first_success(_after(0.0, None), _after(0.0, "")) is None
+    assert await first_success(_after(0.0, []), _after(0.0, [1]), accept=lambda r: r is not None) == []
+
+
+@pytest.mark.asyncio
+async def test_lower_priority_probes_are_cancelled():
+    cancelled = []
+    start = time.perf_counter()
+    result = await first_success(_after(0.0, "a"), _after(5, "b", cancelled), _after(5, "c", cancelled))
+    assert result == "a"
+    assert sorted(cancelled) == ["b", "c"]
+    assert time.perf_counter() - start < 1
+
+
+@pytest.mark.asyncio
+async def test_scrape_latency_is_bounded_by_slowest_chain():
+    delay = 0.1
+    pages = {
+        "/": "<html><head><title>Demo</title></head><body></body></html>",
+        "/pages/help": "<h3>Q?</h3><p>A.</p>",
+        "/pages/return": "Returns accepted",
+    }
+
+    async def handler(request):
+        await asyncio.sleep(delay)
+        path = request.url.path
+        if path == "/collections/all/products.json":
+            return httpx.Response(200, json={"products": [{"handle": "p1", "title": "P1", "variants": [{"price": "5"}]}]})
+        if path in pages:
+            return httpx.Response(200, text=pages[path])
+        return httpx.Response(404)
+
+    scraper = AsyncShopifyScraper("https://demo.test")
+    scraper.client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://demo.test")
+    start = time.perf_counter()
+    out = await scraper.scrape()
+    elapsed = time.perf_counter() - start
+    # 16 probes at `delay` each would take 1.6s sequentially
+    assert elapsed < delay * 5
+    assert [p.handle for p in out["products"]] == ["p1"]
+    assert out["policies"]["return"] == "Returns accepted"
+    assert out["policies"]["privacy"] is None
@@ -0,0 +1,92 @@
+import json
+import httpx
+import pytest
+from app.core.config import settings
+from app.scraping.catalog import to_products
+from app.scraping.extractors import fetch_all_products
+from app.scraping.fetcher import fetch_body, fetch_json_items
+
+
+def _chunked(payload: bytes, size: int = 7):
+    async def gen():
+        for i in range(0, len(payload), size):
+            yield payload[i:i + size]
+    return gen()
+
+
+def _client(routes):
+    def handler(request):
+        body = routes.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        return httpx.Response(200, content=_chunked(body))
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://shop.test")
+
+
+def _products(n, offset=0):
+    return {"products": [
+        {"id": i, "handle": f"p{i}", "title": f"P {i}", "body_html": "<p>" + "x" * 500 + "</p>",
+         "tags": "a, b", "options": [{"name": "Size", "values": ["S"]}],
+         "variants": [{"id": i, "price": "9.50", "compare_at_price": "12", "sku": f"S{i}"}]}
+        for i in range(offset, offset + n)
+    ]}
+
+
+@pytest.mark.asyncio
+async def test_items_are_parsed_incrementally():
+    payload = json.dumps(_products(5)).encode()
+    async with _client({"/products.json": payload}) as client:
+        items = await fetch_json_items(client, "/products.json", "products", lambda p: p["handle"])
+        assert items == [f"p{i}" for i in range(5)] and not items.truncated
+        assert await fetch_json_items(client, "/missing.json", "products", lambda p: p) is None
+
+
+@pytest.mark.asyncio
+async def test_size_limits_abort_early():
+    payload = json.dumps(_products(5)).encode()
+    async with _client({"/products.json": payload, "/": b"<html>" + b"a" * 1000 + b"</html>"}) as client:
+        items = await fetch_json_items(client, "/products.json", "products", lambda p: p["id"], max_bytes=len(payload) // 2)
+        assert 0 < len(items) < 5 and items.truncated
+        assert await fetch_body(client, "/", max_bytes=100) == (200, None)
+        status, body = await fetch_body(client, "/", max_bytes=10_000)
+        assert status == 200 and body.startswith("<html>")
+
+
+@pytest.mark.asyncio
+async def test_large_items_in_small_chunks_and_cut_off_bodies():
+    products = _products(3)
+    products["products"][1]["body_html"] = "x" * 200_000
+    payload = json.dumps(products).encode()
+    async with _client({"/products.json": payload, "/cut.json": payload[:len(payload) - 40]}) as client:
+        calls = []
+        items = await fetch_json_items(client, "/products.json", "products", lambda p: calls.append(1) or p["id"])
+        assert items == [0, 1, 2] and not items.truncated and len(calls) == 3
+        items = await fetch_json_items(client, "/cut.json", "products", lambda p: p["id"])
+        assert items == [0, 1] and items.truncated
+
+
+@pytest.mark.asyncio
+async def test_truncated_catalog_is_flagged():
+    payload = json.dumps(_products(5)).encode()
+    async with _client({"/products.json": payload[:len(payload) // 2]}) as client:
+        products = await fetch_all_products(client, "https://shop.test")
+    assert 0 < len(products) < 5 and products.truncated
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_products_materializes_records(monkeypatch):
+    payload = json.dumps(_products(3)).encode()
+    async with _client({"/products.json": payload}) as client:
+        products = await fetch_all_products(client, "https://shop.test", cap=2)
+        assert products[0].raw["body_html"].startswith("<p>x")
+        monkeypatch.setattr(settings, "INSIGHTS_RAW_BODY_HTML", False)
+        products = await fetch_all_products(client, "https://shop.test", cap=2)
+    assert [p.handle for p in products] == ["p0", "p1"]
+    assert "body_html" not in products[0].raw and products[0].tags == ("a", "b")
+    assert products[0].variants[0].compare_at_price == 12.0
+    product = products[0].to_product()
+    assert product.tags == ["a", "b"] and product.variants[0]["compare_at_price"] == 12.0
+    # options are stored nowhere else, so raw keeps them
+    assert product.raw == {"id": 0, "handle": "p0", "title": "P 0", "tags": "a, b", "options": [{"name": "Size", "values": ["S"]}]}
+    # records are released as they are converted, in order
+    assert [p.handle for p in to_products(products)] == ["p0", "p1"] and products == []
@@ -0,0 +1,70 @@
+import asyncio
+import httpx
+import pytest
+from app.scraping.catalog import ProductRecord
+from app.scraping.extractors import hero_products_from_home, product_handle
+
+BASE = "https://shop.test"
+HOME = """<a href="/en-ca/products/Alpha?variant=1">A</a> <a href="/collections/sale/products/beta">B</a>
+<a href="https://other.test/products/zzz">elsewhere</a> <a href="/products/gamma">G</a>
+<a href="https://www.shop.test/products/delta#reviews">D</a> <a href="/products/alpha">A again</a>"""
+
+
+def test_product_handle():
+    assert product_handle(BASE, "/en-ca/products/Alpha?variant=1") == "alpha"
+    assert product_handle(BASE, "https://www.shop.test/collections/x/products/beta/") == "beta"
+    assert product_handle(BASE, "https://other.test/products/zzz") is None
+    assert product_handle(BASE, "/collections/all") is None
+
+
+class _Store:
+    """Mock storefront that records requests and how many were in flight at once."""
+
+    def __init__(self, hold=None):
+        self.hold = hold  # an Event every request waits on, to keep them in flight
+        self.requests, self.active, self.peak = [], 0, 0
+
+    async def handler(self, request):
+        self.requests.append(request.url.path)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await (self.hold.wait() if self.hold is not None else asyncio.sleep(0))
+        finally:
+            self.active -= 1
+        if request.url.path == "/products/delta.json":
+            return httpx.Response(200, json={"product": {"handle": "delta", "title": "Delta", "variants": [{"price": "3"}]}})
+        if request.url.path == "/products/gamma":
+            return httpx.Response(200, text="<h1>Gamma</h1>")
+        return httpx.Response(404)
+
+    def client(self):
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+@pytest.mark.asyncio
+async def test_catalog_first_then_json_or_page():
+    catalog = [ProductRecord(BASE, {"handle": "alpha", "title": "Alpha"}), ProductRecord(BASE, {"handle": "beta", "title": "Beta"})]
+    store = _Store()
+    async with store.client() as client:
+        heroes = await hero_products_from_home(client, BASE, HOME, catalog)
+    assert [(h.title, h.price) for h in heroes] == [("Alpha", None), ("Beta", None), ("Gamma", None), ("Delta", 3.0)]
+    # the page is only requested where .json failed
+    assert sorted(store.requests) == ["/products/delta.json", "/products/gamma", "/products/gamma.json"]
+    assert store.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_lookups_run_concurrently_within_budget():
+    home = "".join(f'<a href="/products/p{i}">x</a>' for i in range(12)) + '<a href="/products/gamma">G</a>'
+    store = _Store(hold=asyncio.Event())
+    async with store.client() as client:
+        # every .json lookup is started before any completes; the held requests are dropped at the budget
+        assert await hero_products_from_home(client, BASE, home, [], budget=0.05) == []
+        assert store.peak == 12 and store.active == 0
+        assert all(path.endswith(".json") for path in store.requests)
+        gamma = '<a href="/products/gamma">G</a>'
+        # 0 is a budget, not "default": it returns at once instead of after INSIGHTS_HERO_BUDGET
+        assert await asyncio.wait_for(hero_products_from_home(client, BASE, gamma, [], budget=0), 1) == []
+        store.hold.set()
+        assert [h.title for h in await hero_products_from_home(client, BASE, gamma, [])] == ["Gamma"]
@@ -0,0 +1,72 @@
+import datetime
+from app.api.http import choose_encoding, etag_matches
+from app.services.brand_store import persist_brand_context
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding(None) is None
+    assert etag_matches('"a", W/"b"', 'W/"b"') and etag_matches("*", 'W/"x"') and not etag_matches('"a"', 'W/"b"')
+
+
+def test_brand_reads_answer_304_until_content_changes(client, db_session, make_context):
+    persist_brand_context(db_session, make_context())
+    first = client.get("/brands/demo-store.com/products", params={"limit": 2})
+    etag = first.headers["etag"]
+    again = client.get("/brands/demo-store.com/products", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    # same query on another route, or another query, is another representation
+    assert client.get("/brands/demo-store.com/products", params={"limit": 3}).headers["etag"] != etag
+    assert client.get("/brands/demo-store.com").headers["etag"] != etag
+
+    # a re-crawl that found the same content keeps the ETag
+    persist_brand_context(db_session, make_context(fetched_at=datetime.datetime(2024, 2, 1)))
+    assert client.get("/brands/demo-store.com/products", params={"limit": 2},
+                      headers={"If-None-Match": etag}).status_code == 304
+    persist_brand_context(db_session, make_context(brand_name="Renamed"))
+    changed = client.get("/brands/demo-store.com/products", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_brand_etag_follows_fetched_at(client, db_session, make_context):
+    persist_brand_context(db_session, make_context())
+    etag = client.get("/brands/demo-store.com").headers["etag"]
+    assert client.get("/brands/demo-store.com", headers={"If-None-Match": etag}).status_code == 304
+    # same content, but the body reports the new crawl time
+    persist_brand_context(db_session, make_context(fetched_at=datetime.datetime(2024, 2, 1)))
+    r = client.get("/brands/demo-store.com", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["fetched_at"].startswith("2024-02-01") and r.headers["etag"] != etag
+
+
+def test_other_reads_get_body_etags(client, db_session, make_context):
+    persist_brand_context(db_session, make_context())
+    r = client.get("/search", params={"q": "item"})
+    assert r.headers["etag"].startswith('W/"')
+    assert client.get("/search", params={"q": "item"}, headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+
+
+def test_large_bodies_are_compressed_and_streams_pass_through(client, db_session, make_context):
+    persist_brand_context(db_session, make_context(n_products=60))
+    r = client.get("/brands/demo-store.com/products", params={"limit": 60}, headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip" and "Accept-Encoding" in r.headers["vary"]
+    assert len(r.json()["items"]) == 60
+    raw = client.get("/brands/demo-store.com/products", params={"limit": 60}, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    small = client.get("/healthz", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    export = client.get("/export", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in export.headers and "etag" not in export.headers
+    assert export.text.startswith("brand,handle")
+
+
+def test_insights_post_has_no_conditional_handling(client, monkeypatch, make_context):
+    from app.services import insights_service
+
+    async def crawl(url):
+        return make_context()
+
+    monkeypatch.setattr(insights_service, "gather_insights", crawl)
+    r = client.post("/insights", json={"website_url": "https://demo-store.com"}, headers={"If-None-Match": "*"})
+    assert r.status_code == 200 and "etag" not in r.headers
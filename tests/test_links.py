@@ -0,0 +1,68 @@
+import random
+import pytest
+from app.scraping.discovery import find_links_by_keywords, discover_about_url, discover_faq_urls
+from app.scraping.extractors import extract_important_links, extract_socials
+from app.scraping.links import LinkClassifier, ANY, HREF, TEXT, classify_links
+from app.utils import helpers
+
+HOME = """
+<a href="/pages/about-us">Our Story</a>
+<a href="/policies/privacy-policy">Privacy</a>
+<a href="/apps/order-tracking">Where is my parcel</a>
+<a href="/pages/contact">Say hi</a>
+<a href="/blogs/news">Journal</a>
+<a href="/sitemap.xml">Sitemap</a>
+<a href="/pages/size-guide">Size guide</a>
+<a href="https://www.Instagram.com/demo/">IG</a>
+<a href="https://twitter.com/demo">Tw</a>
+"""
+
+
+def test_single_scan_matches_naive_substring_checks():
+    rng = random.Random(7)
+    keywords = ["privacy", "privacy-policy", "policy", "icy", "refund", "re", "terms-of-service", "terms"]
+    rules = {f"k{i}": ([kw], [HREF, TEXT, ANY][i % 3]) for i, kw in enumerate(keywords)}
+    clf = LinkClassifier(rules)
+    alphabet = list("privacy-policy refund terms of service") + ["privacy-policy", "terms"]
+    for _ in range(500):
+        href = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 8))).upper()
+        expected = {
+            label for label, ([kw], field) in rules.items()
+            if (field in (HREF, ANY) and kw in href.lower()) or (field in (TEXT, ANY) and kw in text.lower())
+        }
+        assert clf.labels_for(href, text) == expected
+
+
+def test_extractors_use_shared_labels():
+    base = "https://demo.test"
+    links = extract_important_links(HOME, base)
+    assert str(links.order_tracking) == "https://demo.test/apps/order-tracking"
+    assert str(links.contact_us) == "https://demo.test/pages/contact"
+    assert str(links.blogs) == "https://demo.test/blogs/news"
+    assert str(links.sitemap) == "https://demo.test/sitemap.xml"
+    assert [str(u) for u in links.others] == ["https://demo.test/policies/privacy-policy", "https://demo.test/pages/size-guide"]
+    assert [(s.platform, s.handle) for s in extract_socials(HOME, base)] == [("instagram", "demo"), ("twitter", "demo")]
+    assert find_links_by_keywords(HOME, base, ["privacy"]) == ["https://demo.test/policies/privacy-policy"]
+    assert helpers.extract_important_links(HOME, base)["contact_us"] is None
+
+
+@pytest.mark.asyncio
+async def test_about_prefers_keyword_order():
+    assert await discover_about_url(None, "https://demo.test", HOME) == "https://demo.test/pages/about-us"
+
+
+@pytest.mark.asyncio
+async def test_helpers_reuse_precomputed_anchors():
+    from selectolax.parser import HTMLParser
+    anchors = classify_links(HTMLParser(HOME))
+    assert isinstance(anchors, tuple) and anchors == classify_links(HOME)
+    # the html argument is ignored when anchors are given
+    assert await discover_about_url(None, "https://demo.test", "", anchors) == "https://demo.test/pages/about-us"
+    assert extract_important_links("", "https://demo.test", anchors) == extract_important_links(HOME, "https://demo.test")
+
+
+@pytest.mark.asyncio
+async def test_faq_links_skip_mailto():
+    html = '<a href="/pages/faq">FAQ</a><a href="mailto:help@demo.test">Email</a>'
+    assert await discover_faq_urls(None, "https://demo.test", html) == ["https://demo.test/pages/faq"]
@@ -0,0 +1,43 @@
+import copy, json
+from scripts import loadtest
+
+
+def test_sweep_against_mock_storefront(tmp_path):
+    out = tmp_path / "report.json"
+    assert loadtest.main(["--concurrency", "1", "3", "--duration", "0.5", "--products", "20",
+                          "--upstream-latency", "0", "-o", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert [l["concurrency"] for l in report["levels"]] == [1, 3]
+    for level in report["levels"]:
+        assert level["requests"] >= 1 and level["error_rate"] == 0.0
+        assert level["latency_ms"]["p50"] <= level["latency_ms"]["p99"]
+        assert level["loop_lag_ms"]["p99"] is not None and level["rss_mb"] > 0
+    assert report["meta"]["mode"] == "in-process" and report["meta"]["upstream_requests"] > 0
+    assert report["meta"]["sites"] == 64
+    assert report["saturation"]["max_concurrency_within_slo"] == 3
+
+
+def test_compare_flags_regressions():
+    level = {"concurrency": 4, "throughput_rps": 10.0, "error_rate": 0.0,
+             "latency_ms": {"p50": 100.0, "p95": 150.0, "p99": 200.0, "max": 250.0}}
+    baseline = {"levels": [level]}
+    same = {"levels": [copy.deepcopy(level)]}
+    assert loadtest.compare(baseline, same, 0.25) == []
+    worse = copy.deepcopy(same)
+    worse["levels"][0].update(throughput_rps=5.0, error_rate=0.2)
+    worse["levels"][0]["latency_ms"]["p99"] = 400.0
+    assert len(loadtest.compare(baseline, worse, 0.25)) == 3
+
+
+def test_percentile_is_nearest_rank():
+    assert loadtest.percentile([4, 1, 3, 2], 50) == 2
+    assert loadtest.percentile(list(range(1, 101)), 99) == 99
+    assert loadtest.percentile([7.0], 99) == 7.0 and loadtest.percentile([], 50) is None
+
+
+def test_every_crawl_sees_distinct_content():
+    store = loadtest.MockStorefront(products=3, sites=2)
+    assert len(set(store.hosts)) == 2
+    first, again, other = (store.route("/", h)[2] for h in ("127.0.0.1", "127.0.0.1", "127.0.0.2"))
+    assert len({first, again, other}) == 3
+    assert b"127.0.0.1 #2" in store.route("/products.json?limit=3&page=1", "127.0.0.1")[2]
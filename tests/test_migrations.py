@@ -0,0 +1,51 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app import migrations, models
+from app.services.brand_store import get_brand, list_brand_products
+from app.services.search import search
+
+# the schema as the first released version created it
+LEGACY_SCHEMA = """
+CREATE TABLE brands (id INTEGER PRIMARY KEY, domain VARCHAR(255) NOT NULL UNIQUE, name VARCHAR(255),
+                     about_text TEXT, fetched_at DATETIME, meta JSON);
+CREATE TABLE products (id INTEGER PRIMARY KEY, brand_id INTEGER REFERENCES brands(id), handle VARCHAR(255),
+                       title VARCHAR(512), url VARCHAR(1024), images JSON, price VARCHAR(64), currency VARCHAR(16),
+                       sku JSON, tags JSON, variants JSON, raw JSON);
+CREATE TABLE policies (id INTEGER PRIMARY KEY, brand_id INTEGER REFERENCES brands(id), type VARCHAR(64),
+                       url VARCHAR(1024), content_text TEXT, content_html TEXT);
+CREATE TABLE faqs (id INTEGER PRIMARY KEY, brand_id INTEGER REFERENCES brands(id), question TEXT, answer TEXT,
+                   url VARCHAR(1024));
+CREATE TABLE socials (id INTEGER PRIMARY KEY, brand_id INTEGER REFERENCES brands(id), platform VARCHAR(64),
+                      url VARCHAR(1024), handle VARCHAR(255));
+INSERT INTO brands (id, domain, name, meta) VALUES (1, 'https://a.test/', 'A', '{}'), (2, 'https://b.test/', 'B', '{}');
+INSERT INTO products (id, brand_id, handle, title, price, tags, variants, raw, images, sku) VALUES
+    (1, 1, 'mug', 'Blue Mug', '12.50', '["kitchen", "blue"]', '[]', '{"product_type": "Mugs"}', '[]', '[]'),
+    (2, 1, 'gift', 'Gift Card', 'n/a', '[]', '[]', '{}', '[]', '[]');
+INSERT INTO policies (brand_id, type, url, content_text) VALUES
+    (1, 'refund', 'https://a.test/policies/refund', '30 day refunds'),
+    (2, 'refund', 'https://b.test/policies/refund', '30 day refunds');
+INSERT INTO faqs (brand_id, question, answer) VALUES (1, 'Ship abroad?', 'Yes, worldwide.');
+"""
+
+
+def test_upgrade_brings_a_legacy_database_up_to_date(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for stmt in LEGACY_SCHEMA.split(";"):
+            if stmt.strip():
+                conn.execute(text(stmt))
+    migrations.upgrade(engine)
+    migrations.upgrade(engine)  # a second worker starting later finds nothing to do
+    with Session(bind=engine) as db:
+        assert db.query(models.TextBlob).count() == 2
+        brand = get_brand(db, "a.test")
+        assert brand.policies[0].content_text == "30 day refunds"
+        assert brand.faqs[0].answer == "Yes, worldwide."
+        assert get_brand(db, "b.test").policies[0].content_text == "30 day refunds"
+        assert db.execute(text("SELECT count(*) FROM policies WHERE content_text IS NOT NULL")).scalar() == 0
+
+        page = list_brand_products(db, "a.test", sort="price", tag="kitchen")
+        assert [(p.handle, p.price) for p in page.items] == [("mug", 12.5)]
+        assert db.get(models.Product, 1).product_type == "Mugs"
+        assert db.get(models.Product, 2).price_value is None
+        assert [h.title for h in search(db, "mug").hits] == ["Blue Mug"]
@@ -0,0 +1,50 @@
+from app.services.brand_store import persist_brand_context
+from app.services.search import fts_query
+
+
+def test_fts_query_quotes_tokens():
+    assert fts_query('refund "30 days') == '"refund" "30" "days"*'
+    assert fts_query("  ") == ""
+
+
+def test_search_across_brands(client, db_session, make_context):
+    persist_brand_context(db_session, make_context())
+    persist_brand_context(db_session, make_context(
+        website="https://other-store.com",
+        policies=[{"type": "refund", "url": "https://other-store.com/policies/refund-policy",
+                   "content_text": "No refunds on sale items"}],
+    ))
+    body = client.get("/search", params={"q": "refunds", "kind": "policies"}).json()
+    assert {h["brand"] for h in body["hits"]} == {"https://demo-store.com/", "https://other-store.com/"}
+
+    body = client.get("/search", params={"q": "item", "kind": "products", "brand": "other-store.com", "limit": 2}).json()
+    assert len(body["hits"]) == 2 and body["next_offset"] == 2
+    assert all(h["brand"] == "https://other-store.com/" for h in body["hits"])
+
+    body = client.get("/search", params={"q": "ship"}).json()
+    assert [h["kind"] for h in body["hits"]] == ["faqs", "faqs"]
+
+
+def test_reindex_on_persist(client, db_session, make_context):
+    persist_brand_context(db_session, make_context())
+    persist_brand_context(db_session, make_context(faqs=[]))
+    assert client.get("/search", params={"q": "ship", "kind": "faqs"}).json()["hits"] == []
+
+
+def test_hits_are_grouped_by_kind(client, db_session, make_context):
+    ctx = make_context()
+    ctx.product_catalog[0].title = "Refund voucher"
+    persist_brand_context(db_session, ctx)
+    hits = client.get("/search", params={"q": "refund"}).json()["hits"]
+    assert [h["kind"] for h in hits] == ["products", "policies"]
+    assert all(0 < h["score"] <= 1 for h in hits) and [h["score"] for h in hits] == [1.0, 1.0]
+    hits = client.get("/search", params={"q": "refund", "kind": ["policies", "products"]}).json()["hits"]
+    assert [h["kind"] for h in hits] == ["policies", "products"]
+
+
+def test_like_fallback_escapes_wildcards_and_matches_tags(db_session, make_context):
+    from app.services.search import _like_hits
+    persist_brand_context(db_session, make_context(n_products=3))
+    assert {h.title for h in _like_hits(db_session, "products", "sal", None, 10)} == {"Item 1"}
+    assert _like_hits(db_session, "products", "%", None, 10) == []
+    assert _like_hits(db_session, "products", "Item_1", None, 10) == []
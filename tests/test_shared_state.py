@@ -0,0 +1,91 @@
+import time
+import httpx
+import pytest
+from app.core.config import settings
+from app.core.shared_state import PAGES, SharedStore, get_store
+from app.scraping.fetcher import fetch_body, fetch_json_items
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INSIGHTS_SHARED_STATE_PATH", str(tmp_path / "state.db"))
+    return get_store()
+
+
+def test_cache_is_visible_to_other_connections(tmp_path):
+    path = str(tmp_path / "state.db")
+    a, b = SharedStore(path), SharedStore(path)
+    a.set_text(PAGES, "https://x.test/", "<html>hi</html>", ttl=60)
+    a.set_text(PAGES, "https://x.test/old", "stale", ttl=-1)
+    assert b.get_text(PAGES, "https://x.test/") == "<html>hi</html>"
+    assert b.get_text(PAGES, "https://x.test/old") is None
+    a.set(PAGES, "https://x.test/gone", b"x", ttl=0.01)
+    time.sleep(0.02)
+    assert b.purge_expired() == 1
+
+
+def test_rate_limit_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "state.db")
+    a, b = SharedStore(path), SharedStore(path)
+    delays = [s.reserve("shop.test", rate=10, burst=2) for s in (a, b, a, b)]
+    assert delays[:2] == [0.0, 0.0]
+    # the bucket is empty: later callers are spaced 1/rate apart regardless of connection
+    assert delays[2] == pytest.approx(0.1, abs=0.02)
+    assert delays[3] == pytest.approx(0.2, abs=0.02)
+    assert a.reserve("other.test", rate=10, burst=2) == 0.0
+
+
+def test_reservations_are_bounded_and_refundable(tmp_path):
+    store = SharedStore(str(tmp_path / "state.db"))
+    assert [store.reserve("shop.test", rate=10, burst=1, max_wait=0.25) for _ in range(4)][:3] == pytest.approx([0.0, 0.1, 0.2], abs=0.02)
+    # the queue is full: refused without taking a token
+    assert store.reserve("shop.test", rate=10, burst=1, max_wait=0.25) is None
+    store.refund("shop.test", rate=10, burst=1)
+    assert store.reserve("shop.test", rate=10, burst=1, max_wait=0.25) == pytest.approx(0.2, abs=0.02)
+
+
+def test_busy_file_drops_writes_and_uses_local_bucket(tmp_path):
+    path = str(tmp_path / "state.db")
+    store, other = SharedStore(path), SharedStore(path)
+    store.set_text(PAGES, "https://x.test/", "hi", ttl=60)
+    other._conn.execute("BEGIN IMMEDIATE")
+    try:
+        # WAL readers are not blocked by the other process's write lock
+        assert store.get_text(PAGES, "https://x.test/") == "hi"
+        store.set_text(PAGES, "https://x.test/b", "dropped", ttl=60)
+        # each attempt waits out the busy timeout before falling back, so refill is slow here
+        assert [store.reserve("shop.test", rate=1, burst=1) for _ in range(2)] == pytest.approx([0.0, 0.9], abs=0.05)
+    finally:
+        other._conn.execute("ROLLBACK")
+    assert store.get_text(PAGES, "https://x.test/b") is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_body_uses_page_and_negative_cache(shared):
+    hits = []
+
+    def handler(request):
+        hits.append(request.url.path)
+        if request.url.path == "/":
+            return httpx.Response(200, text="home")
+        return httpx.Response(404)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        for _ in range(3):
+            assert await fetch_body(client, "https://shop.test/") == (200, "home")
+            assert await fetch_body(client, "https://shop.test/missing") == (404, None)
+            assert await fetch_json_items(client, "https://shop.test/products.json", "products", dict) is None
+    assert sorted(hits) == ["/", "/missing", "/products.json"]
+
+
+@pytest.mark.asyncio
+async def test_page_cache_respects_body_limits(shared, monkeypatch):
+    monkeypatch.setattr(settings, "INSIGHTS_MAX_BODY_BYTES", 10)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text="x" * 8 if request.url.path == "/small" else "y" * 50))
+    async with httpx.AsyncClient(transport=transport) as client:
+        # allowed only by a raised limit: returned, but not cached for default callers
+        assert await fetch_body(client, "https://shop.test/big", max_bytes=100) == (200, "y" * 50)
+        assert shared.get_text(PAGES, "https://shop.test/big") is None
+        assert await fetch_body(client, "https://shop.test/small") == (200, "x" * 8)
+        # a cached body over a smaller caller's limit is not served to it
+        assert await fetch_body(client, "https://shop.test/small", max_bytes=4) == (200, None)
@@ -0,0 +1,85 @@
+import datetime
+import numpy as np
+from sqlalchemy import text
+from app import models
+from app.services import similarity
+from app.services.brand_store import persist_brand_context
+from app.services.similarity import VectorIndex, backfill_vectors, price_band
+
+
+def _catalog(website, titles, tags, price):
+    return [
+        {"handle": f"p-{i}", "title": t, "url": f"{website}/products/p-{i}", "price": price + i,
+         "tags": tags, "raw": {"product_type": tags[0]}}
+        for i, t in enumerate(titles)
+    ]
+
+
+def test_price_band():
+    assert price_band(None) is None
+    assert price_band(9.99) == "<10" and price_band(10) == "<25" and price_band(5000) == ">=1000"
+
+
+def test_index_upsert_and_query():
+    index = VectorIndex()
+    vecs = np.eye(4, 512, dtype=np.float32)
+    index.upsert([(i + 1, v) for i, v in enumerate(vecs)] + [(9, (vecs[0] + vecs[1]) / np.sqrt(2))])
+    index.upsert([(2, vecs[2])])  # replaces brand 2 in place
+    assert len(index) == 5
+    hits = index.query(vecs[0], 3, exclude=(1,))
+    assert [bid for bid, _ in hits] == [9]  # orthogonal brands score below MIN_SCORE
+    assert [bid for bid, _ in index.query(vecs[2], 5)] == [2, 3]
+
+
+def test_competitors_from_local_index(client, db_session, make_context):
+    def persist(website, titles, tags, price, about):
+        persist_brand_context(db_session, make_context(
+            website=website, product_catalog=_catalog(website, titles, tags, price), about_text=about))
+
+    coffee = (["Espresso Beans Dark Roast", "Coffee Grinder Burr", "Pour Over Kettle"], ["coffee", "brewing"], 20)
+    persist("https://beans.com", *coffee, "Small batch coffee roasters.")
+    persist("https://roastery.com", ["Single Origin Coffee Beans", "Burr Grinder", "Espresso Cups"],
+             ["coffee", "espresso"], 22, "We roast coffee beans weekly.")
+    persist("https://sneakers.com", ["Running Shoe Mesh", "Trail Sneaker", "Leather Boot"],
+             ["footwear", "running"], 120, "Shoes for runners.")
+
+    body = client.post("/competitors", json={"website_url": "https://beans.com"}, params={"limit": 2}).json()
+    assert body["engine"] == "local" and body["source"] == "https://beans.com/"
+    sites = [r["website"] for r in body["results"]]
+    assert sites[0] == "https://roastery.com/" and "https://beans.com/" not in sites
+
+    # re-persisting moves the store in the index without a restart
+    persist("https://sneakers.com", *coffee, "Coffee too now.")
+    body = client.post("/competitors", json={"website_url": "https://beans.com"}, params={"limit": 1}).json()
+    assert body["results"][0]["website"] == "https://sneakers.com/"
+
+    r = client.post("/competitors", json={"website_url": "https://unknown.com"})
+    assert r.status_code == 404
+
+
+def test_refresh_picks_up_rows_committed_late(db_session, make_context, monkeypatch):
+
+    persist_brand_context(db_session, make_context(website="https://a.com"))
+    index = VectorIndex()
+    index.refresh(db_session)
+    assert len(index) == 1
+    # a writer that flushed before the last refresh but committed after it: its timestamp is old
+    persist_brand_context(db_session, make_context(website="https://b.com"))
+    db_session.query(models.BrandVector).filter(models.BrandVector.brand_id != 1).update(
+        {models.BrandVector.updated_at: datetime.datetime(2000, 1, 1)})
+    db_session.commit()
+    index.refresh(db_session)
+    assert len(index) == 2
+
+    # a backfill racing another worker's skips the rows that worker stored meanwhile
+    db_session.query(models.BrandVector).delete()
+    db_session.commit()
+    features = similarity.brand_features
+
+    def other_worker_first(products, about_text):
+        monkeypatch.setattr(similarity, "brand_features", features)
+        db_session.execute(text("INSERT INTO brand_vectors (brand_id, vector, updated_at, seq) VALUES (2, x'00', '2000-01-01', 1)"))
+        return features(products, about_text)
+
+    monkeypatch.setattr(similarity, "brand_features", other_worker_first)
+    assert backfill_vectors(db_session) == 1 and backfill_vectors(db_session) == 0
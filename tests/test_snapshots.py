@@ -0,0 +1,47 @@
+import datetime
+from app import models
+from app.services.brand_store import persist_brand_context
+
+
+def _crawl(make_context, day, price, refund_text, n_products=3):
+    ctx = make_context(n_products=n_products, fetched_at=datetime.datetime(2024, 1, day))
+    ctx.product_catalog[0].variants[0]["price"] = price
+    ctx.policies[0].content_text = refund_text
+    return ctx
+
+
+def test_only_changes_are_stored(db_session, make_context):
+    persist_brand_context(db_session, _crawl(make_context, 1, 10.0, "30 day refunds"))
+    baseline = db_session.query(models.VariantPriceChange).count()
+    assert baseline == 3
+    persist_brand_context(db_session, _crawl(make_context, 2, 10.0, "30 day refunds"))
+    assert db_session.query(models.VariantPriceChange).count() == baseline
+    assert db_session.query(models.PolicyChange).count() == 1
+    persist_brand_context(db_session, _crawl(make_context, 3, 8.0, "14 day refunds", n_products=2))
+    changes = {(c.handle, c.change) for c in db_session.query(models.VariantPriceChange).filter(
+        models.VariantPriceChange.crawled_at == datetime.datetime(2024, 1, 3))}
+    assert changes == {("item-0", "changed"), ("item-2", "removed")}
+
+
+def test_persisting_the_same_crawl_again_is_a_no_op(db_session, make_context):
+    ctx = _crawl(make_context, 1, 10.0, "30 day refunds")
+    persist_brand_context(db_session, ctx)
+    product_ids = [p.id for p in db_session.query(models.Product)]
+    persist_brand_context(db_session, ctx)  # e.g. a cached /insights result with persist=true
+    assert db_session.query(models.CrawlSnapshot).count() == 1
+    assert [p.id for p in db_session.query(models.Product)] == product_ids
+    persist_brand_context(db_session, _crawl(make_context, 2, 10.0, "30 day refunds"))
+    assert db_session.query(models.CrawlSnapshot).count() == 2
+
+
+def test_history_endpoints(client, db_session, make_context):
+    persist_brand_context(db_session, _crawl(make_context, 1, 10.0, "30 day refunds"))
+    persist_brand_context(db_session, _crawl(make_context, 2, 8.0, "14 day refunds"))
+    history = client.get("/brands/demo-store.com/history/products/item-0").json()
+    assert [p["price"] for p in history] == [10.0, 8.0]
+
+    db_session.query(models.PolicyChange).update({"crawled_at": datetime.datetime.utcnow()})
+    db_session.commit()
+    changes = client.get("/policy-changes", params={"type": "refund", "include_diff": True}).json()
+    assert len(changes) == 1 and changes[0]["brand"] == "https://demo-store.com/"
+    assert "-30 day refunds" in changes[0]["diff"] and "+14 day refunds" in changes[0]["diff"]
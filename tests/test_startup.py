@@ -0,0 +1,16 @@
+from fastapi.testclient import TestClient
+from benchmarks.bench_startup import heavy_imports
+
+
+def test_app_import_does_not_load_heavy_modules():
+    assert heavy_imports() == []
+
+
+def test_warmup_runs_in_lifespan(monkeypatch):
+    from app import main
+    calls = []
+    monkeypatch.setattr(main.settings, "INSIGHTS_WARMUP", True)
+    monkeypatch.setattr(main, "warm_up", lambda: calls.append(1))
+    with TestClient(main.app) as client:
+        assert client.get("/healthz").json() == {"status": "ok"}
+    assert calls == [1]
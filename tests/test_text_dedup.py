@@ -0,0 +1,62 @@
+import pytest
+from app import models
+from app.core.config import settings
+from app.scraping.extraction_memo import amemoized_extract, clear_memo, content_hash
+from app.services.brand_store import get_brand, get_brand_policies, persist_brand_context
+
+PAGE = """<html><head><script nonce="{n}">var csrf = "{n}";</script></head>
+<body><main><h1>Refund policy</h1>  <p>{text}</p></main></body></html>"""
+
+
+def test_content_hash_ignores_page_noise():
+    a = content_hash(PAGE.format(n="abc", text="30 day refunds"))
+    assert a == content_hash(PAGE.format(n="xyz", text="30 day refunds").replace("  ", "\n  "))
+    assert a != content_hash(PAGE.format(n="abc", text="14 day refunds"))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("shared", [False, True])
+async def test_identical_documents_are_extracted_once(shared, tmp_path, monkeypatch):
+    if shared:
+        monkeypatch.setattr(settings, "INSIGHTS_SHARED_STATE_PATH", str(tmp_path / "state.db"))
+    clear_memo()
+    calls = []
+
+    def extract(html):
+        calls.append(html)
+        return "text" if "30 day" in html else None
+
+    assert await amemoized_extract("policy", PAGE.format(n="1", text="30 day refunds"), extract) == "text"
+    assert await amemoized_extract("policy", PAGE.format(n="2", text="30 day refunds"), extract) == "text"
+    assert await amemoized_extract("policy", PAGE.format(n="3", text="no text"), extract) is None
+    assert await amemoized_extract("policy", PAGE.format(n="4", text="no text"), extract) is None
+    assert len(calls) == 2
+    # another worker (an empty local memo) reuses the shared results, misses included
+    clear_memo()
+    assert await amemoized_extract("policy", PAGE.format(n="5", text="30 day refunds"), extract) == "text"
+    assert await amemoized_extract("policy", PAGE.format(n="6", text="no text"), extract) is None
+    assert len(calls) == (2 if shared else 4)
+    clear_memo()
+
+
+def test_policy_and_faq_text_is_stored_once(db_session, make_context):
+    for site in ("https://a.test", "https://b.test"):
+        persist_brand_context(db_session, make_context(website=site))
+    assert db_session.query(models.TextBlob).count() == 2  # refund text + FAQ answer
+    for site in ("a.test", "b.test"):
+        brand = get_brand(db_session, site)
+        assert brand.policies[0].content_text == "30 day refunds"
+        assert brand.faqs[0].answer == "Yes, worldwide."
+
+    ctx = make_context(website="https://a.test")
+    ctx.policies[0].content_text = "14 day refunds"
+    persist_brand_context(db_session, ctx)
+    assert get_brand_policies(db_session, "a.test")[0].content_text == "14 day refunds"
+    assert get_brand_policies(db_session, "b.test")[0].content_text == "30 day refunds"
+    assert db_session.query(models.TextBlob).count() == 3
+
+    ctx = make_context(website="https://b.test")
+    ctx.policies[0].content_text = "14 day refunds"
+    persist_brand_context(db_session, ctx)
+    # nothing references the old refund text any more
+    assert {b.text for b in db_session.query(models.TextBlob)} == {"14 day refunds", "Yes, worldwide."}